@@ -0,0 +1,154 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import orjson
+
+from ..monitoring.metrics import LLM_TOKENS, record_cache_lookup
+from .research_merge import words
+from .tokenizer import count_tokens, truncate_to_budget
+
+CONTEXT_CACHE = "compressed_context"
+
+# Terms that make a sentence useful for yes/no verification questions
+VERIFICATION_TERMS = frozenset({
+    "contract", "address", "chain", "native", "official", "website", "audit", "audited",
+    "security", "supply", "holders", "liquidity", "launch", "launched", "team", "founded",
+    "scam", "rug", "warning", "exchange", "listed", "token", "verified", "whitepaper",
+})
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def context_passages(context: Any) -> List[str]:
+    """
+    Text passages of a research context, most authoritative first: the
+    structured sections' answer then detail snippets, or any older format
+    (plain string, arbitrary mapping) as-is.
+    """
+    if isinstance(context, dict) and ("answer" in context or "details" in context):
+        passages = [context.get("answer") or ""]
+        passages += [detail.get("snippet") or "" for detail in context.get("details") or []]
+        return [passage for passage in passages if passage]
+    if isinstance(context, str):
+        return [context]
+    return [str(context)]
+
+
+class CompressedContext:
+    def __init__(self, text: str, tokens_in: int, tokens_out: int, cached: bool = False):
+        self.text = text
+        self.tokens_in = tokens_in
+        self.tokens_out = tokens_out
+        self.cached = cached
+
+
+class ContextCompressor:
+    """
+    Selects the sentences of a research context most useful for question
+    generation, up to a token budget.
+
+    Compressed contexts are cached by a hash of the research content, so each
+    research version is compressed once per worker.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, cache_size: int = 256):
+        """
+        :param token_budget: Estimated tokens allowed in the compressed context
+        :param cache_size: Compressed contexts kept in memory
+        """
+        self.token_budget = token_budget if token_budget is not None else int(
+            os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[str, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, context: Any, token_name: str, token_symbol: str) -> str:
+        digest = hashlib.sha256(orjson.dumps(context, default=str))
+        digest.update(f"|{token_name}|{token_symbol}|{self.token_budget}".encode())
+        return digest.hexdigest()
+
+    def score_sentences(self, sentences: List[str], token_name: str, token_symbol: str) -> List[float]:
+        """
+        Relevance of each sentence: token mentions, verification terms and
+        earlier position, normalized by length. Fragments score 0.
+        """
+        name_terms = set(words(f"{token_name} {token_symbol}"))
+        scores = []
+        for position, sentence in enumerate(sentences):
+            terms = set(words(sentence))
+            if len(terms) < 3:
+                scores.append(0.0)
+                continue
+            score = 2.0 * len(terms & name_terms) + len(terms & VERIFICATION_TERMS)
+            score += 1.0 / (1 + position)
+            scores.append(score / (1 + len(terms) / 40))
+        return scores
+
+    def _select(self, sentences: List[str], scores: List[float]) -> str:
+        # Greedy by score, skipping near-repeats of already chosen sentences
+        chosen: List[int] = []
+        chosen_terms: List[set] = []
+        remaining = self.token_budget
+        for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+            if remaining <= 0 or scores[index] <= 0:
+                break
+            terms = set(words(sentences[index]))
+            if any(len(terms & seen) / len(terms | seen) > 0.8 for seen in chosen_terms):
+                continue
+            cost = count_tokens(sentences[index])
+            if cost > remaining:
+                if chosen:
+                    continue
+                # A single oversized sentence is still better than no context
+                sentence, cost = truncate_to_budget(sentences[index], remaining)
+                sentences[index] = sentence
+            chosen.append(index)
+            chosen_terms.append(terms)
+            remaining -= cost
+        # Keep the original order so the context still reads naturally
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+    def compress(self, context: Any, token_name: str, token_symbol: str = "") -> CompressedContext:
+        """
+        Compress a research context to the token budget.
+
+        :param context: Structured research sections or older research payloads
+        :return: The compressed text with its token counts before and after
+        """
+        key = self._cache_key(context, token_name, token_symbol)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        record_cache_lookup(CONTEXT_CACHE, cached is not None)
+        if cached is not None:
+            text, tokens_in, tokens_out = cached
+            return CompressedContext(text, tokens_in, tokens_out, cached=True)
+
+        sentences = [sentence for passage in context_passages(context) for sentence in split_sentences(passage)]
+        tokens_in = sum(count_tokens(sentence) for sentence in sentences)
+        if tokens_in <= self.token_budget:
+            text = " ".join(sentences)
+        else:
+            text = self._select(sentences, self.score_sentences(sentences, token_name, token_symbol))
+        tokens_out = count_tokens(text)
+
+        with self._lock:
+            self._cache[key] = (text, tokens_in, tokens_out)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return CompressedContext(text, tokens_in, tokens_out)
+
+
+def record_context_tokens(component: str, compressed: CompressedContext):
+    """Report context size before and after compression."""
+    LLM_TOKENS.labels(component, "context_in").inc(compressed.tokens_in)
+    LLM_TOKENS.labels(component, "context_out").inc(compressed.tokens_out)
@@ -0,0 +1,135 @@
+import os
+from string import Template
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .tokenizer import truncate_to_budget
+
+# Templates are parsed once at import; rendering only substitutes values.
+ANSWER_TEMPLATE = Template("$answer\n")
+DETAILS_HEADER = "\nAdditional Details:\n"
+DETAIL_TEMPLATE = Template("$snippet\n")
+SOURCES_HEADER = "\nSources:\n"
+SOURCE_TEMPLATE = Template("- $url\n")
+
+SECTIONS = ("answer", "details", "sources")
+
+
+def render_section(name: str, value: Any) -> Iterator[str]:
+    """
+    Yield the text chunks of one structured section.
+    """
+    if name == "answer":
+        if value:
+            yield ANSWER_TEMPLATE.substitute(answer=value)
+    elif name == "details":
+        if value:
+            yield DETAILS_HEADER
+            for detail in value:
+                yield DETAIL_TEMPLATE.substitute(snippet=detail["snippet"])
+    elif name == "sources":
+        if value:
+            yield SOURCES_HEADER
+            for url in value:
+                yield SOURCE_TEMPLATE.substitute(url=url)
+
+
+def render_text(sections: Dict[str, Any]) -> str:
+    """
+    Render structured research sections as the plain-text view.
+    """
+    return "".join(chunk for name in SECTIONS for chunk in render_section(name, sections.get(name)))
+
+
+class FormattedResearch:
+    """
+    Structured research (answer, details, sources) with a text view rendered
+    only when first requested.
+    """
+
+    def __init__(self, sections: Dict[str, Any]):
+        self.sections = sections
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = render_text(self.sections)
+        return self._text
+
+    def iter_text(self) -> Iterator[str]:
+        """Stream the text view chunk by chunk."""
+        for name in SECTIONS:
+            yield from render_section(name, self.sections.get(name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.sections
+
+
+class ResearchFormatter:
+    """
+    Turns merged search results into structured research sections, keeping
+    the answer and detail snippets within a token budget.
+
+    Detail snippets come from the fetched source page (``raw_content``)
+    when available, otherwise from the search result's excerpt.
+    """
+
+    def __init__(self, max_details: Optional[int] = None, token_budget: Optional[int] = None,
+                 max_sources: Optional[int] = None):
+        """
+        :param max_details: Maximum number of detail snippets
+        :param token_budget: Estimated tokens shared by the answer and the details
+        :param max_sources: Maximum number of source URLs listed
+        """
+        self.max_details = max_details if max_details is not None else int(
+            os.getenv("RESEARCH_MAX_DETAILS", "3"))
+        self.token_budget = token_budget if token_budget is not None else int(
+            os.getenv("RESEARCH_TOKEN_BUDGET", "1200"))
+        self.max_sources = max_sources if max_sources is not None else int(
+            os.getenv("RESEARCH_MAX_SOURCES", "10"))
+
+    def iter_sections(self, search_results: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield ``(section name, value)`` pairs in display order.
+
+        Results are expected ranked; work per section is bounded by the
+        budget and limits, not by the number of results.
+        """
+        remaining = self.token_budget
+        answer, used = truncate_to_budget(search_results.get("answer") or "", remaining)
+        remaining -= used
+        yield "answer", answer
+
+        details: List[Dict[str, Any]] = []
+        for result in search_results.get("results", []):
+            if len(details) >= self.max_details or remaining <= 0:
+                break
+            # The source page's text when it was fetched, else the search excerpt
+            page = (result.get("raw_content") or "").strip()
+            content = page or (result.get("content") or "").strip()
+            if not content:
+                continue
+            # A whole page would take the entire budget: give it an equal
+            # share of what is left for the remaining details
+            budget = remaining // (self.max_details - len(details)) if page else remaining
+            snippet, used = truncate_to_budget(content, budget)
+            remaining -= used
+            details.append({
+                "title": result.get("title"),
+                "url": result.get("url"),
+                "aspect": result.get("aspect"),
+                "snippet": snippet,
+            })
+        yield "details", details
+
+        sources: List[str] = []
+        for result in search_results.get("results", []):
+            if len(sources) >= self.max_sources:
+                break
+            url = result.get("url")
+            if url and url not in sources:
+                sources.append(url)
+        yield "sources", sources
+
+    def format(self, search_results: Dict[str, Any]) -> FormattedResearch:
+        return FormattedResearch(dict(self.iter_sections(search_results)))
@@ -1,36 +1,57 @@
 import os
 import logging
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-from langchain_community.chat_models import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
+from ..monitoring.metrics import LLM_TOKENS, record_upstream_call, stage_timer
+from .context_compression import ContextCompressor, record_context_tokens
+from .tokenizer import count_tokens
+from ..upstream.mode import local_mode
+from ..upstream.ratelimit import INTERACTIVE, UpstreamRateLimiter, get_rate_limiter
 
-from ..models.token import Token
+if TYPE_CHECKING:
+    from ..models.token import Token
+    from ..verification.assignment import AssignmentEngine
 
 class QuestionGenerationAgent:
-    def __init__(self, openai_api_key: Optional[str] = None):
+    def __init__(self, openai_api_key: Optional[str] = None, rate_limiter: Optional[UpstreamRateLimiter] = None):
         """
         Initialize the Question Generation Agent with OpenAI configuration.
 
         :param openai_api_key: Optional API key for OpenAI. If not provided, uses environment variable.
+        :param rate_limiter: Quota of the API key (default: the one shared by every worker)
         """
         self.openai_api_key = openai_api_key or os.getenv('OPENAI_API_KEY')
-        self.llm = ChatOpenAI(
-            openai_api_key=self.openai_api_key,
-            model_name='gpt-4o',
-            temperature=0.3
-        )
+        if local_mode():
+            from ..upstream.local import LocalChatModel
+
+            self.llm = LocalChatModel(model_name='gpt-4o')
+        else:
+            # Deferred import: LangChain is only loaded once an agent is built
+            from langchain_community.chat_models import ChatOpenAI
+
+            self.llm = ChatOpenAI(
+                openai_api_key=self.openai_api_key,
+                model_name='gpt-4o',
+                temperature=0.3
+            )
+        # Quota shared by every worker using the same API key
+        self.rate_limiter = rate_limiter or get_rate_limiter("openai", self.openai_api_key)
+        # Research contexts are cut down to CONTEXT_TOKEN_BUDGET before prompting
+        self.compressor = ContextCompressor()
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
 
-    def generate_verification_questions(self, token: Token, context: Dict[str, str]) -> List[Dict[str, str]]:
+    def generate_verification_questions(self, token: "Token", context: Any,
+                                        priority: str = INTERACTIVE) -> List[Dict[str, str]]:
         """
         Generate verification questions for a specific token.
 
         :param token: Token model instance
-        :param context: Additional context about the token from web extraction
+        :param context: Research about the token (structured sections or older payloads)
+        :param priority: Rate-limit priority of the LLM call
         :return: List of generated verification questions
         """
+        from langchain_core.prompts import PromptTemplate
+
         question_generation_prompt = PromptTemplate(
             input_variables=['token_name', 'token_symbol', 'context'],
             template="""
@@ -52,48 +73,82 @@ class QuestionGenerationAgent:
             """
         )
 
-        questions_str = self.llm.predict(
-            question_generation_prompt.format(
+        with stage_timer("question_agent", "compress_context"):
+            compressed = self.compressor.compress(context, token.name, token.symbol)
+        record_context_tokens("question_agent", compressed)
+
+        with stage_timer("question_agent", "build_prompt"):
+            prompt = question_generation_prompt.format(
                 token_name=token.name,
                 token_symbol=token.symbol,
-                context=str(context)
+                context=compressed.text
             )
+
+        self.rate_limiter.acquire_sync(priority)
+        with stage_timer("question_agent", "llm"):
+            try:
+                questions_str = self.llm.predict(prompt)
+            except Exception:
+                record_upstream_call("openai", success=False)
+                raise
+            record_upstream_call("openai", success=True)
+
+        prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(questions_str)
+        LLM_TOKENS.labels("question_agent", "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels("question_agent", "completion").inc(completion_tokens)
+        self.logger.info(
+            "Question generation for %s: context %d -> %d tokens%s, prompt %d, completion %d",
+            token.name, compressed.tokens_in, compressed.tokens_out, " (cached)" if compressed.cached else "",
+            prompt_tokens, completion_tokens
         )
 
         # Parse the generated questions into a structured format
-        questions = [
-            {
-                'token_id': token.id,
-                'question_text': q.strip(),
-                'type': 'binary',
-                'difficulty': 'easy'
-            }
-            for q in questions_str.split('\n') if q.strip()
-        ]
+        with stage_timer("question_agent", "parse"):
+            questions = [
+                {
+                    'token_id': token.id,
+                    'question_text': q.strip(),
+                    'type': 'binary',
+                    'difficulty': 'easy'
+                }
+                for q in questions_str.split('\n') if q.strip()
+            ]
 
         return questions
 
-    def distribute_questions(self, questions: List[Dict[str, str]]):
+    def distribute_questions(self, questions: List[Dict[str, str]],
+                             engine: Optional["AssignmentEngine"] = None,
+                             verifiers_per_question: int = 1):
         """
         Distribute generated questions to the messaging system (Kafka).
 
+        With an assignment engine, each stored question (one with a
+        ``question_id``) is registered and routed to its first verifiers.
+
         :param questions: List of generated verification questions
+        :param engine: Optional assignment engine tracking verdict confidence
+        :param verifiers_per_question: Verifiers assigned to each new question
         """
         try:
             # Placeholder for Kafka message distribution
             # In a real implementation, this would publish to a Kafka topic
             for question in questions:
-                self.logger.info(f"Generated Question: {question['question_text']}")
+                if engine is not None and question.get("question_id") is not None:
+                    engine.add_question(question["token_id"], question["question_id"])
+                    question["assigned_to"] = engine.pick_verifiers(question["question_id"], verifiers_per_question)
+                self.logger.info("Generated Question: %s", question['question_text'])
         except Exception as e:
-            self.logger.error(f"Question distribution error: {e}")
+            self.logger.error("Question distribution error: %s", e)
 
-    def process_token_questions(self, token: Token, context: Dict[str, str]):
+    def process_token_questions(self, token: "Token", context: Any,
+                                engine: Optional["AssignmentEngine"] = None):
         """
         Full workflow for generating and distributing verification questions.
 
         :param token: Token model instance
         :param context: Additional context about the token
+        :param engine: Optional assignment engine routing the questions
         """
         questions = self.generate_verification_questions(token, context)
-        self.distribute_questions(questions)
+        self.distribute_questions(questions, engine)
         return questions
\ No newline at end of file
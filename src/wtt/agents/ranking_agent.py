@@ -2,11 +2,15 @@ import os
 import logging
 from typing import Dict, List, Optional, Any
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database.config import db_session
+from ..database.queries import leaderboard_query
 from ..models.user import User
+from ..monitoring.metrics import stage_timer
+from ..verification.consensus import CORRECT_REWARD, CORRECT_SCORE, WRONG_PENALTY
+
+users = User.__table__
 
 class UserRankingAgent:
     def __init__(self):
@@ -14,109 +18,81 @@ class UserRankingAgent:
         Initialize the User Ranking and Reward Agent.
         """
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
 
-    def process_user_answer(self,
-                             user_id: int,
-                             question_id: int,
-                             answer: bool,
-                             expected_answer: bool) -> Dict[str, float]:
+    async def process_user_answer(self,
+                                  db: AsyncSession,
+                                  user_id: int,
+                                  question_id: int,
+                                  answer: bool,
+                                  expected_answer: Optional[bool] = None) -> Dict[str, float]:
         """
         Process a user's answer and calculate their verification score.
 
+        Without an expected answer only the verification is counted; accuracy,
+        score and rewards are then left to the consensus job, which grades
+        answers in bulk once their question's verdict is final. The
+        update is not committed: the caller commits it together with the answer.
+
+        :param db: Session of the request recording the answer
         :param user_id: ID of the user answering
         :param question_id: ID of the verification question
         :param answer: User's submitted answer
-        :param expected_answer: Correct/expected answer
+        :param expected_answer: Correct/expected answer, if already known
         :return: Updated user metrics
+        :raises ValueError: If the user does not exist
         """
-        session = db_session()
-        try:
-            user = session.query(User).filter_by(id=user_id).first()
-
-            if not user:
-                raise ValueError(f"User with ID {user_id} not found")
-
-            # Calculate accuracy
+        total = func.coalesce(users.c.total_verifications, 0) + 1
+        values = {"total_verifications": total}
+        if expected_answer is not None:
             is_correct = answer == expected_answer
+            # Right-hand sides read the row before the update
+            score = func.coalesce(users.c.verification_score, 0.0) + (
+                CORRECT_SCORE if is_correct else -WRONG_PENALTY)
+            values["verification_score"] = score
+            values["accuracy_rate"] = score / total * 100
+            values["total_rewards"] = func.coalesce(users.c.total_rewards, 0.0) + (CORRECT_REWARD if is_correct else 0.0)
+
+        with stage_timer("ranking_agent", "update_user"):
+            result = await db.execute(
+                update(users)
+                .where(users.c.id == user_id)
+                .values(**values)
+                .returning(users.c.verification_score, users.c.total_verifications,
+                           users.c.accuracy_rate, users.c.total_rewards)
+            )
+            row = result.first()
+        if row is None:
+            raise ValueError(f"User with ID {user_id} not found")
+        return dict(row._mapping)
 
-            # Update user metrics
-            user.total_verifications += 1
-            user.verification_score += 1.0 if is_correct else -0.5
-
-            # Recalculate accuracy rate
-            user.accuracy_rate = (user.verification_score / user.total_verifications) * 100
-
-            # Reward calculation (simplified)
-            reward_amount = 10.0 if is_correct else 0.0
-            user.total_rewards += reward_amount
-
-            session.commit()
-
-            return {
-                'verification_score': user.verification_score,
-                'total_verifications': user.total_verifications,
-                'accuracy_rate': user.accuracy_rate,
-                'total_rewards': user.total_rewards
-            }
-
-        except Exception as e:
-            session.rollback()
-            self.logger.error(f"Error processing user answer: {e}")
-            raise
-        finally:
-            session.close()
-
-    def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+    async def get_leaderboard(self, db: AsyncSession, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Retrieve the top users based on verification score.
 
         :param limit: Number of top users to retrieve
         :return: List of top users with their metrics
         """
-        session = db_session()
-        try:
-            top_users = (
-                session.query(User)
-                .order_by(User.verification_score.desc())
-                .limit(limit)
-                .all()
-            )
-
-            return [
-                {
-                    'username': user.username,
-                    'verification_score': user.verification_score,
-                    'accuracy_rate': user.accuracy_rate,
-                    'total_rewards': user.total_rewards
-                }
-                for user in top_users
-            ]
-
-        except Exception as e:
-            self.logger.error(f"Error retrieving leaderboard: {e}")
-            return []
-        finally:
-            session.close()
+        with stage_timer("ranking_agent", "leaderboard_query"):
+            result = await db.execute(leaderboard_query(limit))
+        return [dict(row._mapping) for row in result]
 
-    def distribute_rewards(self):
+    async def distribute_rewards(self, db: AsyncSession):
         """
         Distribute rewards to top-performing users.
         This method would typically interact with a token contract or reward system.
         """
         try:
-            top_users = self.get_leaderboard(limit=5)
+            top_users = await self.get_leaderboard(db, limit=5)
 
             # Placeholder for actual reward distribution logic
             for user in top_users:
                 self.logger.info(
-                    f"Reward Distribution: {user['username']} - "
-                    f"Score: {user['verification_score']}, "
-                    f"Reward: {user['total_rewards']} WTT"
+                    "Reward Distribution: %s - Score: %s, Reward: %s WTT",
+                    user['username'], user['verification_score'], user['total_rewards']
                 )
 
         except Exception as e:
-            self.logger.error(f"Reward distribution error: {e}")
+            self.logger.error("Reward distribution error: %s", e)
 
     def notify_user(self, user_id: int, message: str):
         """
@@ -127,4 +103,4 @@ class UserRankingAgent:
         """
         # Placeholder for notification system
         # In a real implementation, this would use a messaging service
-        self.logger.info(f"Notification for User {user_id}: {message}")
\ No newline at end of file
+        self.logger.info("Notification for User %s: %s", user_id, message)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import heapq
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_WORD = re.compile(r"[a-z0-9]+")
+_TRACKING_PARAMS = {"ref", "fbclid", "gclid"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for deduplication: lowercase host without
+    ``www.``, no fragment, no tracking parameters, no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query)
+        if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS
+    ))
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme,
+                       host, parts.path.rstrip("/"), query, ""))
+
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def shingles(text: str, size: int = 5) -> Set[int]:
+    """
+    Hashed word ``size``-shingles of a text.
+    """
+    tokens = words(text)
+    if len(tokens) < size:
+        return {zlib.crc32(" ".join(tokens).encode())} if tokens else set()
+    return {zlib.crc32(" ".join(tokens[i:i + size]).encode()) for i in range(len(tokens) - size + 1)}
+
+
+class MinHashSketch:
+    """
+    Bottom-k MinHash sketch: the ``k`` smallest shingle hashes of a document.
+
+    One hash per shingle instead of one per permutation keeps sketching cheap
+    for the few dozen snippets of a research run.
+    """
+
+    def __init__(self, text: str, k: int = 64, shingle_size: int = 5):
+        self.k = k
+        self.hashes = frozenset(heapq.nsmallest(k, shingles(text, shingle_size)))
+
+    def similarity(self, other: "MinHashSketch") -> float:
+        """
+        Estimated Jaccard similarity of the two documents.
+        """
+        if not self.hashes or not other.hashes:
+            return 0.0
+        union_sketch = heapq.nsmallest(min(self.k, other.k), self.hashes | other.hashes)
+        shared = sum(1 for value in union_sketch if value in self.hashes and value in other.hashes)
+        return shared / len(union_sketch)
+
+
+def deduplicate(results: Iterable[Dict[str, Any]], threshold: float = 0.8) -> List[Dict[str, Any]]:
+    """
+    Drop results with the same normalized URL or near-duplicate content,
+    keeping the highest scored copy.
+
+    :param threshold: Estimated Jaccard similarity above which contents are duplicates
+    """
+    by_url: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        key = normalize_url(result["url"]) if result.get("url") else f"id:{id(result)}"
+        kept = by_url.get(key)
+        if kept is None or result.get("score", 0) > kept.get("score", 0):
+            by_url[key] = result
+
+    unique: List[Dict[str, Any]] = []
+    sketches: List[MinHashSketch] = []
+    for result in sorted(by_url.values(), key=lambda r: r.get("score", 0), reverse=True):
+        sketch = MinHashSketch(result.get("content", ""))
+        if any(sketch.similarity(seen) >= threshold for seen in sketches):
+            continue
+        unique.append(result)
+        sketches.append(sketch)
+    return unique
+
+
+def rank_results(results: List[Dict[str, Any]], token_name: str,
+                 aspect_terms: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Order results by relevance to the token: the search engine's score,
+    mentions of the token name, and coverage of the terms of the aspect
+    (contract, audit, ...) the result was found for.
+
+    Each result gets a ``relevance`` field.
+    """
+    name_terms = set(words(token_name))
+    aspect_terms = aspect_terms or {}
+    for result in results:
+        text_terms = set(words(f"{result.get('title', '')} {result.get('content', '')}"))
+        name_hit = len(name_terms & text_terms) / len(name_terms) if name_terms else 0.0
+        terms = set(aspect_terms.get(result.get("aspect"), []))
+        aspect_hit = len(terms & text_terms) / len(terms) if terms else 0.0
+        result["relevance"] = round(
+            0.5 * float(result.get("score", 0.0)) + 0.3 * name_hit + 0.2 * aspect_hit, 4
+        )
+    return sorted(results, key=lambda r: r["relevance"], reverse=True)
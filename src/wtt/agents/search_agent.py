@@ -1,91 +1,204 @@
 import os
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Optional, Any
 from datetime import datetime
-from tavily import TavilyClient
-from pydantic import BaseModel, Field
+
+from ..cache.shared import SharedCache
+from ..cache.sources import SourceCache, SourceFetcher
+from ..monitoring.metrics import stage_timer
+from .formatting import ResearchFormatter
+from .research_merge import deduplicate, rank_results
+from ..upstream.guard import UpstreamGuard, UpstreamUnavailableError, get_guard
+from ..upstream.mode import local_mode
+from ..upstream.ratelimit import INTERACTIVE, UpstreamRateLimiter, get_rate_limiter
 
 class SearchExtractionAgent:
-    def __init__(self, tavily_api_key: Optional[str] = None):
+    # Targeted queries issued in parallel for each research run
+    SEARCH_ASPECTS = {
+        "overview": "{token} cryptocurrency token blockchain details technical analysis",
+        "contract": "{token} token contract address blockchain explorer",
+        "official": "{token} token official website whitepaper documentation",
+        "audit": "{token} token smart contract security audit",
+        "scam": "{token} token scam rug pull warning reports",
+    }
+    # Terms a relevant result for each aspect is expected to mention
+    ASPECT_TERMS = {
+        "contract": ["contract", "address", "explorer"],
+        "official": ["official", "website", "whitepaper", "docs"],
+        "audit": ["audit", "security", "vulnerability"],
+        "scam": ["scam", "rug", "warning", "fraud"],
+    }
+
+    def __init__(self, tavily_api_key: Optional[str] = None, rate_limiter: Optional[UpstreamRateLimiter] = None,
+                 cache: Optional[SharedCache] = None, guard: Optional[UpstreamGuard] = None):
         """
         Initialize the Search Extraction Agent with Tavily configuration.
+
+        :param guard: Circuit breaker and concurrency limit (default: the process-wide Tavily guard)
+        :param rate_limiter: Quota of the API key (default: the one shared by every worker)
+        :param cache: Cache tier behind the source pages (default: the process-wide shared cache)
         """
         self.tavily_api_key = tavily_api_key or os.getenv('TAVILY_API_KEY')
-        self.client = TavilyClient(api_key=self.tavily_api_key)
+        if local_mode():
+            from ..upstream.local import LocalSearchClient
+
+            self.client = LocalSearchClient()
+        else:
+            # Deferred import: only pay for the client library when an agent is built
+            from tavily import TavilyClient
+
+            self.client = TavilyClient(api_key=self.tavily_api_key)
+            # Optional search endpoint override (e.g. a local stand-in for benchmarks)
+            if os.getenv('TAVILY_API_URL'):
+                self.client.base_url = os.getenv('TAVILY_API_URL')
+        # Circuit breaker and adaptive concurrency limit shared by all agents in the process
+        self.guard = guard or get_guard("tavily")
+        # Quota shared by every worker using the same API key
+        self.rate_limiter = rate_limiter or get_rate_limiter("tavily", self.tavily_api_key)
+        # Raw page content comes from the URL-level source cache, not from every search
+        self.source_fetcher = SourceFetcher(SourceCache(cache))
+        self.raw_content_sources = int(os.getenv('SOURCE_FETCH_LIMIT', '5'))
+        self.formatter = ResearchFormatter()
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
 
     def generate_search_query(self, token_name: str) -> str:
         """
         Generate an optimized search query for a given token.
         """
-        return f"{token_name} cryptocurrency token blockchain details technical analysis"
+        return self.SEARCH_ASPECTS["overview"].format(token=token_name)
+
+    def generate_search_queries(self, token_name: str) -> Dict[str, str]:
+        """
+        Generate one targeted query per research aspect.
+
+        :return: Aspect name to query
+        """
+        return {aspect: template.format(token=token_name) for aspect, template in self.SEARCH_ASPECTS.items()}
+
+    async def multi_extract(self, queries: Dict[str, str], priority: str = INTERACTIVE) -> Dict[str, Dict]:
+        """
+        Run all queries concurrently, so several queries take about as long as one.
+
+        :return: Aspect name to search results, for the queries that succeeded
+        :raises UpstreamUnavailableError: If every query failed and any was shed
+        :raises Exception: The first search error, if every query failed
+        """
+        aspects = list(queries)
+        outcomes = await asyncio.gather(
+            *(self.web_extract(queries[aspect], priority) for aspect in aspects),
+            return_exceptions=True
+        )
+        results, shed, failed = {}, [], []
+        for aspect, outcome in zip(aspects, outcomes):
+            if isinstance(outcome, UpstreamUnavailableError):
+                shed.append(outcome)
+            elif isinstance(outcome, Exception):
+                self.logger.error("Search for aspect %s failed: %s", aspect, outcome)
+                failed.append(outcome)
+            else:
+                results[aspect] = outcome
+        if not results:
+            # Shed first: callers fall back to stored research instead of retrying
+            if shed:
+                raise shed[0]
+            if failed:
+                raise failed[0]
+        return results
+
+    def merge_results(self, token_name: str, results_by_aspect: Dict[str, Dict]) -> Dict[str, Any]:
+        """
+        Merge per-aspect results: drop duplicate URLs and near-duplicate
+        contents, then rank what remains by relevance to the token.
+        """
+        answer = next(
+            (results_by_aspect[aspect]['answer'] for aspect in self.SEARCH_ASPECTS
+             if aspect in results_by_aspect and results_by_aspect[aspect].get('answer')),
+            ''
+        )
+        tagged = [
+            {**result, 'aspect': aspect}
+            for aspect, search_results in results_by_aspect.items()
+            for result in search_results.get('results', [])
+        ]
+        return {
+            'answer': answer,
+            'results': rank_results(deduplicate(tagged), token_name, self.ASPECT_TERMS)
+        }
 
-    async def web_extract(self, query: str) -> List[Dict[str, Any]]:
+    async def web_extract(self, query: str, priority: str = INTERACTIVE) -> Dict[str, Any]:
         """
         Extract web information using Tavily search.
+
+        :param priority: Rate-limit priority (interactive requests go before background refreshes)
+        :return: Tavily's ``answer`` and its list of ``results``
+        :raises UpstreamUnavailableError: If the search upstream is currently shed
         """
         try:
-            search_result = self.client.search(
+            await self.rate_limiter.acquire(priority)
+            search_result = await self.guard.call(
+                self.client.search,
                 query=query,
                 search_depth="advanced",
                 max_results=5,
                 include_answer=True,
-                include_raw_content=True,
+                include_raw_content=False,
                 include_images=False
             )
-            
+
             return {
                 'answer': search_result.get('answer', ''),
                 'results': search_result.get('results', [])
             }
             
+        except UpstreamUnavailableError as e:
+            self.logger.warning("Web extraction skipped: %s", e)
+            raise
         except Exception as e:
-            self.logger.error(f"Web extraction error: {e}")
-            return {'answer': '', 'results': []}
+            # The guard has recorded the failure; an empty result would be
+            # cached and stored as if it were research
+            self.logger.error("Web extraction error: %s", e)
+            raise
 
     def format_token_information(self, search_results: Dict) -> str:
         """
-        Format search results into a comprehensive paragraph.
+        Format search results into the plain-text research view.
         """
-        main_answer = search_results['answer']
-        
-        # Compile additional information from results
-        additional_info = []
-        for result in search_results['results']:
-            if 'content' in result:
-                additional_info.append(result['content'])
+        return self.formatter.format(search_results).text
 
-        # Combine all information into a structured paragraph
-        formatted_text = f"""
-{main_answer}
+    async def process_token_data(self, token_name: str, priority: str = INTERACTIVE) -> Dict[str, Any]:
+        """
+        Process token data and return structured research sections
+        (answer, details, sources).
 
-Additional Details:
-{' '.join(additional_info[:3])}  # Limiting to first 3 results to keep it concise
+        :param token_name: Name of the token to research
+        :param priority: Rate-limit priority of the upstream calls
+        :raises UpstreamUnavailableError: If the search upstream is shed
+            (callers fall back to stored research)
+        :raises Exception: If the research failed; nothing should be cached
+            or stored for it
+        """
+        try:
+            # Generate and execute the targeted searches in parallel
+            with stage_timer("search_agent", "generate_query"):
+                search_queries = self.generate_search_queries(token_name)
+            with stage_timer("search_agent", "web_extract"):
+                results_by_aspect = await self.multi_extract(search_queries, priority)
+            with stage_timer("search_agent", "merge"):
+                search_results = self.merge_results(token_name, results_by_aspect)
+            with stage_timer("search_agent", "fetch_sources"):
+                await self.source_fetcher.attach_raw_content(
+                    search_results['results'][:self.raw_content_sources]
+                )
 
-Sources:
-"""
-        # Add sources
-        for result in search_results['results']:
-            if 'url' in result:
-                formatted_text += f"- {result['url']}\n"
+            # Structured sections; the text view is only rendered on demand
+            with stage_timer("search_agent", "format"):
+                formatted_info = self.formatter.format(search_results)
 
-        return formatted_text
+            return formatted_info.to_dict()
 
-    async def process_token_data(self, token_name: str) -> str:
-        """
-        Process token data and return formatted information.
-        """
-        try:
-            # Generate and execute search
-            search_query = self.generate_search_query(token_name)
-            search_results = await self.web_extract(search_query)
-            
-            # Format results into a comprehensive paragraph
-            formatted_info = self.format_token_information(search_results)
-            
-            return formatted_info
-            
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
-            self.logger.error(f"Error processing token data: {e}")
-            return f"Error retrieving information for {token_name}: {str(e)}"
\ No newline at end of file
+            self.logger.error("Error processing token data for %s: %s", token_name, e)
+            raise
\ No newline at end of file
@@ -0,0 +1,35 @@
+import math
+import re
+from typing import Tuple
+
+# Words and single punctuation marks; long words count as several BPE-like
+# pieces of about four characters, which tracks GPT tokenizers closely enough
+# for budgeting without a model-specific vocabulary.
+_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+CHARS_PER_TOKEN = 4
+
+
+def _piece_tokens(piece: str) -> int:
+    return max(1, math.ceil(len(piece) / CHARS_PER_TOKEN))
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in a text.
+    """
+    return sum(_piece_tokens(match.group()) for match in _PIECE.finditer(text))
+
+
+def truncate_to_budget(text: str, budget: int, ellipsis: str = "…") -> Tuple[str, int]:
+    """
+    Cut a text after at most ``budget`` estimated tokens.
+
+    :return: The (possibly truncated) text and the tokens it uses
+    """
+    used = 0
+    for match in _PIECE.finditer(text):
+        cost = _piece_tokens(match.group())
+        if used + cost > budget:
+            return text[:match.start()].rstrip() + ellipsis, used
+        used += cost
+    return text, used
@@ -0,0 +1,33 @@
+from functools import lru_cache
+
+from ..agents.question_agent import QuestionGenerationAgent
+from ..agents.ranking_agent import UserRankingAgent
+from ..agents.search_agent import SearchExtractionAgent
+from ..verification.assignment import AssignmentEngine
+
+
+# Agents are long-lived: they are built on first use and then shared by every
+# request in the worker, so nothing heavy happens at import time or per request.
+
+@lru_cache(maxsize=None)
+def get_search_agent() -> SearchExtractionAgent:
+    """Dependency returning the worker's shared search agent."""
+    return SearchExtractionAgent()
+
+
+@lru_cache(maxsize=None)
+def get_question_agent() -> QuestionGenerationAgent:
+    """Dependency returning the worker's shared question generation agent."""
+    return QuestionGenerationAgent()
+
+
+@lru_cache(maxsize=None)
+def get_ranking_agent() -> UserRankingAgent:
+    """Dependency returning the worker's shared ranking agent."""
+    return UserRankingAgent()
+
+
+@lru_cache(maxsize=None)
+def get_assignment_engine() -> AssignmentEngine:
+    """Dependency returning the worker's question assignment engine."""
+    return AssignmentEngine()
@@ -1,42 +1,64 @@
 import os
+import math
 import logging
 import asyncio
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import select, text
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-import asyncpg
+from sqlalchemy.orm import configure_mappers
 from dotenv import load_dotenv
-from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from tavily import TavilyClient
 
-from ..database.config import get_db, init_db, engine
+from ..database.config import dispose_engine, engine, get_db, load_models, warm_up_pool
+from ..database.counters import increment_counter, read_counters
+from ..database.queries import (
+    leaderboard_query, list_tokens, load_token_detail, load_token_version, stored_research_query,
+)
 from ..models.token import Token
 from ..models.token_extracted_data import TokenExtractedData
 from ..models.user import User
+from ..models.verification_answer import VerificationAnswer
 from ..agents.search_agent import SearchExtractionAgent
 from ..agents.ranking_agent import UserRankingAgent
+from ..background.jobs import build_scheduler
+from ..cache.research import get_cached_research, store_research
+from ..cache.shared import get_cache
+from ..monitoring.logs import configure_logging
+from ..monitoring.metrics import REGISTRY, CONTENT_TYPE_LATEST, register_pool_metrics, stage_timer
+from ..monitoring.multiprocess import MultiprocessMetrics
+from ..monitoring.profiler import ProfileStore
+from .dependencies import get_assignment_engine, get_ranking_agent, get_search_agent
+from .middleware import (
+    AdmissionControlMiddleware,
+    CompressionMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RequestIdMiddleware,
+)
+from .responses import PrecomputedJSONResponse, dumps, splice_json
+from .security import require_admin_key
+from ..upstream.guard import UpstreamUnavailableError
+from ..verification.assignment import AssignmentEngine
+from ..verification.questions import question_state_query, sync_open_questions
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Tavily client
-tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-
-# Configure logging AVANT toute utilisation
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger("wtt_api")  # Donner un nom spécifique au logger
+# JSON logs through a background writer thread (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT)
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI application
 app = FastAPI(
     title=os.getenv('APP_TITLE', "World Token Tracker (WTT)"),
     description="AI-powered token verification platform",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
@@ -48,61 +70,239 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for large (research) bodies
+app.add_middleware(CompressionMiddleware)
+
+# Request latency histograms per route
+app.add_middleware(MetricsMiddleware)
+register_pool_metrics(engine.pool)
+# Under several workers, /metrics merges every worker's series
+multiprocess_metrics = MultiprocessMetrics.from_env()
+
+# Opt-in sampling profiler (per request with admin key, or PROFILE_SAMPLE_RATE)
+profile_store = ProfileStore()
+app.add_middleware(ProfilingMiddleware, store=profile_store)
+
+# Per-client rate limits and concurrency cap on expensive routes
+app.add_middleware(AdmissionControlMiddleware)
+
+# Request id for log correlation (outermost, so every layer's records carry it)
+app.add_middleware(RequestIdMiddleware)
+
 class TokenResearchRequest(BaseModel):
     token_name: str = Field(..., description="Name of the token to research")
     search_depth: str = Field(default="advanced", description="Depth of search: 'basic' or 'advanced'")
 
+# Schema creation is an explicit step (python -m wtt.database.migrate upgrade)
+# so that booting a worker does no DDL or extra round trips.
+
+# Every worker runs the scheduler; only the leader-lock holder executes jobs.
+scheduler = build_scheduler(engine)
+
+# All models share one registry; configure their relationships at import
+load_models()
+configure_mappers()
+
 @app.on_event("startup")
-async def startup_event():
-    """Test database connection on startup and initialize database"""
+async def start_background_jobs():
+    await warm_up_pool()
+    if scheduler is not None:
+        scheduler.start()
+    if multiprocess_metrics is not None:
+        multiprocess_metrics.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    if scheduler is not None:
+        await scheduler.stop()
+    if multiprocess_metrics is not None:
+        await asyncio.to_thread(multiprocess_metrics.stop)
+    await get_cache().close()
+    await dispose_engine()
+
+async def load_stored_research(db: AsyncSession, token_id: Optional[int] = None,
+                               token_name: Optional[str] = None):
+    """
+    Load the most recent stored research for a token, used as a stale
+    fallback while the search upstream is unavailable.
+    """
+    result = await db.execute(stored_research_query(token_id, token_name))
+    return result.first()
+
+def upstream_unavailable(error: UpstreamUnavailableError) -> HTTPException:
+    """Build the 503 returned when an upstream is shed and nothing is stored."""
+    return HTTPException(
+        status_code=503,
+        detail=f"Research temporarily unavailable: {error}",
+        headers={"Retry-After": str(max(math.ceil(error.retry_after), 1))}
+    )
+
+@app.get("/tokens")
+async def get_tokens(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    type: Optional[str] = None,
+    is_native: Optional[bool] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List tokens by holder count, paginated with an opaque ``next_cursor``.
+    """
     try:
-        # Initialize database tables
-        await init_db()
-        
-        # Test database connection using SQLAlchemy engine
-        async with engine.connect() as conn:
-            await conn.execute(text("SELECT 1"))
-            logger.info("Successfully connected to the database!")
+        with stage_timer("list_tokens", "db_query"):
+            page = await list_tokens(db, limit, cursor, token_type=type, is_native=is_native)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(page)
 
-    except Exception as e:
-        logger.error(f"Database connection failed: {e}")
-        raise
+@app.get("/tokens/{token_id}/counters")
+async def get_token_counters(token_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Current humans and holder counts, including increments not yet folded.
+    """
+    counters = await read_counters(db, [token_id])
+    if token_id not in counters:
+        raise HTTPException(status_code=404, detail="Token not found")
+    return ORJSONResponse({"token_id": token_id, **counters[token_id]})
+
+@app.get("/tokens/{token_id}")
+async def get_token_detail(token_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Token page: metadata, latest stored research and verification stats from
+    one query, without calling any upstream.
+
+    The ETag is the token's version. A revalidation reads only the version
+    inputs first, so an unchanged page costs a few index probes and a 304;
+    the full page query runs only when the version differs.
+    """
+    cache_control = f"public, max-age={int(os.getenv('TOKEN_DETAIL_MAX_AGE_SECONDS', '15'))}"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        with stage_timer("token_detail", "version_query"):
+            version = await load_token_version(db, token_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Token not found")
+        if if_none_match == f'"{version}"':
+            return Response(status_code=304, headers={"ETag": if_none_match, "Cache-Control": cache_control})
+
+    with stage_timer("token_detail", "db_query"):
+        detail = await load_token_detail(db, token_id)
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Token not found")
+
+    headers = {"ETag": f'"{detail["version"]}"', "Cache-Control": cache_control}
+    with stage_timer("token_detail", "serialize"):
+        body = dumps(detail)
+    return PrecomputedJSONResponse(body, headers=headers)
+
+@app.post("/tokens/{token_id}/humans", dependencies=[Depends(require_admin_key)])
+async def record_human_verification(token_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Count one more verified human for a token (sharded, no row-lock contention).
+
+    Called by the human-verification backend with the admin key: the count is
+    a trust signal, so clients cannot inflate it themselves.
+    """
+    try:
+        with stage_timer("record_human", "increment"):
+            await increment_counter(db, token_id, "humans")
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Token not found")
+    return ORJSONResponse({"status": "success", "token_id": token_id})
 
 @app.get("/tokens/verify/{token_id}")
-async def verify_token(token_id: int, db: AsyncSession = Depends(get_db)):
+async def verify_token(
+    token_id: int,
+    db: AsyncSession = Depends(get_db),
+    search_agent: SearchExtractionAgent = Depends(get_search_agent)
+):
     """Verify token endpoint"""
     try:
-        logger.info(f"Processing verification request for token_id: {token_id}")
+        logger.info("Processing verification request for token_id: %s", token_id)
 
         # Récupérer uniquement le nom du token
-        query = select(Token.name).where(Token.id == token_id)
-        result = await db.execute(query)
-        token_name = result.scalar_one_or_none()
+        with stage_timer("verify_token", "db_lookup"):
+            query = select(Token.name).where(Token.id == token_id)
+            result = await db.execute(query)
+            token_name = result.scalar_one_or_none()
 
         if not token_name:
-            logger.warning(f"Token with id {token_id} not found")
+            logger.warning("Token with id %s not found", token_id)
             raise HTTPException(status_code=404, detail="Token not found")
 
-        logger.info(f"Found token name: {token_name}")
+        logger.info("Found token name: %s", token_name)
+
+        # Research shared by any worker is reused while fresh
+        cached = await get_cached_research(token_name)
+        if cached is not None:
+            return PrecomputedJSONResponse(
+                splice_json({"token_name": token_name}, {"information": cached})
+            )
 
-        # Initialiser le search agent et obtenir les informations
-        search_agent = SearchExtractionAgent()
-        token_information = await search_agent.process_token_data(token_name)
+        # Obtenir les informations via le search agent partagé
+        try:
+            token_information = await search_agent.process_token_data(token_name)
+        except UpstreamUnavailableError as e:
+            stored = await load_stored_research(db, token_id=token_id)
+            if stored is None:
+                raise upstream_unavailable(e)
+            logger.warning("Serving stored research for token %s: %s", token_id, e)
+            return {
+                "token_name": token_name,
+                "information": stored.research_results,
+                "stale": True,
+                "researched_at": stored.created_at
+            }
 
-        logger.info(f"Successfully processed token {token_id}")
-        return {
-            "token_name": token_name,
-            "information": token_information
-        }
+        payload = await store_research(token_name, token_information)
+        logger.info("Successfully processed token %s", token_id)
+        return PrecomputedJSONResponse(
+            splice_json({"token_name": token_name}, {"information": payload})
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing token {token_id}: {str(e)}")
+        logger.error("Error processing token %s: %s", token_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    """
+    Simple health check endpoint.
+    """
+    return {"status": "healthy", "version": app.version}
+
+@app.get("/metrics")
+async def metrics():
+    """Expose application metrics in the Prometheus text format."""
+    if multiprocess_metrics is not None:
+        # Reads the other workers' snapshot files
+        content = await asyncio.to_thread(multiprocess_metrics.render)
+    else:
+        content = REGISTRY.render()
+    return Response(content=content, media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin_key)])
+async def list_profiles():
+    """List stored request profiles, most recent first."""
+    return {"profiles": profile_store.list()}
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin_key)])
+async def get_profile(profile_id: str, format: str = "speedscope"):
+    """
+    Download a stored profile as speedscope JSON or collapsed stacks.
+    """
+    path = profile_store.path_for(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if format == "speedscope" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
+
+LEADERBOARD_CACHE = "leaderboard"
+LEADERBOARD_KEY = f"{LEADERBOARD_CACHE}:top"
 
 @app.post("/tokens/answer")
 async def submit_token_verification(
@@ -110,58 +310,99 @@ async def submit_token_verification(
     question_id: int,
     user_id: int,
     answer: bool,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    ranking_agent: UserRankingAgent = Depends(get_ranking_agent),
+    assignment: AssignmentEngine = Depends(get_assignment_engine)
 ):
     """
     Submit a user's verification answer for a token.
-    """
-    ranking_agent = UserRankingAgent()
 
-    # In a real implementation, you'd retrieve the expected answer from the database
-    expected_answer = True  # Placeholder
+    The question must exist and must not have a final verdict; the answer
+    and the user's metrics are committed together, only once both are
+    written.
+    """
+    state = (await db.execute(question_state_query(question_id))).first()
+    if state is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    if state.final:
+        assignment.close_question(question_id)
+        raise HTTPException(status_code=409, detail="Question already resolved")
+    if state.token_id != token_id:
+        raise HTTPException(status_code=400, detail="Question is about another token")
 
     try:
-        user_metrics = ranking_agent.process_user_answer(
-            user_id,
-            question_id,
-            answer,
-            expected_answer
+        # Stored ungraded: the consensus job grades answers in bulk
+        stored = await db.execute(
+            insert(VerificationAnswer.__table__)
+            .values(question_id=question_id, token_id=token_id, user_id=user_id, answer=answer)
+            .on_conflict_do_nothing(constraint="uq_verification_answers_question_user")
         )
+        if stored.rowcount == 0:
+            raise HTTPException(status_code=409, detail="Answer already recorded")
 
-        return {
-            "status": "success",
-            "user_metrics": user_metrics
-        }
-
+        user_metrics = await ranking_agent.process_user_answer(db, user_id, question_id, answer)
+        await db.commit()
+    except HTTPException:
+        await db.rollback()
+        raise
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/leaderboard")
-async def get_leaderboard():
+    await get_cache().delete(LEADERBOARD_KEY)
+    response = {
+        "status": "success",
+        "user_metrics": user_metrics
+    }
+    assignment.add_question(state.token_id, question_id)
+    response["question"] = assignment.record_answer(question_id, user_id, answer)
+    return response
+
+@app.get("/questions/next")
+async def get_next_question(
+    user_id: int,
+    token_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    assignment: AssignmentEngine = Depends(get_assignment_engine)
+):
     """
-    Retrieve the current user leaderboard.
+    Assign the open question this user's answer would help most.
     """
-    ranking_agent = UserRankingAgent()
-    leaderboard = ranking_agent.get_leaderboard()
+    if not assignment.has_user(user_id):
+        users = User.__table__
+        result = await db.execute(
+            select(users.c.accuracy_rate, users.c.total_verifications).where(users.c.id == user_id))
+        row = result.first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        assignment.add_user(user_id, row.accuracy_rate, row.total_verifications or 0)
 
-    return {
-        "leaderboard": leaderboard
-    }
+    # Questions are generated by the leader's job; pick up any new ones
+    await sync_open_questions(db, assignment)
+    question_id = assignment.next_question(user_id, token_id)
+    if question_id is None:
+        return {"question": None}
+    return {"question": assignment.question_status(question_id)}
 
-# Monitoring and Health Check
-@app.get("/health")
-async def health_check():
+@app.get("/leaderboard")
+async def get_leaderboard(db: AsyncSession = Depends(get_db)):
     """
-    Simple health check endpoint.
+    Retrieve the current user leaderboard.
     """
-    return {
-        "status": "healthy",
-        "version": "0.1.0"
-    }
+    cache = get_cache()
+    payload = await cache.lookup(LEADERBOARD_CACHE, LEADERBOARD_KEY)
+    if payload is None:
+        # On the request's session: a failed query surfaces as an error, not an empty board
+        with stage_timer("leaderboard", "query"):
+            result = await db.execute(leaderboard_query())
+        payload = dumps({"leaderboard": [dict(row._mapping) for row in result]})
+        await cache.set(LEADERBOARD_KEY, payload,
+                        float(os.getenv("LEADERBOARD_CACHE_TTL_SECONDS", "30")))
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+    return PrecomputedJSONResponse(payload)
 
 class TokenResearchRequest(BaseModel):
     token_name: str = Field(..., description="Name of the token to research")
@@ -170,14 +411,14 @@ class TokenResearchRequest(BaseModel):
 @app.post("/research/token")
 async def research_token(
     request: TokenResearchRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    search_agent: SearchExtractionAgent = Depends(get_search_agent)
 ):
     """Research a token and store the results"""
     try:
-        logger.info(f"Starting research for token: {request.token_name}")
-        
-        # Initialize search agent with retry logic
-        search_agent = SearchExtractionAgent()
+        logger.info("Starting research for token: %s", request.token_name)
+
+        # Retry logic around the shared search agent
         max_retries = 3
         retry_delay = 1  # seconds
         
@@ -187,49 +428,59 @@ async def research_token(
                 token_information = await search_agent.process_token_data(request.token_name)
                 
                 # If successful, store the results
-                token = Token(name=request.token_name)
-                db.add(token)
-                await db.commit()
-                await db.refresh(token)
-                
-                extracted_data = TokenExtractedData(
-                    token_id=token.id,
-                    token_name=request.token_name,
-                    research_results=token_information
-                )
-                db.add(extracted_data)
-                await db.commit()
+                with stage_timer("research_token", "db_commit"):
+                    token = Token(name=request.token_name)
+                    db.add(token)
+                    await db.commit()
+                    await db.refresh(token)
+
+                    extracted_data = TokenExtractedData(
+                        token_id=token.id,
+                        token_name=request.token_name,
+                        research_results=token_information
+                    )
+                    db.add(extracted_data)
+                    await db.commit()
+                payload = await store_research(request.token_name, token_information)
                 
+                return PrecomputedJSONResponse(splice_json(
+                    {"status": "success", "token_id": token.id},
+                    {"research_results": payload}
+                ))
+
+            except UpstreamUnavailableError as e:
+                # The upstream is being shed: retrying would only burn worker time
+                stored = await load_stored_research(db, token_name=request.token_name)
+                if stored is None:
+                    raise upstream_unavailable(e)
+                logger.warning("Serving stored research for %s: %s", request.token_name, e)
                 return {
-                    "status": "success",
-                    "token_id": token.id,
-                    "research_results": token_information
+                    "status": "stale",
+                    "research_results": stored.research_results,
+                    "researched_at": stored.created_at
                 }
-                
             except Exception as e:
                 if attempt == max_retries - 1:  # Last attempt
-                    logger.error(f"Error researching token {request.token_name}: {str(e)}")
+                    logger.error("Error researching token %s: %s", request.token_name, e)
                     raise HTTPException(
                         status_code=500,
                         detail=f"Failed to research token after {max_retries} attempts: {str(e)}"
                     )
                 else:
-                    logger.warning(f"Attempt {attempt + 1} failed, retrying in {retry_delay} seconds...")
+                    logger.warning("Attempt %s failed, retrying in %s seconds...", attempt + 1, retry_delay)
                     await asyncio.sleep(retry_delay)
                     retry_delay *= 2  # Exponential backoff
-                    
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing token research request: {str(e)}")
+        logger.error("Error processing token research request: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
-    
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
-    
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    from .server import main
+    main()
\ No newline at end of file
@@ -0,0 +1,457 @@
+import asyncio
+import gzip
+import hashlib
+import ipaddress
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from ..monitoring.logs import new_request_id, request_id_var
+from ..monitoring.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, REQUEST_LATENCY
+from ..monitoring.profiler import ProfileStore, SamplingProfiler
+from ..upstream.ratelimit import SharedBucketStore, TokenBucket
+from .security import ADMIN_KEY_HEADER, is_valid_admin_key, is_valid_client_key
+from .server import worker_count
+
+
+REQUEST_ID_HEADER = b"x-request-id"
+_REQUEST_ID_PATTERN = re.compile(rb"[A-Za-z0-9._-]{1,64}")
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware tagging each request with an id, taken from a well-formed
+    ``X-Request-ID`` header or generated, and echoed on the response.
+
+    The id lives in ``request_id_var`` for the whole request, so log records
+    from the agents, tasks and threads serving it carry it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"")
+        request_id = supplied.decode() if _REQUEST_ID_PATTERN.fullmatch(supplied) else new_request_id()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template.
+
+    Implemented as a plain ASGI callable rather than ``BaseHTTPMiddleware`` so
+    that it adds no extra task or body buffering to the request path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; using its path
+            # template keeps label cardinality bounded (no raw token ids).
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route_path, status_code).observe(
+                time.perf_counter() - start
+            )
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running the sampling profiler around selected requests.
+
+    A request is profiled when it carries ``X-Profile: 1`` (or ``?profile=1``)
+    together with a valid admin key, or when it falls into the sampled fraction
+    of traffic configured by ``PROFILE_SAMPLE_RATE``. Only one request is
+    profiled at a time so that profiling cannot pile up under load. The profile
+    id is returned in the ``X-Profile-Id`` response header.
+    """
+
+    def __init__(self, app, store: Optional[ProfileStore] = None,
+                 sample_rate: Optional[float] = None, interval: Optional[float] = None):
+        self.app = app
+        self.store = store or ProfileStore()
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.interval = interval if interval is not None else float(os.getenv("PROFILE_INTERVAL", "0.005"))
+        self._busy = asyncio.Lock()
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        flag = headers.get(b"x-profile", b"").decode() in ("1", "true")
+        if not flag:
+            query = parse_qs(scope.get("query_string", b"").decode())
+            flag = query.get("profile", [""])[0] in ("1", "true")
+        if not flag:
+            return False
+        return is_valid_admin_key(headers.get(ADMIN_KEY_HEADER.lower().encode(), b"").decode())
+
+    def _should_profile(self, scope) -> bool:
+        if self._requested(scope):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy.locked() or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async with self._busy:
+            profile_id = self.store.new_id()
+            profiler = SamplingProfiler(interval=self.interval)
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                await send(message)
+
+            started_at = datetime.utcnow().isoformat()
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profile = profiler.stop(metadata={
+                    "name": f"{scope['method']} {scope['path']}",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "started_at": started_at,
+                })
+                # Writing the files is blocking I/O; keep it off the event loop.
+                await asyncio.to_thread(self.store.save, profile, profile_id)
+
+
+class ConcurrencyGate:
+    """
+    Global concurrency cap with a bounded wait queue.
+    """
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        ADMISSION_QUEUE_DEPTH.set_function(lambda: self._waiting)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the gate can be built outside a running event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        """
+        :return: True once a slot is held, False if the queue is full or the wait timed out
+        """
+        semaphore = self._get_semaphore()
+        if not semaphore.locked():
+            # Free slot: acquire() returns without suspending.
+            await semaphore.acquire()
+            return True
+        if self._waiting >= self.max_queue:
+            return False
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiting -= 1
+
+    def release(self):
+        self._get_semaphore().release()
+
+
+# (method, path pattern, cost, expensive): expensive routes also pass the global concurrency gate.
+DEFAULT_ROUTE_COSTS: List[Tuple[str, str, float, bool]] = [
+    ("POST", r"^/research/token$", 10.0, True),
+    ("GET", r"^/tokens/verify/\d+$", 5.0, True),
+]
+
+EXEMPT_PATHS = ("/health", "/metrics")
+
+# Admission buckets in the shared rate limit file, next to the upstream ones
+SHARED_BUCKET_PREFIX = "admission:"
+SHARED_BUCKET_PRUNE_SECONDS = 60.0
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware enforcing per-client rate limits and a concurrency cap on
+    expensive routes.
+
+    Clients are identified by ``X-API-Key`` (hashed) when it is one of the
+    issued ``CLIENT_API_KEYS``, otherwise by peer IP (IPv6 by /64 prefix, the
+    block a single host usually controls). Each client gets a token bucket;
+    every route costs ``DEFAULT_ROUTE_COSTS`` tokens (1 by default). Expensive
+    routes must also obtain one of ``max_concurrent`` global slots, waiting in
+    a bounded queue; a request shed there gets its tokens back. Rejections
+    are answered with 429 and ``Retry-After`` before any routing, database or
+    upstream work happens, so cheap endpoints stay fast.
+
+    Under ``python -m wtt.api.server`` with several workers, buckets live in
+    the host-local rate limit file (``SharedBucketStore``) so a client has one
+    budget whichever worker accepts its connection, and the configured
+    ``ADMISSION_MAX_CONCURRENT``/``ADMISSION_MAX_QUEUE`` host totals are split
+    evenly between the workers.
+    """
+
+    def __init__(self, app, rate_per_second: Optional[float] = None, burst: Optional[float] = None,
+                 max_concurrent: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None,
+                 route_costs: Optional[List[Tuple[str, str, float, bool]]] = None,
+                 max_clients: int = 10000, store: Optional[SharedBucketStore] = None):
+        self.app = app
+        self.rate_per_second = rate_per_second if rate_per_second is not None else float(
+            os.getenv("ADMISSION_RATE_PER_SECOND", "5"))
+        self.burst = burst if burst is not None else float(os.getenv("ADMISSION_BURST", "20"))
+        workers = worker_count()
+        self.gate = ConcurrencyGate(
+            max_concurrent if max_concurrent is not None else math.ceil(
+                int(os.getenv("ADMISSION_MAX_CONCURRENT", "8")) / workers),
+            max_queue if max_queue is not None else math.ceil(
+                int(os.getenv("ADMISSION_MAX_QUEUE", "16")) / workers),
+            queue_timeout if queue_timeout is not None else float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5")),
+        )
+        self.store = store if store is not None else (SharedBucketStore() if workers > 1 else None)
+        self._pruned_at = time.monotonic()
+        self.route_costs = [
+            (method, re.compile(pattern), cost, expensive)
+            for method, pattern, cost, expensive in (route_costs or DEFAULT_ROUTE_COSTS)
+        ]
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    @staticmethod
+    def client_id(scope) -> str:
+        # Unvalidated keys and query parameters are free to rotate: they
+        # would hand out fresh buckets and churn real clients out of the LRU
+        api_key = dict(scope.get("headers") or []).get(b"x-api-key")
+        if is_valid_client_key(api_key):
+            return "key:" + hashlib.sha256(api_key).hexdigest()[:16]
+        client = scope.get("client")
+        if not client:
+            return "ip:unknown"
+        try:
+            address = ipaddress.ip_address(client[0])
+        except ValueError:
+            return f"ip:{client[0]}"
+        if address.version == 6:
+            if address.ipv4_mapped is not None:
+                return f"ip:{address.ipv4_mapped}"
+            return f"ip:{ipaddress.ip_network((address, 64), strict=False)}"
+        return f"ip:{address}"
+
+    def route_cost(self, method: str, path: str) -> Tuple[float, bool]:
+        for route_method, pattern, cost, expensive in self.route_costs:
+            if route_method == method and pattern.match(path):
+                return cost, expensive
+        return 1.0, False
+
+    async def _take(self, client_id: str, cost: float) -> float:
+        if self.store is None:
+            return self._bucket(client_id).try_acquire(cost)
+        if time.monotonic() - self._pruned_at > SHARED_BUCKET_PRUNE_SECONDS:
+            self._pruned_at = time.monotonic()
+            # Idle clients' buckets have refilled: dropping them changes nothing
+            await asyncio.to_thread(self.store.prune, SHARED_BUCKET_PREFIX,
+                                    self.burst / self.rate_per_second if self.rate_per_second > 0 else math.inf)
+        # SQLite may briefly wait on the file lock; keep it off the event loop
+        return await asyncio.to_thread(self.store.take, SHARED_BUCKET_PREFIX + client_id,
+                                       self.burst, self.rate_per_second, cost)
+
+    async def _refund(self, client_id: str, cost: float):
+        if self.store is None:
+            self._bucket(client_id).refund(cost)
+        else:
+            await asyncio.to_thread(self.store.refund, SHARED_BUCKET_PREFIX + client_id,
+                                    self.burst, self.rate_per_second, cost)
+
+    def _bucket(self, client_id: str) -> TokenBucket:
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.burst, self.rate_per_second)
+            self._buckets[client_id] = bucket
+            # Bound memory: forget the least recently seen clients.
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket
+
+    @staticmethod
+    async def _reject(send, reason: str, retry_after: float):
+        ADMISSION_REJECTED.labels(reason).inc()
+        body = json.dumps({"detail": f"Too many requests ({reason})"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(math.ceil(retry_after), 1)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        cost, expensive = self.route_cost(scope["method"], scope["path"])
+        client_id = self.client_id(scope)
+        wait = await self._take(client_id, cost)
+        if wait > 0:
+            await self._reject(send, "client_rate", wait)
+            return
+
+        if not expensive:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.gate.acquire():
+            # Shed by the server, not the client's rate: it keeps its budget
+            await self._refund(client_id, cost)
+            await self._reject(send, "concurrency", self.gate.queue_timeout)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.gate.release()
+
+
+def _accepted_encodings(header: bytes) -> dict:
+    """Parse an Accept-Encoding header into {encoding: quality}."""
+    encodings = {}
+    for item in header.decode("latin-1").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings[name.lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing large response bodies with brotli (when the
+    optional ``brotli`` package is installed) or gzip.
+
+    Only single-chunk bodies of at least ``minimum_size`` bytes are compressed;
+    streamed and already encoded responses pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None, gzip_level: int = 6,
+                 brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else int(
+            os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        try:
+            import brotli
+            self._brotli = brotli
+        except ImportError:
+            self._brotli = None
+
+    def choose_encoding(self, accept_encoding: bytes) -> Optional[str]:
+        accepted = _accepted_encodings(accept_encoding)
+        if self._brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return self._brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.choose_encoding(dict(scope.get("headers") or []).get(b"accept-encoding", b""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = [(name, value) for name, value in start_message.get("headers", [])
+                       if name.lower() != b"content-length"]
+            already_encoded = any(name.lower() == b"content-encoding" for name, _ in headers)
+            if message.get("more_body", False) or already_encoded or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = self.compress(body, encoding)
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,54 @@
+from decimal import Decimal
+from typing import Any, Dict
+
+import orjson
+from fastapi.responses import Response
+
+# Keep in line with ORJSONResponse so both paths produce the same bytes
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content to JSON bytes with orjson.
+    """
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def splice_json(fields: Dict[str, Any], serialized: Dict[str, bytes]) -> bytes:
+    """
+    Build a JSON object from regular fields plus members that are already
+    serialized (e.g. cached research bytes), without decoding them again.
+
+    :param fields: Members serialized now
+    :param serialized: Member name to JSON bytes
+    :return: JSON object bytes
+    """
+    head = dumps(fields)
+    members = b",".join(dumps(name) + b":" + value for name, value in serialized.items())
+    if not members:
+        return head
+    if head == b"{}":
+        return b"{" + members + b"}"
+    return head[:-1] + b"," + members + b"}"
+
+
+class PrecomputedJSONResponse(Response):
+    """
+    JSON response whose body is already serialized bytes.
+
+    Returning a Response instance also skips FastAPI's ``jsonable_encoder``
+    pass over the content.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: bytes) -> bytes:
+        return content
+
@@ -0,0 +1,45 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+ADMIN_KEY_HEADER = "X-Admin-Key"
+
+
+def is_valid_admin_key(candidate: Optional[str]) -> bool:
+    """
+    Check a candidate key against ``ADMIN_API_KEY``.
+
+    Admin features are disabled entirely when no key is configured.
+
+    :param candidate: Key supplied by the client
+    :return: True if the key matches the configured admin key
+    """
+    admin_key = os.getenv("ADMIN_API_KEY")
+    if not admin_key or not candidate:
+        return False
+    return hmac.compare_digest(candidate.encode(), admin_key.encode())
+
+
+def is_valid_client_key(candidate: Optional[bytes]) -> bool:
+    """
+    Check a client's ``X-API-Key`` against ``CLIENT_API_KEYS`` (comma-separated).
+
+    :param candidate: Raw header value supplied by the client
+    :return: True if the key is one of the issued client keys
+    """
+    if not candidate:
+        return False
+    return any(
+        hmac.compare_digest(candidate, key.strip().encode())
+        for key in os.getenv("CLIENT_API_KEYS", "").split(",") if key.strip()
+    )
+
+
+async def require_admin_key(x_admin_key: Optional[str] = Header(default=None)):
+    """
+    Dependency guarding admin-only endpoints.
+    """
+    if not is_valid_admin_key(x_admin_key):
+        raise HTTPException(status_code=403, detail="Admin key required")
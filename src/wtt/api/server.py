@@ -0,0 +1,77 @@
+"""
+Production run mode: serve the API from several uvicorn worker processes.
+
+Workers share state only through the shared cache tier (REDIS_URL, or a
+host-local SQLite file) and Postgres; background jobs run in whichever
+worker holds the leader lock. Per-client admission budgets live in the
+host-local rate limit file, and every worker publishes its metrics to
+``METRICS_MULTIPROC_DIR`` so that a scrape of any worker covers all of them.
+
+Example:
+    PYTHONPATH=src python -m wtt.api.server --workers 4
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+
+
+def default_workers() -> int:
+    """Worker count from WEB_CONCURRENCY, defaulting to the CPU count."""
+    return int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def worker_count() -> int:
+    """Worker processes started by ``main`` (WTT_WORKERS); 1 for any other launch."""
+    return max(int(os.getenv("WTT_WORKERS", "1")), 1)
+
+
+def prepare_workers(workers: int, port: int):
+    """
+    Export the worker count, metrics directory and shared state files to the
+    worker processes, which inherit the environment. Snapshots of an earlier
+    run are removed: their counters would otherwise be added to this run's.
+    Unless configured, the state files are created for this server alone, so
+    nothing carries over from other runs or processes on the host.
+    """
+    os.environ["WTT_WORKERS"] = str(workers)
+    if workers > 1:
+        state = {"RATE_LIMIT_DB": "ratelimit.sqlite3", "CACHE_DB": "cache.sqlite3"}
+        missing = [name for name in state if not os.getenv(name)]
+        if missing:
+            run_directory = tempfile.mkdtemp(prefix=f"wtt_{port}_")
+            for name in missing:
+                os.environ[name] = os.path.join(run_directory, state[name])
+        directory = os.environ.setdefault(
+            "METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"wtt_metrics_{port}"))
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            os.remove(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the WTT API with multiple workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info").lower())
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    from ..monitoring.logs import configure_logging
+
+    # uvicorn's own records propagate to the JSON pipeline; each worker
+    # configures it again when importing the app
+    configure_logging()
+    workers = max(args.workers, 1)
+    prepare_workers(workers, args.port)
+    # Workers are separate processes, so the app must be passed as an import string
+    uvicorn.run("wtt.api.main:app", host=args.host, port=args.port,
+                workers=workers, log_level=args.log_level, log_config=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
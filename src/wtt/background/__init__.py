@@ -0,0 +1 @@
+"""WTT background jobs coordinated across worker processes."""
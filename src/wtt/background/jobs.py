@@ -0,0 +1,163 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache.research import store_research
+from ..cache.shared import SharedCache
+from ..database.config import SessionLocal
+from ..database.counters import fold_counters
+from ..models.token import Token
+from ..models.token_extracted_data import TokenExtractedData
+from ..upstream.guard import UpstreamUnavailableError
+from ..upstream.ratelimit import BACKGROUND
+from ..verification.consensus import run_consensus
+from ..verification.questions import generate_questions
+from .leader import PostgresAdvisoryLock
+from .runs import JobRunLog
+from .scheduler import BackgroundScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def stale_research_query(cutoff: datetime, batch_size: int):
+    """
+    Build the query for tokens whose latest research is older than ``cutoff``,
+    oldest first.
+    """
+    tokens, research = Token.__table__, TokenExtractedData.__table__
+    latest = (
+        select(research.c.token_id, func.max(research.c.created_at).label("researched_at"))
+        .group_by(research.c.token_id)
+        .subquery()
+    )
+    return (
+        select(tokens.c.id, tokens.c.name)
+        .join(latest, latest.c.token_id == tokens.c.id)
+        .where(latest.c.researched_at < cutoff)
+        .order_by(latest.c.researched_at)
+        .limit(batch_size)
+    )
+
+
+async def refresh_stale_research(session: AsyncSession, max_age_hours: float = 24.0,
+                                 batch_size: int = 20, search_agent=None,
+                                 cache: Optional[SharedCache] = None) -> int:
+    """
+    Re-run research for tokens whose latest stored results are too old.
+
+    Searches run at background priority so they never eat into the budget
+    reserved for interactive requests. No transaction is open while they run:
+    the batch is read and committed first (with the run record), and each
+    token's results are committed as soon as they arrive.
+
+    :param max_age_hours: Age after which stored research is refreshed
+    :param batch_size: Maximum number of tokens refreshed per run
+    :param search_agent: Agent running the searches (default: the shared one)
+    :param cache: Cache the results are shared through (default: the process-wide one)
+    :return: Number of tokens refreshed
+    """
+    if search_agent is None:
+        # Imported here to keep the agent construction out of module import time
+        from ..api.dependencies import get_search_agent
+
+        search_agent = get_search_agent()
+
+    query = stale_research_query(datetime.utcnow() - timedelta(hours=max_age_hours), batch_size)
+
+    refreshed = 0
+    rows = (await session.execute(query)).all()
+    await session.commit()
+    for token_id, token_name in rows:
+        try:
+            research = await search_agent.process_token_data(token_name, priority=BACKGROUND)
+        except UpstreamUnavailableError as e:
+            # Budget or breaker says stop: the next run picks up the rest
+            logger.info("Research refresh paused after %s tokens: %s", refreshed, e)
+            break
+        except Exception as e:
+            # Keep the stored research; the token stays stale and is retried next run
+            logger.warning("Research refresh failed for token %s: %s", token_id, e)
+            continue
+        session.add(TokenExtractedData(token_id=token_id, token_name=token_name,
+                                       research_results=research))
+        await session.commit()
+        await store_research(token_name, research, cache)
+        refreshed += 1
+
+    logger.info("Refreshed research for %s tokens", refreshed)
+    return refreshed
+
+
+async def run_reward_distribution(session: AsyncSession):
+    """
+    Distribute rewards to top users.
+    """
+    from ..api.dependencies import get_ranking_agent
+
+    await get_ranking_agent().distribute_rewards(session)
+
+
+async def run_counter_fold(session: AsyncSession):
+    """
+    Fold sharded token counters into the tokens table.
+    """
+    folded = await fold_counters(session)
+    logger.info("Folded counters for %s tokens", folded)
+
+
+async def run_consensus_scoring(session: AsyncSession):
+    """
+    Re-score active verification questions and write verdicts back.
+    """
+    await run_consensus(session)
+
+
+async def run_question_generation(session: AsyncSession, batch_size: int = 10):
+    """
+    Generate verification questions for researched tokens that have none.
+    """
+    from ..api.dependencies import get_question_agent
+
+    stored = await generate_questions(session, get_question_agent(), batch_size)
+    logger.info("Generated %s verification questions", stored)
+
+
+def build_scheduler(engine) -> Optional[BackgroundScheduler]:
+    """
+    Build the leader-elected scheduler for the background jobs.
+
+    :return: The scheduler, or None when BACKGROUND_JOBS_ENABLED is false
+    """
+    if os.getenv("BACKGROUND_JOBS_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+
+    max_age_hours = float(os.getenv("RESEARCH_MAX_AGE_HOURS", "24"))
+    batch_size = int(os.getenv("RESEARCH_REFRESH_BATCH", "20"))
+    question_batch = int(os.getenv("QUESTION_GENERATION_BATCH", "10"))
+
+    async def research_refresh(session):
+        await refresh_stale_research(session, max_age_hours, batch_size)
+
+    async def question_generation(session):
+        await run_question_generation(session, question_batch)
+
+    scheduler = BackgroundScheduler(
+        PostgresAdvisoryLock(engine),
+        JobRunLog(SessionLocal),
+        poll_interval=float(os.getenv("LEADER_POLL_SECONDS", "15")),
+    )
+    scheduler.add_job("research_refresh", float(os.getenv("RESEARCH_REFRESH_INTERVAL_SECONDS", "3600")),
+                      research_refresh)
+    scheduler.add_job("reward_distribution", float(os.getenv("REWARD_INTERVAL_SECONDS", "86400")),
+                      run_reward_distribution)
+    scheduler.add_job("counter_fold", float(os.getenv("COUNTER_FOLD_INTERVAL_SECONDS", "60")),
+                      run_counter_fold)
+    scheduler.add_job("consensus", float(os.getenv("CONSENSUS_INTERVAL_SECONDS", "300")),
+                      run_consensus_scoring)
+    scheduler.add_job("question_generation", float(os.getenv("QUESTION_GENERATION_INTERVAL_SECONDS", "600")),
+                      question_generation)
+    return scheduler
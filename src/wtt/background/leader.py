@@ -0,0 +1,95 @@
+import logging
+import zlib
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+def lock_key(name: str) -> int:
+    """
+    Derive a stable advisory lock key from a name, so every worker of a
+    deployment contends for the same lock.
+    """
+    return zlib.crc32(name.encode("utf-8"))
+
+
+class PostgresAdvisoryLock:
+    """
+    Leader lock backed by a session-level Postgres advisory lock.
+
+    The lock lives as long as the dedicated connection holding it, so a worker
+    that dies (or loses its connection) hands leadership over automatically.
+    """
+
+    def __init__(self, engine, name: str = "wtt-background-jobs"):
+        self.engine = engine
+        self.name = name
+        self.key = lock_key(name)
+        self._conn = None
+
+    async def try_acquire(self) -> bool:
+        """
+        Try to become leader without blocking.
+
+        :return: True if this process holds the lock
+        """
+        if self._conn is not None:
+            return await self.is_held()
+
+        conn = await self.engine.connect()
+        try:
+            result = await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})
+            acquired = bool(result.scalar())
+            # End the implicit transaction: the lock is session-level and survives it
+            await conn.commit()
+        except Exception:
+            await conn.invalidate()
+            raise
+
+        if acquired:
+            self._conn = conn
+            logger.info("Acquired leader lock '%s'", self.name)
+        else:
+            await conn.close()
+        return acquired
+
+    async def is_held(self) -> bool:
+        """
+        Check that the connection holding the lock is still alive.
+        """
+        if self._conn is None:
+            return False
+        try:
+            await self._conn.execute(text("SELECT 1"))
+            await self._conn.commit()
+            return True
+        except Exception as e:
+            logger.warning("Lost leader lock '%s': %s", self.name, e)
+            await self._discard()
+            return False
+
+    async def release(self):
+        """
+        Give up leadership so another worker can take over.
+        """
+        if self._conn is None:
+            return
+        try:
+            await self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            await self._conn.commit()
+            await self._conn.close()
+            self._conn = None
+            logger.info("Released leader lock '%s'", self.name)
+        except Exception as e:
+            logger.warning("Error releasing leader lock '%s': %s", self.name, e)
+            await self._discard()
+
+    async def _discard(self):
+        # Invalidate rather than return to the pool: closing the DBAPI
+        # connection guarantees the server drops the session-level lock.
+        conn, self._conn = self._conn, None
+        try:
+            await conn.invalidate()
+        except Exception:
+            pass
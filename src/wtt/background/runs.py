@@ -0,0 +1,45 @@
+from typing import Dict
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.job_run import JobRun
+
+job_runs = JobRun.__table__
+
+
+class JobRunLog:
+    """
+    Last run of each background job, kept in the ``job_runs`` table.
+
+    Elapsed times are computed by Postgres, so they do not depend on the
+    clocks of the workers reading them.
+    """
+
+    def __init__(self, session_factory):
+        """
+        :param session_factory: Callable returning a new ``AsyncSession``
+        """
+        self.session_factory = session_factory
+
+    def session(self) -> AsyncSession:
+        """Session a job runs in; its last run is recorded in the same transaction."""
+        return self.session_factory()
+
+    async def elapsed(self) -> Dict[str, float]:
+        """
+        :return: Seconds since the last recorded run of each job
+        """
+        async with self.session_factory() as session:
+            rows = await session.execute(
+                select(job_runs.c.name, func.extract("epoch", func.now() - job_runs.c.last_run_at)))
+            return {name: float(seconds) for name, seconds in rows}
+
+    async def record(self, session: AsyncSession, name: str):
+        """
+        Record a run of ``name`` as of the current transaction; the caller commits.
+        """
+        upsert = insert(job_runs).values(name=name, last_run_at=func.now())
+        await session.execute(upsert.on_conflict_do_update(
+            index_elements=[job_runs.c.name], set_={"last_run_at": upsert.excluded.last_run_at}))
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    def __init__(self, name: str, interval: float, func: Callable[[Any], Awaitable[None]]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = 0.0
+
+
+class BackgroundScheduler:
+    """
+    Runs periodic jobs in exactly one worker.
+
+    Every worker runs a scheduler, but only the one holding the leader lock
+    executes jobs; the others keep polling so one of them takes over if the
+    leader goes away. Each run is recorded in the job's own transaction, and
+    a new leader schedules from those records, so a deploy, restart or
+    failover does not run jobs again ahead of their interval.
+    """
+
+    def __init__(self, lock, runs, poll_interval: float = 15.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param lock: Leader lock exposing try_acquire, is_held and release
+        :param runs: Run log exposing session, elapsed and record (``JobRunLog``)
+        :param poll_interval: Seconds between leadership checks
+        """
+        self.lock = lock
+        self.runs = runs
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.jobs: List[PeriodicJob] = []
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add_job(self, name: str, interval: float, func: Callable[[Any], Awaitable[None]]):
+        """
+        Register a coroutine function to run every ``interval`` seconds. It is
+        called with the session its run is recorded in, and commits its work
+        there (jobs with slow upstream calls commit before making them).
+        """
+        self.jobs.append(PeriodicJob(name=name, interval=interval, func=func))
+
+    async def run_pending(self) -> List[str]:
+        """
+        Confirm leadership and run every job that is due.
+
+        :return: Names of the jobs that ran
+        """
+        was_leader = self.is_leader
+        try:
+            self.is_leader = await (self.lock.is_held() if was_leader else self.lock.try_acquire())
+        except Exception as e:
+            logger.warning("Leader election failed: %s", e)
+            self.is_leader = False
+
+        if not self.is_leader:
+            return []
+        if not was_leader:
+            # New leader: carry on from the recorded runs; jobs never run are due now
+            try:
+                elapsed = await self.runs.elapsed()
+            except Exception as e:
+                logger.warning("Could not load background job runs: %s", e)
+                self.is_leader = False
+                await self.lock.release()
+                return []
+            now = self.clock()
+            for job in self.jobs:
+                job.next_run = now + job.interval - elapsed[job.name] if job.name in elapsed else 0.0
+
+        ran = []
+        for job in self.jobs:
+            now = self.clock()
+            if now < job.next_run:
+                continue
+            job.next_run = now + job.interval
+            try:
+                async with self.runs.session() as session:
+                    # Committed with the job's work, rolled back if it fails before committing
+                    await self.runs.record(session, job.name)
+                    await job.func(session)
+                    await session.commit()
+            except Exception as e:
+                logger.error("Background job %s failed: %s", job.name, e)
+            ran.append(job.name)
+        return ran
+
+    async def _run(self):
+        while True:
+            await self.run_pending()
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start polling in the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop polling and give up leadership."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            await self.lock.release()
+            self.is_leader = False
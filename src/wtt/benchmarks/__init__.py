@@ -0,0 +1 @@
+"""WTT benchmark and load-test suite."""
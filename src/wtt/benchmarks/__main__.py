@@ -0,0 +1,130 @@
+"""
+Run the WTT benchmark suite against fake upstreams and a local Postgres.
+
+Example:
+    python -m wtt.benchmarks --scenarios verify,leaderboard --concurrency 20 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from .fakes import FakeChatModelServer, FakeTavilyServer, UpstreamProfile
+from .fixtures import use_local_database
+from .runner import SCENARIOS, compare_to_baseline, format_report, load_baseline, save_baseline
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="WTT benchmark and load-test suite")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated scenario names")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--tokens", type=int, default=100, help="Seeded benchmark tokens")
+    parser.add_argument("--users", type=int, default=100, help="Seeded benchmark users")
+    parser.add_argument("--search-latency-ms", type=float, default=300.0)
+    parser.add_argument("--search-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--latency-distribution", default="normal", choices=UpstreamProfile.DISTRIBUTIONS)
+    parser.add_argument("--content-chars", type=int, default=800, help="Size of each fake search result")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Use the WTT_MODE=local in-process stand-ins instead of fake HTTP servers")
+    parser.add_argument("--database-url", default=None, help="Local Postgres URL (default: BENCH_DATABASE_URL)")
+    parser.add_argument("--base-url", default=None, help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--admission-limits", action="store_true",
+                        help="Keep the configured per-client limits for the in-process app")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    return parser.parse_args(argv)
+
+
+def run_with_fake_servers(args, scenarios):
+    search_profile = UpstreamProfile(args.search_latency_ms, args.search_latency_ms / 5, args.search_failure_rate,
+                                     distribution=args.latency_distribution)
+    llm_profile = UpstreamProfile(args.llm_latency_ms, args.llm_latency_ms / 5, args.llm_failure_rate,
+                                  distribution=args.latency_distribution)
+
+    with FakeTavilyServer(search_profile, content_chars=args.content_chars) as tavily, \
+            FakeChatModelServer(llm_profile) as chat:
+        # Environment must be set before the application modules are imported.
+        os.environ["TAVILY_API_URL"] = tavily.search_url
+        os.environ.setdefault("TAVILY_API_KEY", "tvly-bench")
+        os.environ["OPENAI_API_BASE"] = chat.api_base
+        os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+        use_local_database(args.database_url)
+
+        from .runner import run_benchmarks
+        results = asyncio.run(run_benchmarks(
+            scenarios, args.concurrency, args.requests,
+            tokens=args.tokens, users=args.users, base_url=args.base_url,
+        ))
+        print(format_report(results))
+        print(f"\nFake search calls: {tavily.request_count}, fake page fetches: {tavily.page_count}, "
+              f"fake LLM calls: {chat.request_count}")
+    return results
+
+
+def run_in_process(args, scenarios):
+    # Environment must be set before the application modules are imported.
+    os.environ["WTT_MODE"] = "local"
+    for prefix, latency, failure_rate in (("LOCAL_SEARCH", args.search_latency_ms, args.search_failure_rate),
+                                          ("LOCAL_LLM", args.llm_latency_ms, args.llm_failure_rate)):
+        os.environ[f"{prefix}_LATENCY_MS"] = str(latency)
+        os.environ[f"{prefix}_FAILURE_RATE"] = str(failure_rate)
+        os.environ[f"{prefix}_LATENCY_DISTRIBUTION"] = args.latency_distribution
+    os.environ["LOCAL_SEARCH_CONTENT_CHARS"] = str(args.content_chars)
+    database_url = args.database_url or os.getenv("BENCH_DATABASE_URL")
+    if database_url:
+        os.environ["LOCAL_DATABASE_URL"] = database_url
+
+    from ..api.dependencies import get_search_agent
+    from .runner import run_benchmarks
+    results = asyncio.run(run_benchmarks(
+        scenarios, args.concurrency, args.requests,
+        tokens=args.tokens, users=args.users, base_url=args.base_url,
+    ))
+    print(format_report(results))
+    print(f"\nLocal search calls: {get_search_agent().client.request_count}")
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.base_url and not args.admission_limits:
+        # Measure the app, not the per-client limits: each worker would hit
+        # ADMISSION_BURST within a few expensive requests
+        os.environ["ADMISSION_RATE_PER_SECOND"] = os.environ["ADMISSION_BURST"] = "1000000"
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        print(f"❌ Unknown scenarios: {', '.join(unknown)}")
+        return 2
+
+    if args.in_process:
+        results = run_in_process(args, scenarios)
+    else:
+        results = run_with_fake_servers(args, scenarios)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print("ℹ️ No baseline found; run with --save-baseline to record one")
+        return 0
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"❌ Regression: {regression}")
+    if not regressions:
+        print("🎉 No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Measure consensus scoring throughput on simulated verification answers.
+
+Users get a random accuracy (some adversarial), each question is answered by
+a few of them, and the Dawid–Skene verdicts are compared with the truth and
+with a plain majority vote.
+
+Example:
+    python -m wtt.benchmarks.consensus --answers 2000000
+"""
+import argparse
+import sys
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+from ..verification.consensus import score_answers
+
+
+def simulate_answers(n_answers: int, n_users: int = 10000, answers_per_question: int = 5,
+                     seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generate answer columns with known ground truth.
+
+    :return: (question_ids, user_ids, answers, truth per question)
+    """
+    rng = np.random.default_rng(seed)
+    n_questions = max(n_answers // answers_per_question, 1)
+    truth = rng.random(n_questions) < 0.5
+    accuracy = rng.choice([0.3, 0.6, 0.75, 0.9, 0.95], size=n_users, p=[0.05, 0.25, 0.3, 0.25, 0.15])
+
+    question_ids = np.repeat(np.arange(n_questions), answers_per_question)[:n_answers]
+    user_ids = rng.integers(0, n_users, size=len(question_ids))
+    correct = rng.random(len(question_ids)) < accuracy[user_ids]
+    answers = np.where(correct, truth[question_ids], ~truth[question_ids])
+    return question_ids, user_ids, answers, truth
+
+
+def run_consensus_benchmark(n_answers: int = 1000000, n_users: int = 10000) -> Dict[str, float]:
+    """
+    Time a scoring run and report verdict accuracy against the simulated truth.
+    """
+    question_ids, user_ids, answers, truth = simulate_answers(n_answers, n_users)
+
+    start = time.perf_counter()
+    result = score_answers(question_ids, user_ids, answers)
+    seconds = time.perf_counter() - start
+
+    votes = np.bincount(question_ids, weights=answers.astype(np.float64))
+    majority = votes * 2 >= np.bincount(question_ids)
+    return {
+        "answers": float(len(answers)),
+        "seconds": seconds,
+        "iterations": float(result.iterations),
+        "accuracy": float(np.mean(result.verdicts == truth[result.question_ids])),
+        "majority_accuracy": float(np.mean(majority == truth)),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure WTT consensus scoring throughput")
+    parser.add_argument("--answers", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    report = run_consensus_benchmark(args.answers, args.users)
+    print(f"Scored {int(report['answers'])} answers in {report['seconds']:.2f}s "
+          f"({int(report['iterations'])} iterations)")
+    print(f"Verdict accuracy {report['accuracy']:.3%} (majority vote {report['majority_accuracy']:.3%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
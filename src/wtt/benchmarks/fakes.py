@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from ..upstream.payloads import UpstreamProfile, fake_chat_completion, fake_page, fake_search_payload
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    server_version = "WTTFake/0.1"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean.
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            request = {}
+
+        server = self.server
+        server.request_count += 1
+        time.sleep(server.profile.next_delay())
+        if server.profile.should_fail():
+            self._send_json(500, {"error": "injected failure"})
+            return
+        self._send_json(200, server.build_response(self.path, request))
+
+    def do_GET(self):
+        server = self.server
+        server.page_count += 1
+        time.sleep(server.profile.next_delay())
+        status, headers, body = server.build_page(self.path, dict(self.headers.items()))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeUpstreamServer:
+    """
+    Threaded HTTP server standing in for an upstream API on localhost.
+
+    Usable as a context manager; the server runs in a daemon thread.
+    """
+
+    def __init__(self, profile: Optional[UpstreamProfile] = None, host: str = "127.0.0.1", port: int = 0):
+        self.profile = profile or UpstreamProfile()
+        self._server = ThreadingHTTPServer((host, port), _FakeHandler)
+        self._server.daemon_threads = True
+        self._server.profile = self.profile
+        self._server.request_count = 0
+        self._server.page_count = 0
+        self._server.build_response = self.build_response
+        self._server.build_page = self.build_page
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count
+
+    @property
+    def page_count(self) -> int:
+        return self._server.page_count
+
+    def build_response(self, path: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def build_page(self, path: str, headers: Dict[str, str]):
+        """
+        Answer a GET request.
+
+        :return: (status, response headers, body bytes)
+        """
+        return 404, {}, b""
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeTavilyServer(FakeUpstreamServer):
+    """
+    Fake Tavily search API accepting search requests on any path.
+
+    Result URLs point back to this server, which serves the pages under
+    ``/pages/`` with an ETag and answers matching ``If-None-Match`` with 304.
+    """
+
+    def __init__(self, profile: Optional[UpstreamProfile] = None, content_chars: int = 800, **kwargs):
+        super().__init__(profile, **kwargs)
+        self.content_chars = content_chars
+
+    @property
+    def search_url(self) -> str:
+        return f"{self.url}/search"
+
+    def build_response(self, path, request):
+        return fake_search_payload(
+            request.get("query", ""),
+            max_results=int(request.get("max_results", 5)),
+            content_chars=self.content_chars,
+            include_raw_content=bool(request.get("include_raw_content", False)),
+            source_base=self.url,
+        )
+
+    def build_page(self, path, headers):
+        return fake_page(path, headers, self.content_chars)
+
+
+class FakeChatModelServer(FakeUpstreamServer):
+    """
+    Fake OpenAI-compatible chat completions API (``POST /v1/chat/completions``).
+    """
+
+    @property
+    def api_base(self) -> str:
+        return f"{self.url}/v1"
+
+    def build_response(self, path, request):
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        return fake_chat_completion(prompt, model=request.get("model", "gpt-4o"))
@@ -0,0 +1,93 @@
+"""
+Measure what logging costs the code that logs.
+
+Compares the caller-side cost per record of the queue-based JSON pipeline
+with a synchronous console handler (the former ``basicConfig`` setup), and
+of disabled and sampled debug records.
+
+Example:
+    python -m wtt.benchmarks.log_overhead --records 50000
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueListener
+from typing import Callable, Dict
+
+from ..monitoring.logs import ContextQueueHandler, DebugSampler, JSONFormatter, request_id_var
+
+
+def _isolated_logger(name: str, handler: logging.Handler, level: int) -> logging.Logger:
+    logger = logging.getLogger(f"wtt.benchmarks.log_overhead.{name}")
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+def _per_record_micros(emit: Callable[[int], None], records: int) -> float:
+    start = time.perf_counter()
+    for i in range(records):
+        emit(i)
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def run_log_overhead_benchmark(records: int = 50000, sample_rate: float = 0.01) -> Dict[str, float]:
+    """
+    :param records: Records logged per strategy
+    :param sample_rate: LOG_DEBUG_SAMPLE_RATE for the sampled debug strategy
+    :return: Strategy name to caller-side microseconds per record
+    """
+    sink = open(os.devnull, "w")
+    results: Dict[str, float] = {}
+    token = request_id_var.set(None)
+    try:
+        console = logging.StreamHandler(sink)
+        console.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        sync_logger = _isolated_logger("sync", console, logging.INFO)
+        results["sync console"] = _per_record_micros(
+            lambda i: sync_logger.info("Processed token %s in %s ms", i, 12.5), records)
+        results["disabled debug (f-string)"] = _per_record_micros(
+            lambda i: sync_logger.debug(f"Processed token {i} in {12.5} ms"), records)
+        results["disabled debug (lazy)"] = _per_record_micros(
+            lambda i: sync_logger.debug("Processed token %s in %s ms", i, 12.5), records)
+
+        # Everything below runs with the handlers configure_logging installs
+        output = logging.StreamHandler(sink)
+        output.setFormatter(JSONFormatter())
+        log_queue = queue.SimpleQueue()
+        handler = ContextQueueHandler(log_queue)
+        handler.addFilter(DebugSampler(sample_rate))
+        listener = QueueListener(log_queue, output)
+        listener.start()
+        queued_logger = _isolated_logger("queued", handler, logging.DEBUG)
+        results[f"sampled debug ({sample_rate:g})"] = _per_record_micros(
+            lambda i: queued_logger.debug("Processed token %s in %s ms", i, 12.5), records)
+        request_id_var.set("benchmark-request")
+        results["queued json"] = _per_record_micros(
+            lambda i: queued_logger.info("Processed token %s in %s ms", i, 12.5), records)
+        start = time.perf_counter()
+        listener.stop()
+        results["listener drain"] = (time.perf_counter() - start) * 1e6 / records
+    finally:
+        request_id_var.reset(token)
+        sink.close()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure WTT logging cost on the calling code")
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    for strategy, micros in run_log_overhead_benchmark(args.records, args.sample_rate).items():
+        print(f"{strategy:<28}{micros:>10.2f} µs/record")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
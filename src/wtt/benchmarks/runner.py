@@ -0,0 +1,222 @@
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# A scenario issues one request and returns the HTTP status code.
+Scenario = Callable[[Any, Dict[str, List[Any]]], Awaitable[int]]
+
+
+async def verify_scenario(client, data) -> int:
+    response = await client.get(f"/tokens/verify/{random.choice(data['token_ids'])}")
+    return response.status_code
+
+
+async def research_scenario(client, data) -> int:
+    response = await client.post("/research/token", json={
+        "token_name": f"Benchmark Token {random.choice(data['token_ids'])}",
+        "search_depth": "advanced",
+    })
+    return response.status_code
+
+
+async def answer_scenario(client, data) -> int:
+    # Seeded (token id, question id) pairs: made-up ids would only measure 404s
+    token_id, question_id = random.choice(data["questions"])
+    response = await client.post("/tokens/answer", params={
+        "token_id": token_id,
+        "question_id": question_id,
+        "user_id": random.choice(data["user_ids"]),
+        "answer": random.choice(["true", "false"]),
+    })
+    return response.status_code
+
+
+async def leaderboard_scenario(client, data) -> int:
+    response = await client.get("/leaderboard")
+    return response.status_code
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "verify": verify_scenario,
+    "research": research_scenario,
+    "answer": answer_scenario,
+    "leaderboard": leaderboard_scenario,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    :param values: Observed values
+    :param pct: Percentile between 0 and 100
+    :return: Value at the requested percentile (0.0 for no values)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float,
+              statuses: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Summarize a scenario run.
+
+    :param latencies: Per-request latencies in seconds
+    :param errors: Number of failed requests (exceptions or any non-2xx status)
+    :param elapsed: Wall-clock duration of the run in seconds
+    :param statuses: Requests per status code (``"error"`` for exceptions)
+    :return: Latency percentiles in milliseconds, throughput, error rate and status breakdown
+    """
+    total = len(latencies)
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "statuses": dict(sorted((statuses or {}).items())),
+        "rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_scenario(clients: List[Any], scenario: Scenario, data: Dict[str, List[Any]],
+                       concurrency: int, requests: int) -> Dict[str, Any]:
+    """
+    Run a scenario with a fixed number of concurrent workers.
+
+    Any status outside 2xx counts as an error: a 404 or a 429 is as much a
+    failed request as a 500, and usually a much faster one.
+
+    :param clients: httpx.AsyncClients bound to the application; worker ``i`` uses ``clients[i % len(clients)]``
+    :param scenario: Scenario coroutine function
+    :param data: Seeded benchmark ids
+    :param concurrency: Number of concurrent workers
+    :param requests: Total number of requests to issue
+    :return: Scenario summary
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = requests
+
+    async def worker(client):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                statuses[str(await scenario(client, data))] += 1
+            except Exception:
+                statuses["error"] += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(clients[i % len(clients)]) for i in range(concurrency)))
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return summarize(latencies, errors, time.perf_counter() - started, statuses)
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                        tolerance: float = 0.2) -> List[str]:
+    """
+    Flag regressions against a stored baseline.
+
+    A scenario regresses when its p95/p99 latency grows, or its throughput
+    drops, by more than ``tolerance`` relative to the baseline.
+
+    :param results: Current results keyed by scenario
+    :param baseline: Baseline results keyed by scenario
+    :param tolerance: Allowed relative change (0.2 = 20%)
+    :return: Human readable regression messages (empty if none)
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if reference.get(metric) and current[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {current[metric]} > baseline {reference[metric]} (+{tolerance:.0%})"
+                )
+        if reference.get("rps") and current["rps"] < reference["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {current['rps']} < baseline {reference['rps']} (-{tolerance:.0%})")
+    return regressions
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def format_report(results: Dict[str, Dict[str, Any]]) -> str:
+    header = (f"{'scenario':<12}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"  statuses")
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        statuses = " ".join(f"{status}:{count}" for status, count in r.get("statuses", {}).items())
+        lines.append(
+            f"{name:<12}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}  {statuses}"
+        )
+    return "\n".join(lines)
+
+
+async def run_benchmarks(scenarios: List[str], concurrency: int, requests: int,
+                         tokens: int = 100, users: int = 100,
+                         base_url: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Seed the local database and run the selected scenarios against the app.
+
+    Without ``base_url`` the app is driven in-process through httpx's ASGI
+    transport; otherwise requests go to an already running server.
+
+    Admission control limits each client, so every worker of every scenario
+    gets its own identity: a distinct peer address in-process, or one of the
+    ``CLIENT_API_KEYS`` the server accepts. Against a server without enough
+    issued keys workers share one client and its rate limit shows up as 429s.
+    """
+    import httpx
+    from .fixtures import BenchmarkDatabase
+
+    async with BenchmarkDatabase(tokens=tokens, users=users) as database:
+        data = {"token_ids": database.token_ids, "user_ids": database.user_ids, "questions": database.questions}
+        results = {}
+        for index, name in enumerate(scenarios):
+            # Fresh identities per scenario: one scenario must not spend the next one's budget
+            if base_url:
+                keys = [key.strip() for key in os.getenv("CLIENT_API_KEYS", "").split(",") if key.strip()]
+                clients = [
+                    httpx.AsyncClient(base_url=base_url, timeout=60, headers={"X-API-Key": key})
+                    for key in keys[index * concurrency:(index + 1) * concurrency]
+                ] or [httpx.AsyncClient(base_url=base_url, timeout=60)]
+            else:
+                from ..api.main import app
+                clients = [
+                    httpx.AsyncClient(
+                        transport=httpx.ASGITransport(app=app, client=(f"10.{index}.{i // 256}.{i % 256}", 123)),
+                        base_url="http://bench", timeout=60,
+                    )
+                    for i in range(concurrency)
+                ]
+            try:
+                results[name] = await run_scenario(clients, SCENARIOS[name], data, concurrency, requests)
+            finally:
+                for client in clients:
+                    await client.aclose()
+        return results
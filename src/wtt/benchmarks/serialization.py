@@ -0,0 +1,135 @@
+"""
+Measure response serialization cost per endpoint.
+
+Compares the stdlib encoder used by FastAPI's default JSONResponse, orjson,
+and splicing pre-serialized cached bytes, plus gzip/brotli cost for the
+research bodies.
+
+Example:
+    python -m wtt.benchmarks.serialization --iterations 2000
+"""
+import argparse
+import gzip
+import json
+import sys
+import timeit
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+import orjson
+
+from ..agents.formatting import ResearchFormatter
+from .fakes import fake_search_payload
+
+
+def _stdlib_dumps(content: Any) -> bytes:
+    # Same settings as starlette's JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _splice(fields: Dict[str, Any], serialized: Dict[str, bytes]) -> bytes:
+    # Mirrors wtt.api.responses.splice_json without importing the web stack
+    head = orjson.dumps(fields)
+    members = b",".join(orjson.dumps(name) + b":" + value for name, value in serialized.items())
+    return head[:-1] + b"," + members + b"}"
+
+
+def sample_payloads(token_name: str = "BENCH", results: int = 5,
+                    content_chars: int = 2000) -> Dict[str, Dict[str, Any]]:
+    """
+    Build representative response payloads for each endpoint.
+    """
+    search = fake_search_payload(f"{token_name} cryptocurrency", results, content_chars)
+    research = ResearchFormatter().format(search).to_dict()
+    return {
+        "verify": {"token_name": token_name, "information": research},
+        "research": {"status": "success", "token_id": 1, "research_results": research},
+        "stale_verify": {"token_name": token_name, "information": research, "stale": True,
+                         "researched_at": datetime(2024, 1, 1)},
+        "leaderboard": {"leaderboard": [
+            {"username": f"user_{i}", "verification_score": 100.0 - i,
+             "accuracy_rate": 90.0 - i / 2, "total_rewards": 10.0 * i}
+            for i in range(10)
+        ]},
+    }
+
+
+def _micros(fn: Callable[[], Any], iterations: int) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def run_serialization_benchmark(iterations: int = 2000) -> Dict[str, Dict[str, float]]:
+    """
+    Time each serialization strategy per endpoint.
+
+    :return: Endpoint to {strategy: microseconds per response}
+    """
+    try:
+        from fastapi.encoders import jsonable_encoder
+    except ImportError:
+        jsonable_encoder = None
+
+    results = {}
+    for endpoint, payload in sample_payloads().items():
+        timings = {
+            "stdlib": _micros(lambda: _stdlib_dumps(payload), iterations),
+            "orjson": _micros(lambda: orjson.dumps(payload), iterations),
+        }
+        if jsonable_encoder is not None:
+            # FastAPI's default path for dict returns: encoder pass, then json.dumps
+            timings["fastapi_default"] = _micros(lambda: _stdlib_dumps(jsonable_encoder(payload)), iterations)
+
+        big_key = next((key for key in ("information", "research_results") if key in payload), None)
+        if big_key is not None:
+            cached = orjson.dumps(payload[big_key])
+            rest = {key: value for key, value in payload.items() if key != big_key}
+            timings["precomputed"] = _micros(lambda: _splice(rest, {big_key: cached}), iterations)
+        elif endpoint == "leaderboard":
+            cached = orjson.dumps(payload)
+            timings["precomputed"] = _micros(lambda: bytes(cached), iterations)
+        results[endpoint] = timings
+    return results
+
+
+def compression_report(iterations: int = 200) -> Dict[str, Dict[str, float]]:
+    """
+    Size and time of compressing the verify body with each available encoding.
+    """
+    body = orjson.dumps(sample_payloads()["verify"])
+    report = {"identity": {"bytes": len(body), "micros": 0.0}}
+    report["gzip"] = {
+        "bytes": len(gzip.compress(body, compresslevel=6, mtime=0)),
+        "micros": _micros(lambda: gzip.compress(body, compresslevel=6, mtime=0), iterations),
+    }
+    try:
+        import brotli
+    except ImportError:
+        return report
+    report["br"] = {
+        "bytes": len(brotli.compress(body, quality=4)),
+        "micros": _micros(lambda: brotli.compress(body, quality=4), iterations),
+    }
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure WTT response serialization cost")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    results = run_serialization_benchmark(args.iterations)
+    strategies = sorted({name for timings in results.values() for name in timings})
+    print(f"{'endpoint':<16}" + "".join(f"{name:>18}" for name in strategies) + "   (µs/response)")
+    for endpoint, timings in results.items():
+        cells = "".join(f"{timings[name]:>18.1f}" if name in timings else f"{'-':>18}" for name in strategies)
+        print(f"{endpoint:<16}{cells}")
+
+    print("\nCompression of the verify body:")
+    for encoding, row in compression_report(max(args.iterations // 10, 1)).items():
+        print(f"  {encoding:<10}{row['bytes']:>10} bytes{row['micros']:>12.1f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
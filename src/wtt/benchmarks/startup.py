@@ -0,0 +1,101 @@
+"""
+Measure worker boot cost: interpreter start plus importing the API module.
+
+Each run uses a fresh interpreter so module caches do not hide import cost.
+
+Example:
+    python -m wtt.benchmarks.startup --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMPORT_SNIPPET = (
+    "import json, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(json.dumps({{'import_seconds': time.perf_counter() - start}}))\n"
+)
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure_once(module: str) -> Dict[str, float]:
+    """
+    Import ``module`` in a fresh interpreter.
+
+    :return: Import time and total process wall time in seconds
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    total = time.perf_counter() - start
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = total
+    return result
+
+
+def import_breakdown(module: str, top: int = 15) -> List[Tuple[str, float]]:
+    """
+    Return the slowest top-level imports reported by ``-X importtime``.
+
+    :return: (package, cumulative seconds) pairs, slowest first
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    totals: Dict[str, float] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Only top-level entries (no leading indentation) to avoid double counting.
+        if name == name.lstrip():
+            root = name.split(".")[0]
+            totals[root] = totals.get(root, 0.0) + int(cumulative) / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure WTT worker startup time")
+    parser.add_argument("--module", default="wtt.api.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list (0 to skip)")
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="Fail if the median import time exceeds this budget")
+    args = parser.parse_args(argv)
+
+    runs = [measure_once(args.module) for _ in range(args.runs)]
+    imports = [run["import_seconds"] for run in runs]
+    processes = [run["process_seconds"] for run in runs]
+    median_import = statistics.median(imports)
+    print(f"import {args.module}: median {median_import * 1000:.1f} ms, min {min(imports) * 1000:.1f} ms")
+    print(f"process start + import: median {statistics.median(processes) * 1000:.1f} ms")
+
+    if args.top:
+        print("\nSlowest top-level imports:")
+        for name, seconds in import_breakdown(args.module, args.top):
+            print(f"  {name:<30}{seconds * 1000:>10.1f} ms")
+
+    if args.max_seconds is not None and median_import > args.max_seconds:
+        print(f"❌ Startup budget exceeded: {median_import:.3f}s > {args.max_seconds:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""WTT cache tier shared across worker processes."""
@@ -0,0 +1,40 @@
+import os
+from typing import Any, Optional
+
+import orjson
+
+from .shared import SharedCache, get_cache
+
+RESEARCH_CACHE = "research"
+
+
+def research_key(token_name: str) -> str:
+    """Cache key for a token's research results."""
+    return f"{RESEARCH_CACHE}:{token_name.strip().lower()}"
+
+
+def research_ttl() -> float:
+    """Seconds research results stay fresh in the shared cache."""
+    return float(os.getenv("RESEARCH_CACHE_TTL_SECONDS", "300"))
+
+
+async def get_cached_research(token_name: str, cache: Optional[SharedCache] = None) -> Optional[bytes]:
+    """
+    Return research results cached by any worker as JSON bytes, or None on a
+    miss. The bytes can be embedded in a response without decoding them.
+
+    :param cache: Cache to read (default: the process-wide shared cache)
+    """
+    return await (cache or get_cache()).lookup(RESEARCH_CACHE, research_key(token_name))
+
+
+async def store_research(token_name: str, research: Any, cache: Optional[SharedCache] = None) -> bytes:
+    """
+    Share fresh research results with every worker.
+
+    :param cache: Cache to write (default: the process-wide shared cache)
+    :return: The serialized research, reusable for the response body
+    """
+    payload = orjson.dumps(research)
+    await (cache or get_cache()).set(research_key(token_name), payload, research_ttl())
+    return payload
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from ..monitoring.metrics import record_cache_lookup
+
+
+class SharedCache:
+    """
+    Byte-oriented cache visible to every worker process.
+
+    Values are opaque bytes so callers decide the serialization (and can store
+    pre-serialized response bodies).
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    async def lookup(self, cache_name: str, key: str) -> Optional[bytes]:
+        """
+        ``get`` that also records a hit or miss for ``cache_name`` in the metrics.
+        """
+        value = await self.get(key)
+        record_cache_lookup(cache_name, value is not None)
+        return value
+
+
+class SQLiteCache(SharedCache):
+    """
+    Local stand-in for Redis: a SQLite file in WAL mode shared by the workers
+    of one host. Operations run in a worker thread to keep the event loop free.
+    """
+
+    def __init__(self, path: Optional[str] = None, purge_probability: float = 0.01):
+        """
+        :param path: SQLite file shared by the workers (default: ``CACHE_DB``,
+            set by ``api.server`` for its workers, otherwise a file private to
+            this cache, removed with it)
+        """
+        self._directory = None
+        if not (path or os.getenv("CACHE_DB")):
+            self._directory = tempfile.TemporaryDirectory(prefix="wtt_cache_")
+        self.path = path or os.getenv("CACHE_DB") or os.path.join(self._directory.name, "cache.sqlite3")
+        self.purge_probability = purge_probability
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: bytes, ttl: float):
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+            (key, value, time.time() + ttl),
+        )
+        if random.random() < self.purge_probability:
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+
+    def _delete(self, key: str):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+
+class RedisCache(SharedCache):
+    """
+    Redis-backed cache for deployments spanning several hosts.
+    """
+
+    def __init__(self, url: str):
+        # Optional dependency: only required when REDIS_URL is configured.
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+    async def close(self):
+        await self._client.close()
+
+
+_cache: Optional[SharedCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> SharedCache:
+    """
+    Return the process-wide shared cache: Redis when ``REDIS_URL`` is set,
+    otherwise the host-local SQLite stand-in (``CACHE_DB``). Callers accept
+    their own cache instead, e.g. one on a temporary file in tests.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                redis_url = os.getenv("REDIS_URL")
+                _cache = RedisCache(redis_url) if redis_url else SQLiteCache()
+    return _cache
@@ -0,0 +1,390 @@
+import asyncio
+import hashlib
+import html
+import ipaddress
+import logging
+import os
+import re
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import orjson
+
+from ..agents.research_merge import normalize_url
+from ..monitoring.metrics import record_cache_lookup, record_upstream_call
+from .shared import SharedCache, get_cache
+
+logger = logging.getLogger(__name__)
+
+SOURCE_CACHE = "source"
+
+# Freshness per domain suffix: explorers change quickly, docs rarely.
+DEFAULT_DOMAIN_TTLS = {
+    "etherscan.io": 300,
+    "worldscan.org": 300,
+    "coingecko.com": 600,
+    "coinmarketcap.com": 600,
+    "github.com": 6 * 3600,
+    "gitbook.io": 24 * 3600,
+    "medium.com": 24 * 3600,
+}
+
+_SCRIPT_STYLE = re.compile(r"<(script|style|noscript)\b.*?</\1>", re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+
+
+def html_to_text(body: str) -> str:
+    """Crude visible-text extraction for HTML pages."""
+    body = _SCRIPT_STYLE.sub(" ", body)
+    body = _TAG.sub(" ", body)
+    return _SPACE.sub(" ", html.unescape(body)).strip()
+
+
+class DomainTTLPolicy:
+    """
+    Freshness lifetime of cached pages, per domain suffix.
+
+    Overrides come from ``SOURCE_TTL_OVERRIDES`` as ``domain=seconds`` pairs
+    separated by commas.
+    """
+
+    def __init__(self, default_ttl: Optional[float] = None, rules: Optional[Dict[str, float]] = None):
+        self.default_ttl = default_ttl if default_ttl is not None else float(
+            os.getenv("SOURCE_DEFAULT_TTL_SECONDS", "3600"))
+        self.rules = dict(DEFAULT_DOMAIN_TTLS if rules is None else rules)
+        for item in filter(None, os.getenv("SOURCE_TTL_OVERRIDES", "").split(",")):
+            domain, _, seconds = item.partition("=")
+            self.rules[domain.strip().lower()] = float(seconds)
+
+    def ttl_for(self, url: str) -> float:
+        host = urlsplit(url).hostname or ""
+        labels = host.lower().split(".")
+        # Most specific suffix wins: docs.example.com before example.com
+        for i in range(len(labels)):
+            ttl = self.rules.get(".".join(labels[i:]))
+            if ttl is not None:
+                return ttl
+        return self.default_ttl
+
+
+class SourceCache:
+    """
+    URL-level page cache on top of the shared cache tier.
+
+    Entries keep validators (ETag, Last-Modified) and a content hash; bodies
+    are stored once per hash, so mirrors and unchanged revalidations share
+    storage.
+    """
+
+    def __init__(self, cache: Optional[SharedCache] = None, retention: Optional[float] = None):
+        self.cache = cache or get_cache()
+        # How long entries are kept for revalidation, beyond their freshness
+        self.retention = retention if retention is not None else float(
+            os.getenv("SOURCE_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+    @staticmethod
+    def _entry_key(url: str) -> str:
+        return f"{SOURCE_CACHE}:{normalize_url(url)}"
+
+    @staticmethod
+    def _body_key(content_hash: str) -> str:
+        return f"{SOURCE_CACHE}-body:{content_hash}"
+
+    async def get_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        raw = await self.cache.get(self._entry_key(url))
+        return orjson.loads(raw) if raw is not None else None
+
+    async def put_entry(self, url: str, entry: Dict[str, Any]):
+        await self.cache.set(self._entry_key(url), orjson.dumps(entry), self.retention)
+
+    async def get_body(self, content_hash: str) -> Optional[str]:
+        raw = await self.cache.get(self._body_key(content_hash))
+        return raw.decode("utf-8") if raw is not None else None
+
+    async def put_body(self, content: str) -> str:
+        """
+        Store a page body under its SHA-256.
+
+        :return: The content hash
+        """
+        data = content.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        await self.cache.set(self._body_key(content_hash), data, self.retention)
+        return content_hash
+
+
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+
+
+class SourceFetchRejected(Exception):
+    """A source URL (or a redirect target) is not a public http(s) address."""
+
+
+async def resolve_host(host: str, port: int) -> List[str]:
+    """Addresses ``host`` resolves to, as strings."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def is_public_address(address: str) -> bool:
+    """Whether an IP address is globally routable (not private, loopback, link-local, ...)."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class PinnedAddressBackend:
+    """
+    httpcore network backend that connects to the address recorded for a
+    host by the address check, never resolving the name again, so a DNS
+    answer cannot change between the check and the connection.
+
+    URLs keep their hostname, so ``Host``, SNI and certificate checks still
+    use it.
+    """
+
+    def __init__(self, backend=None):
+        import httpcore
+
+        self.backend = backend or httpcore.AnyIOBackend()
+        self.pins: Dict[Tuple[str, int], str] = {}
+
+    def pin(self, host: str, port: int, address: str):
+        self.pins[(host.lower(), port)] = address
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+                          local_address: Optional[str] = None, socket_options=None):
+        import httpcore
+
+        address = self.pins.get((host.lower(), port))
+        if address is None:
+            raise httpcore.ConnectError(f"No checked address for {host}:{port}")
+        return await self.backend.connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                              socket_options=socket_options)
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None):
+        import httpcore
+
+        raise httpcore.ConnectError("Unix sockets are not used for sources")
+
+    async def sleep(self, seconds: float):
+        await self.backend.sleep(seconds)
+
+
+def pinned_transport(backend: PinnedAddressBackend):
+    """httpx transport whose connections go through ``backend``."""
+    import httpcore
+    import httpx
+
+    transport = httpx.AsyncHTTPTransport()
+    transport._pool = httpcore.AsyncConnectionPool(
+        ssl_context=httpx.create_ssl_context(), network_backend=backend)
+    return transport
+
+
+class SourceFetcher:
+    """
+    Fetches raw page content through the source cache.
+
+    Fresh entries are served locally; stale ones are revalidated with
+    ``If-None-Match`` / ``If-Modified-Since`` so unchanged pages cost a 304
+    instead of a full download.
+
+    Source URLs come from search results, so every request (redirects
+    included) must resolve to public addresses only, and bodies are streamed
+    and cut off at ``max_bytes``. Connections go to the address that was
+    checked rather than resolving the host again.
+    """
+
+    def __init__(self, store: Optional[SourceCache] = None, policy: Optional[DomainTTLPolicy] = None,
+                 timeout: Optional[float] = None, max_bytes: Optional[int] = None,
+                 max_concurrency: int = 5, clock: Callable[[], float] = time.time,
+                 public_only: Optional[bool] = None, max_redirects: int = 5,
+                 transport=None, resolver: Callable[[str, int], Awaitable[List[str]]] = resolve_host):
+        """
+        :param public_only: Refuse hosts resolving to non-public addresses
+            (default: on, except in ``WTT_MODE=local`` where pages are served in-process)
+        :param transport: httpx transport (default: the network, or the local page stand-in)
+        :param resolver: Async ``(host, port) -> addresses`` used for the address check
+        """
+        from ..upstream.mode import local_mode
+
+        self.store = store or SourceCache()
+        self.policy = policy or DomainTTLPolicy()
+        self.timeout = timeout if timeout is not None else float(os.getenv("SOURCE_FETCH_TIMEOUT_SECONDS", "5"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("SOURCE_MAX_BYTES", "500000"))
+        self.max_concurrency = max_concurrency
+        self.clock = clock
+        self.public_only = public_only if public_only is not None else not local_mode()
+        self.max_redirects = max_redirects
+        self.transport = transport
+        self.resolver = resolver
+        self._backend = PinnedAddressBackend()
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+
+            from ..upstream.mode import local_mode
+
+            transport = self.transport
+            if transport is None and local_mode():
+                from ..upstream.local import local_page_transport
+
+                transport = local_page_transport()
+            elif transport is None and self.public_only:
+                transport = pinned_transport(self._backend)
+            # Redirects are followed by hand, so each hop is checked
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, follow_redirects=False,
+                headers={"User-Agent": "wtt-source-fetcher/0.1"},
+                transport=transport,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def check_url(self, url: str) -> Optional[str]:
+        """
+        Check a URL and, with ``public_only``, pin its host to the checked
+        address for the next connection.
+
+        :return: The address connections will use, or None without ``public_only``
+        :raises SourceFetchRejected: If the URL is not http(s) or, with
+            ``public_only``, its host resolves to a non-public address
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise SourceFetchRejected(f"Unsupported source URL: {url}")
+        if not self.public_only:
+            return None
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = await self.resolver(parts.hostname, port)
+        if not addresses or not all(is_public_address(address) for address in addresses):
+            raise SourceFetchRejected(f"Source host {parts.hostname} is not a public address")
+        self._backend.pin(parts.hostname, port, addresses[0])
+        return addresses[0]
+
+    async def _get(self, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        GET a URL, following checked redirects, reading at most ``max_bytes``
+        of the body.
+
+        :return: (status, response headers, body bytes)
+        """
+        client = self._get_client()
+        for _ in range(self.max_redirects + 1):
+            await self.check_url(url)
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code in REDIRECT_STATUSES and "location" in response.headers:
+                    url = urljoin(url, response.headers["location"])
+                    continue
+                body = bytearray()
+                if response.status_code == 200:
+                    async for chunk in response.aiter_bytes():
+                        body += chunk[:self.max_bytes - len(body)]
+                        if len(body) >= self.max_bytes:
+                            break
+                return response.status_code, dict(response.headers), bytes(body)
+        raise SourceFetchRejected(f"Too many redirects for {url}")
+
+    @staticmethod
+    def _decode(headers: Dict[str, str], body: bytes) -> str:
+        charset = "utf-8"
+        for parameter in headers.get("content-type", "").split(";")[1:]:
+            name, _, value = parameter.strip().partition("=")
+            if name.lower() == "charset" and value:
+                charset = value.strip('"')
+        try:
+            return body.decode(charset, errors="replace")
+        except LookupError:
+            return body.decode("utf-8", errors="replace")
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """
+        Return the text content of a page, from cache when possible.
+
+        :return: Page text, or None if it could not (or may not) be fetched
+        """
+        now = self.clock()
+        entry = await self.store.get_entry(url)
+        if entry is not None and entry["fresh_until"] > now:
+            body = await self.store.get_body(entry["hash"])
+            if body is not None:
+                record_cache_lookup(SOURCE_CACHE, True)
+                return body
+        record_cache_lookup(SOURCE_CACHE, False)
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            status, response_headers, raw = await self._get(url, headers)
+            ttl = self.policy.ttl_for(url)
+            if status == 304 and entry is not None:
+                body = await self.store.get_body(entry["hash"])
+                if body is not None:
+                    record_upstream_call("source_fetch", True)
+                    entry["fresh_until"] = now + ttl
+                    await self.store.put_entry(url, entry)
+                    return body
+                # Body evicted: fetch it again without validators
+                status, response_headers, raw = await self._get(url, {})
+        except SourceFetchRejected as e:
+            logger.warning("Source fetch refused: %s", e)
+            return None
+        except Exception as e:
+            record_upstream_call("source_fetch", False)
+            logger.warning("Source fetch failed for %s: %s", url, e)
+            return None
+        record_upstream_call("source_fetch", status < 500)
+
+        if status != 200:
+            return None
+
+        content = self._decode(response_headers, raw)
+        if "html" in response_headers.get("content-type", ""):
+            content = html_to_text(content)
+        if "no-store" in response_headers.get("cache-control", ""):
+            return content
+
+        content_hash = await self.store.put_body(content)
+        await self.store.put_entry(url, {
+            "hash": content_hash,
+            "etag": response_headers.get("etag"),
+            "last_modified": response_headers.get("last-modified"),
+            "fresh_until": now + ttl,
+        })
+        return content
+
+    async def attach_raw_content(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fill ``raw_content`` of search results concurrently; results whose page
+        cannot be fetched are left without it.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def attach(result):
+            async with semaphore:
+                try:
+                    content = await self.fetch(result["url"])
+                except Exception as e:
+                    logger.warning("Source cache error for %s: %s", result['url'], e)
+                    content = None
+            if content is not None:
+                result["raw_content"] = content
+
+        await asyncio.gather(*(attach(result) for result in results if result.get("url")))
+        return results
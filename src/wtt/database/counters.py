@@ -0,0 +1,119 @@
+import os
+import random
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.token import Token
+from ..models.token_counter_shard import TokenCounterShard
+
+COUNTERS = ("humans", "holder_count")
+
+tokens = Token.__table__
+shards = TokenCounterShard.__table__
+
+
+def shard_count() -> int:
+    """Shards per token counter (TOKEN_COUNTER_SHARDS)."""
+    return max(int(os.getenv("TOKEN_COUNTER_SHARDS", "16")), 1)
+
+
+def _check_counter(counter: str):
+    if counter not in COUNTERS:
+        raise ValueError(f"Unknown token counter: {counter!r}")
+
+
+def increment_statement(token_id: int, counter: str, amount: int = 1, shard: Optional[int] = None):
+    """
+    Build the upsert adding ``amount`` to one shard of a token counter.
+
+    :param shard: Shard to write, random when None
+    :raises ValueError: If the counter is unknown
+    """
+    _check_counter(counter)
+    if shard is None:
+        shard = random.randrange(shard_count())
+    statement = insert(shards).values(token_id=token_id, counter=counter, shard=shard, delta=amount)
+    return statement.on_conflict_do_update(
+        index_elements=[shards.c.token_id, shards.c.counter, shards.c.shard],
+        set_={"delta": shards.c.delta + statement.excluded.delta},
+    )
+
+
+async def increment_counter(db: AsyncSession, token_id: int, counter: str, amount: int = 1):
+    """
+    Add ``amount`` to a token counter without touching the ``tokens`` row.
+
+    :raises ValueError: If the counter is unknown
+    """
+    await db.execute(increment_statement(token_id, counter, amount))
+    await db.commit()
+
+
+def counter_queries(token_ids: List[int]):
+    """
+    Build the queries for the folded counter values and the pending shard sums.
+    """
+    base = select(tokens.c.id, tokens.c.humans, tokens.c.holder_count).where(tokens.c.id.in_(token_ids))
+    pending = (
+        select(shards.c.token_id, shards.c.counter, func.sum(shards.c.delta))
+        .where(shards.c.token_id.in_(token_ids))
+        .group_by(shards.c.token_id, shards.c.counter)
+    )
+    return base, pending
+
+
+async def read_counters(db: AsyncSession, token_ids: Iterable[int]) -> Dict[int, Dict[str, Optional[int]]]:
+    """
+    Current counter values: the folded value on ``tokens`` plus pending shards.
+
+    ``humans`` starts at 0; a ``holder_count`` stays None (unknown) until
+    something is counted, as on the token page and after a fold.
+
+    :return: Token id to {counter: value}, for the tokens that exist
+    """
+    base_query, pending_query = counter_queries(list(token_ids))
+    values = {
+        row.id: {"humans": row.humans or 0, "holder_count": row.holder_count}
+        for row in await db.execute(base_query)
+    }
+    pending = await db.execute(pending_query)
+    for token_id, counter, delta in pending:
+        if token_id in values and counter in COUNTERS:
+            values[token_id][counter] = (values[token_id][counter] or 0) + int(delta)
+    return values
+
+
+# Moves every pending shard delta into tokens in one statement: rows deleted
+# here are re-created by the next increment, so no update is lost.
+FOLD_SQL = text("""
+WITH moved AS (
+    DELETE FROM token_counter_shards
+    RETURNING token_id, counter, delta
+), totals AS (
+    SELECT token_id,
+           SUM(delta) FILTER (WHERE counter = 'humans') AS humans,
+           SUM(delta) FILTER (WHERE counter = 'holder_count') AS holder_count
+    FROM moved
+    GROUP BY token_id
+)
+UPDATE tokens
+SET humans = COALESCE(tokens.humans, 0) + COALESCE(totals.humans, 0),
+    holder_count = CASE WHEN totals.holder_count IS NULL THEN tokens.holder_count
+                        ELSE COALESCE(tokens.holder_count, 0) + totals.holder_count END
+FROM totals
+WHERE tokens.id = totals.token_id
+""")
+
+
+async def fold_counters(db: AsyncSession) -> int:
+    """
+    Fold pending shard deltas into the ``tokens`` columns.
+
+    :return: Number of tokens updated
+    """
+    result = await db.execute(FOLD_SQL)
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,79 @@
+"""
+Explicit schema management, run once per deployment instead of at worker boot.
+
+Usage:
+    python -m wtt.database.migrate upgrade   # apply pending migrations
+    python -m wtt.database.migrate status    # show applied and pending versions
+    python -m wtt.database.migrate explain   # fail on sequential scans in hot queries
+
+``create`` and ``indexes`` are kept as aliases of ``upgrade``.
+"""
+import asyncio
+import sys
+
+from ..upstream.mode import local_mode
+from .config import engine
+from .migrations import MIGRATIONS, applied_versions
+from .migrations import upgrade as apply_migrations
+from .plan_check import check_query_plans
+
+
+async def upgrade() -> int:
+    """Apply every pending migration."""
+    try:
+        applied = await apply_migrations(engine)
+        for migration in applied:
+            print(f"Applied {migration.version}: {migration.name}")
+        print(f"Schema is at version {MIGRATIONS[-1].version}.")
+        return 0
+    finally:
+        await engine.dispose()
+
+
+async def status() -> int:
+    """Show applied and pending migrations."""
+    try:
+        applied = set(await applied_versions(engine))
+        for migration in MIGRATIONS:
+            print(f"{'applied' if migration.version in applied else 'pending':<8} "
+                  f"{migration.version}: {migration.name}")
+        return 0
+    finally:
+        await engine.dispose()
+
+
+async def explain() -> int:
+    """
+    Check the hot queries' plans. Data is only seeded in local mode; other
+    databases are checked as they are.
+    """
+    try:
+        violations = await check_query_plans(engine, seed_rows=None if local_mode() else 0)
+    finally:
+        await engine.dispose()
+    for name, tables in violations.items():
+        print(f"❌ {name}: sequential scan on {', '.join(tables)}")
+    if not violations:
+        print("✅ No sequential scans over large tables")
+    return 1 if violations else 0
+
+
+COMMANDS = {
+    "upgrade": upgrade,
+    "status": status,
+    "explain": explain,
+    "create": upgrade,
+    "indexes": upgrade,
+}
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1 or argv[0] not in COMMANDS:
+        print(f"Usage: python -m wtt.database.migrate [{'|'.join(COMMANDS)}]")
+        return 2
+    return asyncio.run(COMMANDS[argv[0]]())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in ``schema_migrations``. Migrations are
+append-only: to change the schema, add a new migration with the next version
+instead of editing one that may already have run. Each one is frozen DDL,
+never the live model metadata, so a new database replays the same history
+as an old one; tests check that the result matches the models.
+"""
+import logging
+from typing import Callable, List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select, text
+
+from ..background.leader import lock_key
+
+logger = logging.getLogger(__name__)
+
+version_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, server_default=func.now()),
+)
+
+
+def schema_metadata() -> MetaData:
+    """
+    The shared model metadata, with every model loaded. Migrations do not use
+    it: they must keep creating the schema of their own version.
+    """
+    from .config import load_models
+
+    return load_models()
+
+
+class Migration:
+    def __init__(self, version: int, name: str, upgrade: Callable):
+        """
+        :param upgrade: Function applying the change on a sync connection
+        """
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+
+    def __repr__(self):
+        return f"<Migration({self.version}, '{self.name}')>"
+
+
+def _run_ddl(statements):
+    def run(sync_conn):
+        for statement in statements:
+            sync_conn.execute(text(statement))
+    return run
+
+
+# Schema as of version 1, frozen. IF NOT EXISTS adopts databases created by
+# create_all before migrations existed.
+BASELINE_DDL = (
+    "CREATE TABLE IF NOT EXISTS tokens ("
+    "id SERIAL NOT NULL, "
+    "address VARCHAR(42) NOT NULL, "
+    "symbol VARCHAR(20) NOT NULL, "
+    "name VARCHAR(100) NOT NULL, "
+    "decimals INTEGER NOT NULL, "
+    "total_supply NUMERIC, "
+    "circulating_supply NUMERIC, "
+    "holder_count INTEGER, "
+    "type VARCHAR(10), "
+    "icon_url VARCHAR(255), "
+    "created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL, "
+    "last_updated TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL, "
+    "website VARCHAR(512), "
+    "is_native BOOLEAN NOT NULL, "
+    "app_id VARCHAR, "
+    "humans INTEGER NOT NULL, "
+    "PRIMARY KEY (id), "
+    "UNIQUE (address))",
+    "CREATE TABLE IF NOT EXISTS users ("
+    "id SERIAL NOT NULL, "
+    "username VARCHAR(50) NOT NULL, "
+    "email VARCHAR(120) NOT NULL, "
+    "hashed_password VARCHAR(255) NOT NULL, "
+    "is_active BOOLEAN NOT NULL, "
+    "worldcoin_sub VARCHAR(100), "
+    "verification_score FLOAT NOT NULL, "
+    "total_verifications INTEGER NOT NULL, "
+    "accuracy_rate FLOAT NOT NULL, "
+    "total_rewards FLOAT NOT NULL, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL, "
+    "last_login TIMESTAMP WITHOUT TIME ZONE, "
+    "PRIMARY KEY (id), "
+    "UNIQUE (username), "
+    "UNIQUE (email), "
+    "UNIQUE (worldcoin_sub))",
+    "CREATE TABLE IF NOT EXISTS question_verdicts ("
+    "question_id SERIAL NOT NULL, "
+    "token_id INTEGER NOT NULL, "
+    "verdict BOOLEAN NOT NULL, "
+    "confidence FLOAT NOT NULL, "
+    "answers INTEGER NOT NULL, "
+    "final BOOLEAN NOT NULL, "
+    "updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(), "
+    "PRIMARY KEY (question_id), "
+    "FOREIGN KEY (token_id) REFERENCES tokens (id) ON DELETE CASCADE)",
+    "CREATE TABLE IF NOT EXISTS token_counter_shards ("
+    "token_id INTEGER NOT NULL, "
+    "counter VARCHAR(20) NOT NULL, "
+    "shard SMALLINT NOT NULL, "
+    "delta BIGINT NOT NULL, "
+    "PRIMARY KEY (token_id, counter, shard), "
+    "FOREIGN KEY (token_id) REFERENCES tokens (id) ON DELETE CASCADE)",
+    "CREATE TABLE IF NOT EXISTS token_extracted_data ("
+    "id SERIAL NOT NULL, "
+    "token_id INTEGER NOT NULL, "
+    "token_name VARCHAR(100) NOT NULL, "
+    "research_results JSON NOT NULL, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(), "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY (token_id) REFERENCES tokens (id))",
+    "CREATE TABLE IF NOT EXISTS verification_answers ("
+    "id BIGSERIAL NOT NULL, "
+    "question_id INTEGER NOT NULL, "
+    "token_id INTEGER NOT NULL, "
+    "user_id INTEGER NOT NULL, "
+    "answer BOOLEAN NOT NULL, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(), "
+    "PRIMARY KEY (id), "
+    "CONSTRAINT uq_verification_answers_question_user UNIQUE (question_id, user_id), "
+    "FOREIGN KEY (token_id) REFERENCES tokens (id) ON DELETE CASCADE)",
+)
+
+
+# Indexes serving the API's hot queries; plan_check verifies they are used
+HOT_PATH_INDEXES = {
+    "ix_tokens_listing": "tokens (coalesce(holder_count, 0), id)",
+    "ix_tokens_type_listing": "tokens (type, coalesce(holder_count, 0), id)",
+    "ix_tokens_native_listing": "tokens (is_native, coalesce(holder_count, 0), id)",
+    "ix_tokens_name": "tokens (name)",
+    "ix_token_extracted_data_token_latest": "token_extracted_data (token_id, created_at)",
+    "ix_token_extracted_data_name_latest": "token_extracted_data (token_name, created_at)",
+    "ix_users_verification_score": "users (verification_score DESC)",
+    "ix_verification_answers_user": "verification_answers (user_id)",
+}
+
+
+# Indexes behind the token page's verification stats
+TOKEN_DETAIL_INDEXES = {
+    "ix_verification_answers_token": "verification_answers (token_id, user_id)",
+    "ix_question_verdicts_token": "question_verdicts (token_id)",
+}
+
+# Newest answer per token, read when revalidating a token page
+TOKEN_VERSION_INDEXES = {
+    "ix_verification_answers_token_latest": "verification_answers (token_id, id)",
+}
+
+
+def _index_ddl(indexes):
+    return tuple(f"CREATE INDEX IF NOT EXISTS {name} ON {target}" for name, target in indexes.items())
+
+
+def _add_user_history(sync_conn):
+    # Baselines created from newer models already have the columns
+    sync_conn.execute(text(
+        "ALTER TABLE users "
+        "ADD COLUMN IF NOT EXISTS graded_answers INTEGER NOT NULL DEFAULT 0, "
+        "ADD COLUMN IF NOT EXISTS agreed_answers DOUBLE PRECISION NOT NULL DEFAULT 0"))
+
+
+def _add_verification_questions(sync_conn):
+    # Question ids come from this sequence, shared by every worker
+    sync_conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS verification_questions ("
+        "id SERIAL PRIMARY KEY, "
+        "token_id INTEGER NOT NULL REFERENCES tokens (id) ON DELETE CASCADE, "
+        "question_text TEXT NOT NULL, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now())"))
+    sync_conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_verification_questions_token ON verification_questions (token_id)"))
+    # Questions registered before this table (e.g. in worker memory) may have
+    # answers; start allocating above them
+    sync_conn.execute(text(
+        "SELECT setval(pg_get_serial_sequence('verification_questions', 'id'), "
+        "GREATEST((SELECT max(question_id) FROM verification_answers), "
+        "(SELECT max(question_id) FROM question_verdicts), "
+        "(SELECT max(id) FROM verification_questions), 0) + 1, false)"))
+
+
+JOB_RUNS_DDL = (
+    "CREATE TABLE IF NOT EXISTS job_runs ("
+    "name VARCHAR(100) NOT NULL, "
+    "last_run_at TIMESTAMP WITH TIME ZONE NOT NULL, "
+    "PRIMARY KEY (name))",
+)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema", _run_ddl(BASELINE_DDL)),
+    Migration(2, "hot path indexes", _run_ddl(_index_ddl(HOT_PATH_INDEXES))),
+    Migration(3, "token detail indexes", _run_ddl(_index_ddl(TOKEN_DETAIL_INDEXES))),
+    Migration(4, "user graded answer history", _add_user_history),
+    Migration(5, "verification questions", _add_verification_questions),
+    Migration(6, "background job runs", _run_ddl(JOB_RUNS_DDL)),
+    Migration(7, "token version indexes", _run_ddl(_index_ddl(TOKEN_VERSION_INDEXES))),
+]
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version
+
+
+async def applied_versions(engine) -> List[int]:
+    """
+    :return: Applied migration versions, ascending (empty for a new database)
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(version_metadata.create_all, checkfirst=True)
+        result = await conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version))
+        return [row.version for row in result]
+
+
+async def upgrade(engine, target: Optional[int] = None) -> List[Migration]:
+    """
+    Apply pending migrations up to ``target`` (default: the latest), each in
+    its own transaction.
+
+    Concurrent runs (e.g. several deploy jobs) serialize on an advisory lock
+    and skip versions applied in the meantime.
+
+    :return: The migrations applied by this call
+    """
+    target = latest_version() if target is None else target
+    await applied_versions(engine)
+    applied: List[Migration] = []
+    for migration in MIGRATIONS:
+        if migration.version > target:
+            break
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": lock_key("wtt-migrations")})
+            done = await conn.scalar(
+                select(schema_migrations.c.version).where(schema_migrations.c.version == migration.version))
+            if done is not None:
+                continue
+            logger.info("Applying migration %s: %s", migration.version, migration.name)
+            await conn.run_sync(migration.upgrade)
+            await conn.execute(schema_migrations.insert().values(version=migration.version, name=migration.name))
+        applied.append(migration)
+    return applied
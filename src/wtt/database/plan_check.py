@@ -0,0 +1,191 @@
+"""
+Query-plan check for the API's hot queries.
+
+Seeds a local database inside a transaction, runs ``EXPLAIN`` on every query
+the endpoints issue and reports sequential scans over large tables. The
+transaction is rolled back, so the seeded rows never persist.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional
+
+from sqlalchemy import select, text
+
+from .counters import counter_queries
+from .queries import (
+    encode_cursor, leaderboard_query, stored_research_query, token_detail_query, token_page_query,
+    token_version_query,
+)
+
+
+class HotQuery:
+    def __init__(self, name: str, build: Callable[[], Any], full_scan_ok: FrozenSet[str] = frozenset()):
+        """
+        :param build: Function returning the SQLAlchemy statement to explain
+        :param full_scan_ok: Tables this query reads entirely by design
+        """
+        self.name = name
+        self.build = build
+        self.full_scan_ok = full_scan_ok
+
+
+def hot_queries() -> List[HotQuery]:
+    """
+    The queries behind each endpoint and background job, with sample arguments.
+    """
+    from ..background.jobs import stale_research_query
+    from ..models.token import Token
+    from ..models.user import User
+    from ..verification.consensus import active_answers_query
+    from ..verification.questions import (
+        open_answers_query, open_questions_query, question_state_query, tokens_without_questions_query,
+    )
+
+    tokens, users = Token.__table__, User.__table__
+    base_counters, pending_counters = counter_queries([1, 2, 3])
+    return [
+        HotQuery("GET /tokens", lambda: token_page_query(50)),
+        HotQuery("GET /tokens (next page)", lambda: token_page_query(50, encode_cursor(500, 1000))),
+        HotQuery("GET /tokens?type=", lambda: token_page_query(50, token_type="ERC20")),
+        HotQuery("GET /tokens?is_native=", lambda: token_page_query(50, is_native=True)),
+        HotQuery("GET /tokens/{id}", lambda: token_detail_query(1)),
+        HotQuery("GET /tokens/{id} (version)", lambda: token_version_query(1)),
+        HotQuery("GET /tokens/{id}/counters (base)", lambda: base_counters),
+        HotQuery("GET /tokens/{id}/counters (shards)", lambda: pending_counters),
+        HotQuery("GET /tokens/verify/{id} (token)", lambda: select(tokens.c.name).where(tokens.c.id == 1)),
+        HotQuery("token by name", lambda: select(tokens.c.id).where(tokens.c.name == "Plan Token 7")),
+        HotQuery("stored research by id", lambda: stored_research_query(token_id=1)),
+        HotQuery("stored research by name", lambda: stored_research_query(token_name="Plan Token 7")),
+        HotQuery("GET /leaderboard", lambda: leaderboard_query(10)),
+        HotQuery("POST /tokens/answer (question state)", lambda: question_state_query(1)),
+        HotQuery("GET /questions/next (user)",
+                 lambda: select(users.c.accuracy_rate, users.c.total_verifications).where(users.c.id == 1)),
+        HotQuery("GET /questions/next (open questions)", lambda: open_questions_query(0, 1000)),
+        HotQuery("GET /questions/next (new answers)", lambda: open_answers_query(1000, 1000)),
+        # Background jobs aggregate whole tables on purpose
+        HotQuery("research refresh job", lambda: stale_research_query(datetime.utcnow() - timedelta(hours=24), 20),
+                 frozenset({"token_extracted_data", "tokens"})),
+        HotQuery("consensus job", active_answers_query, frozenset({"verification_answers", "question_verdicts"})),
+        HotQuery("question generation job", lambda: tokens_without_questions_query(10),
+                 frozenset({"tokens", "verification_questions"})),
+    ]
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Walk every node of an ``EXPLAIN (FORMAT JSON)`` plan."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def sequential_scans(plan: Dict[str, Any], large_tables: Dict[str, float],
+                     allowed: FrozenSet[str] = frozenset()) -> List[str]:
+    """
+    :param large_tables: Table name to estimated rows, for tables over the size limit
+    :param allowed: Tables the query may scan entirely
+    :return: Large tables read with a sequential scan
+    """
+    return [
+        node["Relation Name"] for node in plan_nodes(plan)
+        if node.get("Node Type") == "Seq Scan"
+        and node.get("Relation Name") in large_tables
+        and node["Relation Name"] not in allowed
+    ]
+
+
+# Seed data: ``:rows`` tokens and users, two research rows per token, one
+# question per token, five answers per question and a verdict on every other
+# question.
+SEED_SQL = [
+    """
+    INSERT INTO tokens (address, symbol, name, decimals, holder_count, type, is_native, humans)
+    SELECT '0x' || lpad(to_hex(g), 40, '0'), 'PLAN' || g, 'Plan Token ' || g, 18,
+           (g * 7919) % 100000, (ARRAY['ERC20', 'ERC721', 'native'])[1 + g % 3], g % 50 = 0, 0
+    FROM generate_series(1, :rows) AS g
+    """,
+    """
+    INSERT INTO users (username, email, hashed_password, is_active, verification_score,
+                       total_verifications, accuracy_rate, total_rewards)
+    SELECT 'plan_user_' || g, 'plan' || g || '@example.com', 'x', true, (g * 7919) % 10000,
+           g % 100, (g * 31) % 100, 0
+    FROM generate_series(1, :rows) AS g
+    """,
+    """
+    INSERT INTO token_extracted_data (token_id, token_name, research_results, created_at)
+    SELECT t.id, t.name, '{}'::json, now() - (t.id % 720 + g) * interval '1 hour'
+    FROM tokens AS t, generate_series(1, 2) AS g
+    WHERE t.symbol LIKE 'PLAN%'
+    """,
+    """
+    INSERT INTO verification_questions (token_id, question_text)
+    SELECT t.id, 'Is ' || t.name || ' genuine?'
+    FROM tokens AS t
+    WHERE t.symbol LIKE 'PLAN%'
+    """,
+    """
+    INSERT INTO verification_answers (question_id, token_id, user_id, answer)
+    SELECT g / 5, t.id, g, g % 3 <> 0
+    FROM generate_series(1, :rows) AS g
+    JOIN tokens AS t ON t.symbol = 'PLAN' || (1 + g / 5)
+    """,
+    """
+    INSERT INTO question_verdicts (question_id, token_id, verdict, confidence, answers, final)
+    SELECT DISTINCT ON (question_id) question_id, token_id, true, 0.9, 5, question_id % 2 = 0
+    FROM verification_answers
+    ORDER BY question_id
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+
+async def seed(conn, rows: int):
+    for statement in SEED_SQL:
+        await conn.execute(text(statement), {"rows": rows})
+    await conn.execute(text("ANALYZE"))
+
+
+async def large_tables(conn, min_rows: float) -> Dict[str, float]:
+    result = await conn.execute(text(
+        "SELECT relname, reltuples FROM pg_class "
+        "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace AND reltuples >= :min_rows"
+    ), {"min_rows": min_rows})
+    return {name: float(rows) for name, rows in result}
+
+
+async def explain(conn, statement) -> Dict[str, Any]:
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+    document = result.scalar()
+    if isinstance(document, str):
+        document = json.loads(document)
+    return document[0]["Plan"]
+
+
+async def check_query_plans(engine, seed_rows: Optional[int] = None,
+                            min_rows: Optional[float] = None) -> Dict[str, List[str]]:
+    """
+    Explain every hot query and report sequential scans over large tables.
+
+    :param seed_rows: Rows per table to seed first (rolled back afterwards); 0 to use existing data
+    :param min_rows: Estimated rows from which a table counts as large (PLAN_CHECK_MIN_ROWS)
+    :return: Query name to the large tables it scans sequentially, for failing queries only
+    """
+    seed_rows = seed_rows if seed_rows is not None else int(os.getenv("PLAN_CHECK_ROWS", "50000"))
+    min_rows = min_rows if min_rows is not None else float(os.getenv("PLAN_CHECK_MIN_ROWS", "10000"))
+
+    violations: Dict[str, List[str]] = {}
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            if seed_rows:
+                await seed(conn, seed_rows)
+            sizes = await large_tables(conn, min_rows)
+            for query in hot_queries():
+                scans = sequential_scans(await explain(conn, query.build()), sizes, query.full_scan_ok)
+                if scans:
+                    violations[query.name] = scans
+        finally:
+            await transaction.rollback()
+    return violations
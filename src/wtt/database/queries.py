@@ -0,0 +1,296 @@
+import base64
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, distinct, func, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.question_verdict import QuestionVerdict
+from ..models.token import Token
+from ..models.token_counter_shard import TokenCounterShard
+from ..models.token_extracted_data import TokenExtractedData
+from ..models.user import User
+from ..models.verification_answer import VerificationAnswer
+
+# Core table rather than the mapped class: listing rows never become ORM objects
+tokens = Token.__table__
+research = TokenExtractedData.__table__
+users = User.__table__
+shards = TokenCounterShard.__table__
+answers = VerificationAnswer.__table__
+verdicts = QuestionVerdict.__table__
+
+# Sort key of the token listing; NULL holder counts sort as 0 so the keyset
+# comparison stays total. Matches the expression indexes on tokens.
+LISTING_HOLDERS = func.coalesce(tokens.c.holder_count, 0)
+
+# Columns returned by the listing: no wide text columns
+TOKEN_LIST_COLUMNS = (
+    tokens.c.id,
+    tokens.c.symbol,
+    tokens.c.name,
+    tokens.c.icon_url,
+    tokens.c.holder_count,
+    tokens.c.humans,
+)
+
+
+def encode_cursor(holder_count: Optional[int], token_id: int) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque cursor.
+    """
+    raw = f"{holder_count or 0}:{token_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    :raises ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        holders, token_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii").split(":")
+        return int(holders), int(token_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def token_page_query(limit: int, cursor: Optional[str] = None, token_type: Optional[str] = None,
+                     is_native: Optional[bool] = None):
+    """
+    Build the keyset-paginated listing query, most held tokens first.
+
+    Fetches ``limit + 1`` rows so the caller can tell whether a next page exists.
+    """
+    query = select(*TOKEN_LIST_COLUMNS)
+    if token_type is not None:
+        query = query.where(tokens.c.type == token_type)
+    if is_native is not None:
+        query = query.where(tokens.c.is_native.is_(is_native))
+    if cursor is not None:
+        holders, token_id = decode_cursor(cursor)
+        # Row comparison seeks straight into the (holders, id) index
+        query = query.where(tuple_(LISTING_HOLDERS, tokens.c.id) < tuple_(holders, token_id))
+    return query.order_by(LISTING_HOLDERS.desc(), tokens.c.id.desc()).limit(limit + 1)
+
+
+async def list_tokens(db: AsyncSession, limit: int = 50, cursor: Optional[str] = None,
+                      token_type: Optional[str] = None, is_native: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Fetch one page of lightweight token rows.
+
+    :param limit: Page size
+    :param cursor: Cursor from the previous page, or None for the first page
+    :param token_type: Optional filter on ``tokens.type``
+    :param is_native: Optional filter on ``tokens.is_native``
+    :return: Rows and the cursor of the next page (None on the last page)
+    :raises ValueError: If the cursor is malformed
+    """
+    result = await db.execute(token_page_query(limit, cursor, token_type, is_native))
+    rows: List[Dict[str, Any]] = [dict(row._mapping) for row in result]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["holder_count"], last["id"])
+    return {"tokens": rows, "next_cursor": next_cursor}
+
+
+def stored_research_query(token_id: Optional[int] = None, token_name: Optional[str] = None):
+    """
+    Build the query for the most recent stored research of a token, by id or
+    by name.
+    """
+    query = select(research.c.research_results, research.c.created_at)
+    if token_id is not None:
+        query = query.where(research.c.token_id == token_id)
+    else:
+        query = query.where(research.c.token_name == token_name)
+    return query.order_by(research.c.created_at.desc()).limit(1)
+
+
+def leaderboard_query(limit: int = 10):
+    """
+    Build the query for the top users by verification score.
+    """
+    return (
+        select(users.c.username, users.c.verification_score, users.c.accuracy_rate, users.c.total_rewards)
+        .order_by(users.c.verification_score.desc())
+        .limit(limit)
+    )
+
+
+# Token page metadata: every column except the folded counters, which are
+# returned with their pending shard deltas added
+TOKEN_DETAIL_COLUMNS = tuple(
+    column for column in tokens.c if column.name not in ("humans", "holder_count")
+)
+
+# Columns that change whenever the token page does; hashed into its version.
+# Answers are insert-only, so the newest answer ID stands for the answer
+# stats, and every verdict write bumps updated_at.
+TOKEN_VERSION_FIELDS = (
+    "last_updated", "humans", "holder_count", "researched_at", "latest_answer", "verdicts_updated_at",
+)
+
+
+def pending_counters_lateral():
+    """Pending shard deltas of the token, as a LATERAL subquery."""
+    return (
+        select(
+            func.coalesce(func.sum(shards.c.delta).filter(shards.c.counter == "humans"), 0)
+            .label("pending_humans"),
+            func.sum(shards.c.delta).filter(shards.c.counter == "holder_count").label("pending_holders"),
+        )
+        .where(shards.c.token_id == tokens.c.id)
+        .lateral("pending_counters")
+    )
+
+
+def counter_columns(pending):
+    """Folded counters plus their pending deltas."""
+    # Same semantics as read_counters and the fold: a holder count stays unknown until counted
+    return (
+        (func.coalesce(tokens.c.humans, 0) + pending.c.pending_humans).label("humans"),
+        func.coalesce(
+            func.coalesce(tokens.c.holder_count, 0) + pending.c.pending_holders, tokens.c.holder_count
+        ).label("holder_count"),
+    )
+
+
+def token_detail_query(token_id: int):
+    """
+    Build the single query behind a token page: the token row, its latest
+    stored research and its verification stats.
+
+    Each part is a LATERAL subquery correlated on the token, so every one is
+    an index lookup for this token only and the page costs one round trip.
+    """
+    latest = (
+        select(research.c.research_results, research.c.created_at.label("researched_at"))
+        .where(research.c.token_id == tokens.c.id)
+        .order_by(research.c.created_at.desc())
+        .limit(1)
+        .lateral("latest_research")
+    )
+    pending = pending_counters_lateral()
+    answer_stats = (
+        select(func.count().label("answers"), func.count(distinct(answers.c.user_id)).label("verifiers"),
+               func.max(answers.c.id).label("latest_answer"))
+        .where(answers.c.token_id == tokens.c.id)
+        .lateral("answer_stats")
+    )
+    verdict_stats = (
+        select(
+            func.count().label("questions"),
+            func.count().filter(verdicts.c.final).label("resolved"),
+            func.count().filter(and_(verdicts.c.final, verdicts.c.verdict)).label("confirmed"),
+            func.max(verdicts.c.updated_at).label("verdicts_updated_at"),
+        )
+        .where(verdicts.c.token_id == tokens.c.id)
+        .lateral("verdict_stats")
+    )
+    # The aggregates always return one row; only research may be missing
+    joined = (
+        tokens.outerjoin(latest, true())
+        .join(pending, true())
+        .join(answer_stats, true())
+        .join(verdict_stats, true())
+    )
+    return (
+        select(
+            *TOKEN_DETAIL_COLUMNS,
+            *counter_columns(pending),
+            latest.c.research_results, latest.c.researched_at,
+            answer_stats.c.answers, answer_stats.c.verifiers, answer_stats.c.latest_answer,
+            verdict_stats.c.questions, verdict_stats.c.resolved, verdict_stats.c.confirmed,
+            verdict_stats.c.verdicts_updated_at,
+        )
+        .select_from(joined)
+        .where(tokens.c.id == token_id)
+    )
+
+
+def token_version_query(token_id: int):
+    """
+    Build the query for just the inputs of a token page's version.
+
+    Every part is a single index probe (no research body, no counting), so
+    revalidating an unchanged page costs far less than building it.
+    """
+    pending = pending_counters_lateral()
+    researched_at = (
+        select(research.c.created_at)
+        .where(research.c.token_id == tokens.c.id)
+        .order_by(research.c.created_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    latest_answer = select(func.max(answers.c.id)).where(answers.c.token_id == tokens.c.id).scalar_subquery()
+    verdicts_updated_at = (
+        select(func.max(verdicts.c.updated_at)).where(verdicts.c.token_id == tokens.c.id).scalar_subquery()
+    )
+    return (
+        select(
+            tokens.c.id, tokens.c.last_updated, *counter_columns(pending),
+            researched_at.label("researched_at"), latest_answer.label("latest_answer"),
+            verdicts_updated_at.label("verdicts_updated_at"),
+        )
+        .select_from(tokens.join(pending, true()))
+        .where(tokens.c.id == token_id)
+    )
+
+
+def token_version(row: Dict[str, Any]) -> str:
+    """
+    Version of a token page: changes whenever the token, its counters, its
+    latest research or its verification stats do.
+    """
+    key = "|".join(str(row[field]) for field in TOKEN_VERSION_FIELDS)
+    return hashlib.blake2b(f"{row['id']}|{key}".encode(), digest_size=12).hexdigest()
+
+
+async def load_token_version(db: AsyncSession, token_id: int) -> Optional[str]:
+    """
+    Fetch the current version of a token page without building the page.
+
+    :return: The version ``load_token_detail`` would report, or None if the
+        token does not exist
+    """
+    row = (await db.execute(token_version_query(token_id))).first()
+    return None if row is None else token_version(row._mapping)
+
+
+async def load_token_detail(db: AsyncSession, token_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Fetch everything a token page shows in one query.
+
+    :return: Token metadata, latest stored research (None if never researched),
+        verification stats and the page version; None if the token does not exist
+    """
+    result = await db.execute(token_detail_query(token_id))
+    row = result.first()
+    if row is None:
+        return None
+    values = row._mapping
+    token = {column.name: values[column.name] for column in TOKEN_DETAIL_COLUMNS}
+    # SUM over the shard deltas comes back as a Decimal
+    token["humans"] = int(values["humans"])
+    token["holder_count"] = None if values["holder_count"] is None else int(values["holder_count"])
+    stored = None
+    if values["researched_at"] is not None:
+        stored = {"results": values["research_results"], "researched_at": values["researched_at"]}
+    return {
+        "token": token,
+        "research": stored,
+        "verification": {
+            "answers": values["answers"],
+            "verifiers": values["verifiers"],
+            "questions": values["questions"],
+            "resolved": values["resolved"],
+            "confirmed": values["confirmed"],
+        },
+        "version": token_version(values),
+    }
@@ -0,0 +1,11 @@
+"""
+WTT database models.
+
+Every model module is imported here, so importing any one of them (e.g.
+``wtt.models.token``) registers all mappers before relationships between
+them are configured.
+"""
+from . import (  # noqa: F401
+    job_run, question_verdict, token, token_counter_shard, token_extracted_data, user,
+    verification_answer, verification_question,
+)
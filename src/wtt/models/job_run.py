@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, String
+from ..database.config import Base
+
+class JobRun(Base):
+    """
+    SQLAlchemy model for the last run of a periodic background job.
+
+    Written in the job's own transaction, so a new leader (after a deploy,
+    restart or failover) schedules from it instead of running every job again.
+    """
+    __tablename__ = 'job_runs'
+
+    name = Column(String(100), primary_key=True)
+    last_run_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<JobRun(name='{self.name}', last_run_at={self.last_run_at})>"
@@ -0,0 +1,26 @@
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, func
+from ..database.config import Base
+
+class QuestionVerdict(Base):
+    """
+    SQLAlchemy model for the consensus verdict on a verification question.
+
+    Questions stay active (re-scored on every consensus run) until ``final``
+    is set.
+    """
+    __tablename__ = 'question_verdicts'
+    __table_args__ = (
+        # Per-token verdict stats of the token page
+        Index('ix_question_verdicts_token', 'token_id'),
+    )
+
+    question_id = Column(Integer, primary_key=True)
+    token_id = Column(Integer, ForeignKey('tokens.id', ondelete='CASCADE'), nullable=False)
+    verdict = Column(Boolean, nullable=False)
+    confidence = Column(Float, nullable=False)
+    answers = Column(Integer, nullable=False, default=0)
+    final = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<QuestionVerdict(question_id={self.question_id}, verdict={self.verdict}, confidence={self.confidence:.3f})>"
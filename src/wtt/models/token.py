@@ -1,9 +1,8 @@
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, func
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
-Base = declarative_base()
+from ..database.config import Base
 
 class Token(Base):
     """
@@ -32,4 +31,12 @@ class Token(Base):
     extracted_data = relationship("TokenExtractedData", back_populates="token")
 
     def __repr__(self):
-        return f"<Token(name='{self.name}', symbol='{self.symbol}', address='{self.address}')>"
\ No newline at end of file
+        return f"<Token(name='{self.name}', symbol='{self.symbol}', address='{self.address}')>"
+
+
+# Verification and research look tokens up by name
+Index("ix_tokens_name", Token.name)
+# Keyset pagination of the token listing on (holders, id), overall and per filter
+Index("ix_tokens_listing", func.coalesce(Token.holder_count, 0), Token.id)
+Index("ix_tokens_type_listing", Token.type, func.coalesce(Token.holder_count, 0), Token.id)
+Index("ix_tokens_native_listing", Token.is_native, func.coalesce(Token.holder_count, 0), Token.id)
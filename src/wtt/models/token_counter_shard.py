@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, SmallInteger, String
+from ..database.config import Base
+
+class TokenCounterShard(Base):
+    """
+    SQLAlchemy model for one shard of a token counter (``humans``,
+    ``holder_count``).
+
+    Increments go to a random shard so concurrent writers rarely share a row
+    lock; the shards are periodically folded into the ``tokens`` row.
+    """
+    __tablename__ = 'token_counter_shards'
+
+    token_id = Column(Integer, ForeignKey('tokens.id', ondelete='CASCADE'), primary_key=True)
+    counter = Column(String(20), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    delta = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TokenCounterShard(token_id={self.token_id}, counter='{self.counter}', shard={self.shard}, delta={self.delta})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from ..database.config import Base
 
@@ -7,6 +7,11 @@ class TokenExtractedData(Base):
     SQLAlchemy model for storing token research results
     """
     __tablename__ = 'token_extracted_data'
+    __table_args__ = (
+        # Latest research per token, looked up by id or by name
+        Index('ix_token_extracted_data_token_latest', 'token_id', 'created_at'),
+        Index('ix_token_extracted_data_name_latest', 'token_name', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     token_id = Column(Integer, ForeignKey('tokens.id'), nullable=False)
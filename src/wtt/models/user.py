@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, func
-from sqlalchemy.orm import Mapped, mapped_column, declarative_base
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
-Base = declarative_base()
+from ..database.config import Base
 
 class User(Base):
     """
@@ -29,6 +29,10 @@ class User(Base):
     total_verifications: Mapped[int] = mapped_column(Integer, default=0)
     # accuracy_rate: The percentage of correct verifications (could be calculated as correct verifications / total_verifications).
     accuracy_rate: Mapped[float] = mapped_column(Float, default=0.0)
+    # graded_answers / agreed_answers: Answers on questions with a final verdict, and their
+    # expected agreement with it; accuracy_rate blends these with the still-open answers.
+    graded_answers: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    agreed_answers: Mapped[float] = mapped_column(Float, default=0.0, server_default="0", nullable=False)
 
     # Rewards tracking: Total rewards (in WTT tokens or equivalent points) earned by the user.
     total_rewards: Mapped[float] = mapped_column(Float, default=0.0)
@@ -42,3 +46,7 @@ class User(Base):
             f"<User(username='{self.username}', email='{self.email}', "
             f"verification_score={self.verification_score}, total_rewards={self.total_rewards})>"
         )
+
+
+# Leaderboard: top users by verification score
+Index("ix_users_verification_score", User.verification_score.desc())
@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, UniqueConstraint, func
+from ..database.config import Base
+
+class VerificationAnswer(Base):
+    """
+    SQLAlchemy model for one user's yes/no answer to a verification question.
+
+    Answers are stored ungraded; the consensus job grades them in bulk.
+    """
+    __tablename__ = 'verification_answers'
+    __table_args__ = (
+        UniqueConstraint('question_id', 'user_id', name='uq_verification_answers_question_user'),
+        Index('ix_verification_answers_user', 'user_id'),
+        # Per-token answer and verifier counts of the token page, index-only
+        Index('ix_verification_answers_token', 'token_id', 'user_id'),
+        # Newest answer per token, for the token page version
+        Index('ix_verification_answers_token_latest', 'token_id', 'id'),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    question_id = Column(Integer, nullable=False)
+    token_id = Column(Integer, ForeignKey('tokens.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    answer = Column(Boolean, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<VerificationAnswer(question_id={self.question_id}, user_id={self.user_id}, answer={self.answer})>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Text, func
+from ..database.config import Base
+
+class VerificationQuestion(Base):
+    """
+    SQLAlchemy model for a generated yes/no verification question.
+
+    The id is allocated by the database, so it is unique across workers and
+    restarts; answers and verdicts refer to it by ``question_id``.
+    """
+    __tablename__ = 'verification_questions'
+    __table_args__ = (
+        # Tokens that already have questions are skipped by the generation job
+        Index('ix_verification_questions_token', 'token_id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    token_id = Column(Integer, ForeignKey('tokens.id', ondelete='CASCADE'), nullable=False)
+    question_text = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<VerificationQuestion(id={self.id}, token_id={self.token_id})>"
@@ -0,0 +1 @@
+"""WTT monitoring and instrumentation utilities."""
@@ -0,0 +1,214 @@
+"""
+Central logging setup: JSON records, request-id correlation, per-module
+levels and sampled debug logs, written from a background thread.
+
+Configured once per process by ``configure_logging()``:
+
+- ``LOG_LEVEL``: root level (default INFO)
+- ``LOG_LEVELS``: per-logger levels, e.g. ``wtt.agents=DEBUG,sqlalchemy.engine=INFO``
+- ``LOG_FORMAT``: ``json`` (default) or ``text``
+- ``LOG_DEBUG_SAMPLE_RATE``: share of requests whose DEBUG records are kept (default 1.0)
+- ``LOG_CALLER_INFO``: include the calling module and line in JSON records
+  (default false)
+
+Callers only pay for the level check, the request id lookup and the message
+formatting; serialization and the write happen on the listener thread.
+"""
+import atexit
+import copy
+import logging
+import os
+import queue
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+import orjson
+
+# Id of the request being served; asyncio tasks and asyncio.to_thread calls
+# started while handling it inherit the value
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id",
+}
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """
+    Parse ``name=LEVEL`` pairs separated by commas.
+
+    :raises ValueError: On an unknown level name
+    """
+    levels = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, level = item.partition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Unknown log level in LOG_LEVELS: {item.strip()!r}")
+        levels[name.strip()] = value
+    return levels
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, request id,
+    ``extra`` fields and the rendered exception, if any.
+
+    Only this formatter decides what is written; the process-wide logging
+    settings (caller lookup, thread and process names) are left alone, since
+    other libraries and handlers in the process may rely on them.
+    """
+
+    def __init__(self, caller_info: bool = False):
+        super().__init__()
+        self.caller_info = caller_info
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        if self.caller_info and record.lineno:
+            entry["source"] = f"{record.module}:{record.lineno}"
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local runs, with the request id when set."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(levelname)s - %(name)s - [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keep DEBUG records for a share of requests only.
+
+    The decision hashes the request id, so a sampled request keeps all of its
+    debug records; records outside a request are sampled one by one.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(min(max(rate, 0.0), 1.0) * 10000)
+        self._counter = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.threshold >= 10000:
+            return True
+        request_id = request_id_var.get()
+        if request_id is not None:
+            return zlib.crc32(request_id.encode()) % 10000 < self.threshold
+        self._counter += 1
+        return (self._counter * 7919) % 10000 < self.threshold
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Queue handler that captures the caller's context but leaves formatting
+    and I/O to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Work on a copy, as the stdlib QueueHandler does: other handlers and
+        # filters of the same record still see its arguments and exc_info
+        record = copy.copy(record)
+        record.request_id = request_id_var.get()
+        # Resolve arguments now: they may be mutated once the caller moves on
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames alive; render them before queueing
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(stream=None) -> QueueListener:
+    """
+    Route every logger through one queue to a stream handler on a background
+    thread. Safe to call more than once: later calls return the running
+    listener.
+
+    :param stream: Output stream (default: stderr)
+    :return: The queue listener, already started
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        output.setFormatter(TextFormatter())
+    else:
+        output.setFormatter(JSONFormatter(caller_info=os.getenv("LOG_CALLER_INFO", "false").lower() == "true"))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _handler = ContextQueueHandler(log_queue)
+    _handler.addFilter(DebugSampler(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))))
+
+    root = logging.getLogger()
+    # Replace console handlers from an earlier basicConfig; keep any others
+    # (e.g. a test runner's capture handler)
+    for existing in root.handlers[:]:
+        if type(existing) is logging.StreamHandler:
+            root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """
+    Stop the listener after writing every queued record.
+    """
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def new_request_id() -> str:
+    """Random id for requests arriving without ``X-Request-ID``."""
+    return uuid.uuid4().hex
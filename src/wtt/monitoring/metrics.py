@@ -0,0 +1,448 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds) covering fast DB lookups up to slow upstream searches.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def render_family(name: str, documentation: str, type_name: str,
+                  samples: Iterable[Tuple[str, str, float]]) -> List[str]:
+    """
+    Render one metric family in the Prometheus text format.
+
+    :param samples: (name suffix, formatted labels, value) triples
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {type_name}"]
+    for suffix, labels, value in samples:
+        lines.append(f"{name}{suffix}{labels} {_format_value(value)}")
+    return lines
+
+
+class _Metric:
+    """
+    Base class for metrics with an optional fixed set of label names.
+
+    Label children are created once and cached, so the hot path is a dict
+    lookup plus a locked arithmetic update.
+    """
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["MetricsRegistry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *labelvalues: str):
+        """
+        Return the child metric for the given label values.
+
+        :param labelvalues: Label values in the order of ``labelnames``
+        :return: Child metric holding the series state
+        """
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+        key = tuple(str(v) for v in labelvalues)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _default_child(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels()")
+        return self.labels()
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return render_family(self.name, self.documentation, self.type_name, self.samples())
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default_child().inc(amount)
+
+    def get(self, *labelvalues: str) -> float:
+        child = self._children.get(tuple(str(v) for v in labelvalues))
+        return child.value if child is not None else 0.0
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield "_total" if not self.name.endswith("_total") else "", _format_labels(self.labelnames, key), child.value
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock", "_function")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the gauge value at scrape time instead of storing it."""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self.value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time."""
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default_child().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default_child().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default_child().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default_child().set_function(function)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            try:
+                value = child.get()
+            except Exception:
+                # A failing collector must never break the whole scrape.
+                continue
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # Non-cumulative per-bucket counts; the last slot is the +Inf bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, typically latencies in seconds."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["MetricsRegistry"] = None,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default_child().observe(value)
+
+    def time(self, *labelvalues: str):
+        """
+        Context manager timing the enclosed block into this histogram.
+
+        :param labelvalues: Label values for the series to observe into
+        """
+        return self.labels(*labelvalues).time()
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.labelnames + ("le",), key + (_format_value(bound),)), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield "_sum", labels, child.sum
+            yield "_count", labels, child.count
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def register_collector(self, collector: Callable[[], None]):
+        """
+        Register a callback run before every scrape to refresh derived metrics.
+
+        :param collector: Callable updating gauges from external state
+        """
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def _collect(self):
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception:
+                continue
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        """
+        Current samples of every metric, in a JSON-serializable form.
+
+        :return: One ``{"name", "type", "help", "samples"}`` entry per metric
+        """
+        self._collect()
+        return [
+            {"name": metric.name, "type": metric.type_name, "help": metric.documentation,
+             "samples": [list(sample) for sample in metric.samples()]}
+            for metric in list(self._metrics.values())
+        ]
+
+    def render(self) -> str:
+        self._collect()
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = Histogram(
+    "wtt_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+STAGE_LATENCY = Histogram(
+    "wtt_stage_duration_seconds",
+    "Latency of individual processing stages inside agents and endpoints.",
+    ["component", "stage"],
+    registry=REGISTRY,
+)
+UPSTREAM_CALLS = Counter(
+    "wtt_upstream_calls_total",
+    "Calls made to upstream services by outcome.",
+    ["service", "outcome"],
+    registry=REGISTRY,
+)
+CACHE_REQUESTS = Counter(
+    "wtt_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ["cache", "result"],
+    registry=REGISTRY,
+)
+CACHE_HIT_RATIO = Gauge(
+    "wtt_cache_hit_ratio",
+    "Fraction of cache lookups served from the cache since process start.",
+    ["cache"],
+    registry=REGISTRY,
+)
+DB_POOL = Gauge(
+    "wtt_db_pool_connections",
+    "Database connection pool usage by state.",
+    ["state"],
+    registry=REGISTRY,
+)
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "wtt_upstream_circuit_state",
+    "Circuit breaker state per upstream (0 = closed, 1 = half-open, 2 = open).",
+    ["service"],
+    registry=REGISTRY,
+)
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    "wtt_upstream_concurrency_limit",
+    "Current adaptive concurrency limit per upstream.",
+    ["service"],
+    registry=REGISTRY,
+)
+UPSTREAM_INFLIGHT = Gauge(
+    "wtt_upstream_inflight_calls",
+    "Calls currently in flight per upstream.",
+    ["service"],
+    registry=REGISTRY,
+)
+UPSTREAM_BUDGET_REMAINING = Gauge(
+    "wtt_upstream_rate_budget_remaining",
+    "Tokens left in the shared rate-limit bucket of each upstream API key.",
+    ["service"],
+    registry=REGISTRY,
+)
+UPSTREAM_THROTTLED = Counter(
+    "wtt_upstream_throttled_total",
+    "Upstream calls delayed or rejected by the local rate limiter, by priority.",
+    ["service", "priority"],
+    registry=REGISTRY,
+)
+ADMISSION_REJECTED = Counter(
+    "wtt_admission_rejected_total",
+    "Requests rejected by admission control, by reason.",
+    ["reason"],
+    registry=REGISTRY,
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "wtt_admission_queue_depth",
+    "Requests waiting for a slot on expensive routes.",
+    registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "wtt_llm_tokens_total",
+    "Estimated LLM tokens by component and direction (context_in, context_out, prompt, completion).",
+    ["component", "direction"],
+    registry=REGISTRY,
+)
+
+
+def stage_timer(component: str, stage: str):
+    """
+    Time a processing stage into ``wtt_stage_duration_seconds``.
+
+    :param component: Agent or endpoint owning the stage
+    :param stage: Name of the stage being timed
+    :return: Context manager observing the elapsed time on exit
+    """
+    return STAGE_LATENCY.labels(component, stage).time()
+
+
+def record_upstream_call(service: str, success: bool, outcome: Optional[str] = None):
+    """
+    Count a call to an upstream service.
+
+    :param service: Upstream service name (e.g. ``tavily``, ``openai``)
+    :param success: Whether the call completed without error
+    :param outcome: Explicit outcome label overriding success/error (e.g. ``rejected``)
+    """
+    UPSTREAM_CALLS.labels(service, outcome or ("success" if success else "error")).inc()
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """
+    Count a cache lookup; hit ratios are derived from these counters at scrape time.
+
+    :param cache: Cache name
+    :param hit: Whether the lookup was served from the cache
+    """
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def _collect_cache_ratios():
+    caches = {key[0] for key in CACHE_REQUESTS._children}
+    for cache in caches:
+        hits = CACHE_REQUESTS.get(cache, "hit")
+        total = hits + CACHE_REQUESTS.get(cache, "miss")
+        CACHE_HIT_RATIO.labels(cache).set(hits / total if total else 0.0)
+
+
+REGISTRY.register_collector(_collect_cache_ratios)
+
+
+def register_pool_metrics(pool):
+    """
+    Expose SQLAlchemy connection pool state as gauges computed at scrape time.
+
+    :param pool: SQLAlchemy pool (e.g. ``engine.pool``)
+    """
+    for state, reader in (
+        ("size", "size"),
+        ("checked_in", "checkedin"),
+        ("checked_out", "checkedout"),
+        ("overflow", "overflow"),
+    ):
+        if hasattr(pool, reader):
+            DB_POOL.labels(state).set_function(getattr(pool, reader))
@@ -0,0 +1,152 @@
+"""
+Metrics across the worker processes of one server.
+
+Each worker keeps its own registry; ``MultiprocessMetrics`` writes a snapshot
+of it to ``METRICS_MULTIPROC_DIR/<pid>.json`` every ``METRICS_FLUSH_SECONDS``
+and on every scrape, and a scrape served by any worker merges the snapshots
+of all of them:
+
+- counters and histograms are summed, including those of workers that have
+  exited, so totals never go backwards when a worker is replaced
+- gauges describe a live process (pool usage, queue depth), so they are
+  reported per worker with a ``worker`` label and dropped once it exits
+"""
+import json
+import logging
+import os
+import threading
+from glob import glob
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import REGISTRY, MetricsRegistry, render_family
+
+logger = logging.getLogger(__name__)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _with_worker(labels: str, pid: int) -> str:
+    worker = f'worker="{pid}"'
+    return "{" + worker + "}" if not labels else labels[:-1] + "," + worker + "}"
+
+
+def merge_snapshots(snapshots: List[Tuple[int, bool, List[Dict[str, object]]]]) -> str:
+    """
+    Merge worker snapshots into one Prometheus text exposition.
+
+    :param snapshots: (pid, alive, registry snapshot) per worker
+    :return: The merged exposition
+    """
+    families: Dict[str, Dict[str, object]] = {}
+    for pid, alive, metrics in snapshots:
+        for metric in metrics:
+            family = families.setdefault(metric["name"], {
+                "type": metric["type"], "help": metric["help"], "samples": {},
+            })
+            samples = family["samples"]
+            if metric["type"] == "gauge":
+                if not alive:
+                    continue
+                for suffix, labels, value in metric["samples"]:
+                    samples[(suffix, _with_worker(labels, pid))] = value
+            else:
+                for suffix, labels, value in metric["samples"]:
+                    samples[(suffix, labels)] = samples.get((suffix, labels), 0.0) + value
+
+    lines: List[str] = []
+    for name, family in families.items():
+        lines.extend(render_family(name, family["help"], family["type"],
+                                   ((suffix, labels, value) for (suffix, labels), value in family["samples"].items())))
+    return "\n".join(lines) + "\n"
+
+
+class MultiprocessMetrics:
+    """
+    Publishes this worker's metrics to a directory shared with the other
+    workers and renders the merged view of all of them.
+    """
+
+    def __init__(self, directory: str, registry: MetricsRegistry = REGISTRY,
+                 interval: Optional[float] = None, pid: Optional[int] = None):
+        self.directory = directory
+        self.registry = registry
+        self.interval = interval if interval is not None else float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+        self.pid = pid or os.getpid()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["MultiprocessMetrics"]:
+        """
+        :return: The exporter for ``METRICS_MULTIPROC_DIR``, or None in a single-process run
+        """
+        directory = os.getenv("METRICS_MULTIPROC_DIR")
+        return cls(directory) if directory else None
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def write(self) -> List[Dict[str, object]]:
+        """
+        Replace this worker's snapshot file.
+
+        :return: The snapshot written
+        """
+        snapshot = self.registry.snapshot()
+        path = self._path(self.pid)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(snapshot, f)
+        # Readers see either the previous snapshot or this one, never half of it
+        os.replace(temporary, path)
+        return snapshot
+
+    def render(self) -> str:
+        """
+        Merge the snapshots of every worker, this one freshly taken.
+        """
+        snapshots = [(self.pid, True, self.write())]
+        for path in sorted(glob(os.path.join(self.directory, "*.json"))):
+            try:
+                pid = int(os.path.basename(path)[:-len(".json")])
+            except ValueError:
+                continue
+            if pid == self.pid:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append((pid, _is_alive(pid), json.load(f)))
+            except (OSError, ValueError):
+                # Removed or being replaced by its worker: skip it this scrape
+                continue
+        return merge_snapshots(snapshots)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning("Could not publish worker metrics: %s", e)
+
+    def start(self):
+        """Publish snapshots from a background thread until ``stop``."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-publisher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop publishing, leaving a final snapshot for the totals."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.write()
@@ -0,0 +1,225 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as StackCounter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+class Profile:
+    """
+    Result of a sampling session: stack samples folded into collapsed stacks.
+    """
+
+    def __init__(self, stacks: Dict[str, int], interval: float, duration: float, metadata: Dict[str, Any]):
+        self.stacks = stacks
+        self.interval = interval
+        self.duration = duration
+        self.metadata = metadata
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.stacks.values())
+
+    def to_collapsed(self) -> str:
+        """
+        Render the profile in Brendan Gregg's collapsed-stack format
+        (input for flamegraph.pl, speedscope, inferno...).
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """
+        Render the profile as a speedscope "sampled" profile document.
+        """
+        frames: List[Dict[str, str]] = []
+        frame_index: Dict[str, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        for stack, count in self.stacks.items():
+            indices = []
+            for name in stack.split(";"):
+                if name not in frame_index:
+                    frame_index[name] = len(frames)
+                    frames.append({"name": name})
+                indices.append(frame_index[name])
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.metadata.get("name", "wtt request"),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": self.metadata.get("name", "wtt request"),
+            "exporter": "wtt.monitoring.profiler",
+        }
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for a single thread.
+
+    A background thread periodically captures the target thread's Python stack
+    via ``sys._current_frames``. The profiled code is never instrumented, so the
+    overhead is bounded by the sampling interval rather than the call volume.
+    For async requests the target is the event loop thread, so samples include
+    whatever coroutine the loop is running at that moment.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005, max_depth: int = 128):
+        """
+        :param thread_id: Thread to sample; defaults to the calling thread
+        :param interval: Seconds between samples
+        :param max_depth: Maximum number of frames kept per sample
+        """
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: StackCounter = StackCounter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            names.append(self._frame_name(frame))
+            frame = frame.f_back
+        names.reverse()
+        self._stacks[";".join(names)] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="wtt-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self, metadata: Optional[Dict[str, Any]] = None) -> Profile:
+        """
+        Stop sampling and return the collected profile.
+
+        :param metadata: Extra information stored alongside the profile
+        :return: Collected profile
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return Profile(
+            stacks=dict(self._stacks),
+            interval=self.interval,
+            duration=time.perf_counter() - self._started_at,
+            metadata=metadata or {},
+        )
+
+
+class ProfileStore:
+    """
+    Local on-disk store for collected profiles, keeping only the most recent ones.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_profiles: int = 100):
+        self.directory = directory or os.getenv("PROFILE_DIR", os.path.join(os.getcwd(), "profiles"))
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{suffix}")
+
+    @staticmethod
+    def new_id() -> str:
+        """
+        :return: Sortable identifier for a new profile
+        """
+        return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profile: Profile, profile_id: Optional[str] = None) -> str:
+        """
+        Persist a profile as collapsed stacks, speedscope JSON and metadata.
+
+        :param profile: Profile to store
+        :param profile_id: Identifier to store under; generated if omitted
+        :return: Identifier of the stored profile
+        """
+        profile_id = profile_id or self.new_id()
+        metadata = dict(profile.metadata)
+        metadata.update({
+            "id": profile_id,
+            "duration_seconds": round(profile.duration, 6),
+            "samples": profile.sample_count,
+            "interval_seconds": profile.interval,
+        })
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(profile_id, "collapsed"), "w") as f:
+                f.write(profile.to_collapsed())
+            with open(self._path(profile_id, "speedscope.json"), "w") as f:
+                json.dump(profile.to_speedscope(), f)
+            with open(self._path(profile_id, "meta.json"), "w") as f:
+                json.dump(metadata, f)
+            self._prune()
+        return profile_id
+
+    def _prune(self):
+        ids = self._ids()
+        excess = len(ids) - self.max_profiles
+        for profile_id in ids[:max(excess, 0)]:
+            for suffix in ("collapsed", "speedscope.json", "meta.json"):
+                try:
+                    os.remove(self._path(profile_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(".meta.json")] for name in os.listdir(self.directory) if name.endswith(".meta.json"))
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        :return: Metadata of stored profiles, most recent first
+        """
+        entries = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(self._path(profile_id, "meta.json")) as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def path_for(self, profile_id: str, output_format: str = "speedscope") -> Optional[str]:
+        """
+        :param profile_id: Identifier returned by ``save``
+        :param output_format: ``speedscope`` or ``collapsed``
+        :return: Path of the stored file, or None if it does not exist
+        """
+        suffix = {"speedscope": "speedscope.json", "collapsed": "collapsed"}.get(output_format)
+        # Identifiers are generated by ``save``; reject anything that could escape the directory.
+        if suffix is None or os.path.basename(profile_id) != profile_id:
+            return None
+        path = self._path(profile_id, suffix)
+        return path if os.path.isfile(path) else None
@@ -0,0 +1,100 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.api.middleware import AdmissionControlMiddleware
+
+async def slow_app(scope, receive, send):
+    """Minimal ASGI app standing in for an expensive endpoint."""
+    await asyncio.sleep(0.05)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def call(app, method, path, client_ip="10.0.0.1", headers=None):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": headers or [],
+        "client": (client_ip, 1234),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    return start["status"], dict(start["headers"])
+
+def test_admission_control():
+    """
+    Test per-client limits, route costs and the expensive-route concurrency cap.
+    """
+    async def scenario():
+        app = AdmissionControlMiddleware(slow_app, rate_per_second=0.01, burst=10,
+                                         max_concurrent=1, max_queue=1, queue_timeout=1)
+
+        # A research call costs 10 tokens and drains this client's bucket.
+        status, _ = await call(app, "POST", "/research/token")
+        assert status == 200
+        status, headers = await call(app, "GET", "/leaderboard")
+        assert status == 429 and int(headers[b"retry-after"]) >= 1
+        print("✅ Route Costs Drain Client Bucket")
+
+        status, _ = await call(app, "GET", "/leaderboard", client_ip="10.0.0.2")
+        assert status == 200, "Other clients keep their own budget"
+        status, _ = await call(app, "GET", "/health")
+        assert status == 200, "Health checks are exempt"
+        print("✅ Clients Isolated And Health Exempt")
+
+        results = await asyncio.gather(*(
+            call(app, "GET", "/tokens/verify/1", client_ip=f"10.1.0.{i}") for i in range(3)
+        ))
+        statuses = sorted(status for status, _ in results)
+        assert statuses == [200, 200, 429], "One running, one queued, one rejected"
+        print("✅ Concurrency Cap With Bounded Queue")
+
+        # A request shed by the gate keeps its client's budget
+        rejected = [ip for ip, (status, _) in zip(range(3), results) if status == 429]
+        bucket = app._buckets[f"ip:10.1.0.{rejected[0]}"]
+        assert bucket.tokens >= 9.9, bucket.tokens
+        print("✅ Gate Rejections Refunded")
+
+    asyncio.run(scenario())
+
+def test_client_identity():
+    """
+    Test client identification: issued API keys, otherwise the peer IP.
+    """
+    client_id = AdmissionControlMiddleware.client_id
+    base = {"query_string": b"", "headers": [], "client": ("10.0.0.9", 1)}
+    saved = os.environ.get("CLIENT_API_KEYS")
+    os.environ["CLIENT_API_KEYS"] = "issued-1, issued-2"
+    try:
+        assert client_id(base) == "ip:10.0.0.9"
+        assert client_id({**base, "query_string": b"user_id=7"}) == "ip:10.0.0.9", "Query ids are not trusted"
+        assert client_id({**base, "headers": [(b"x-api-key", b"made-up")]}) == "ip:10.0.0.9"
+        key_id = client_id({**base, "headers": [(b"x-api-key", b"issued-2")]})
+        assert key_id.startswith("key:") and "issued" not in key_id
+    finally:
+        if saved is None:
+            os.environ.pop("CLIENT_API_KEYS", None)
+        else:
+            os.environ["CLIENT_API_KEYS"] = saved
+
+    # One host controls a whole IPv6 /64
+    first = client_id({**base, "client": ("2001:db8:1:2::1", 1)})
+    assert first == client_id({**base, "client": ("2001:db8:1:2:ffff::9", 1)}) == "ip:2001:db8:1:2::/64"
+    assert first != client_id({**base, "client": ("2001:db8:1:3::1", 1)})
+    assert client_id({**base, "client": ("::ffff:10.0.0.9", 1)}) == "ip:10.0.0.9"
+    print("✅ Client Identity Resolution")
+
+if __name__ == "__main__":
+    test_admission_control()
+    test_client_identity()
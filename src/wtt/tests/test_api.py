@@ -5,13 +5,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 import asyncio
 from httpx import AsyncClient
 from wtt.api.main import app
-from wtt.database.config import db_session
+from sqlalchemy import delete
+from wtt.database.config import SessionLocal
 from wtt.models.token import Token
 from wtt.models.user import User
 
 async def setup_test_data():
     """Set up test data and return session and test objects"""
-    session = db_session()
+    session = SessionLocal()
 
     # Create test data
     test_token = Token(
@@ -30,15 +31,15 @@ async def setup_test_data():
     )
     session.add(test_user)
 
-    session.commit()
+    await session.commit()
     return session, test_token, test_user
 
 async def cleanup_test_data(session):
     """Clean up test data"""
-    session.query(Token).filter_by(symbol='TEST').delete()
-    session.query(User).filter_by(username='test_api_user').delete()
-    session.commit()
-    session.close()
+    await session.execute(delete(Token).where(Token.symbol == 'TEST'))
+    await session.execute(delete(User).where(User.username == 'test_api_user'))
+    await session.commit()
+    await session.close()
 
 async def test_api_endpoints():
     """
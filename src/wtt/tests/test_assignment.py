@@ -0,0 +1,100 @@
+import os
+import sys
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.verification.assignment import AssignmentEngine
+
+def test_routing_to_reliable_verifiers():
+    """
+    Test that questions go to the most reliable, least loaded verifiers first.
+    """
+    engine = AssignmentEngine(confidence_threshold=0.95, max_answers=9)
+    engine.add_user(1, accuracy_rate=55.0, total_verifications=40)
+    engine.add_user(2, accuracy_rate=95.0, total_verifications=40)
+    engine.add_user(3, accuracy_rate=90.0, total_verifications=40)
+
+    question_id = engine.add_question(token_id=7, question_id=101)
+    assert engine.pick_verifiers(question_id, count=2) == [2, 3]
+    # Already assigned users are not picked again
+    assert engine.pick_verifiers(question_id, count=2) == [1]
+    # Load spreads new questions across equally reliable users
+    other = engine.add_question(token_id=7, question_id=102)
+    assert engine.pick_verifiers(other, count=1, candidates=[1, 2]) == [2]
+    print("✅ Questions Routed To Reliable Verifiers")
+
+def test_next_question_prefers_uncertain():
+    """
+    Test that a verifier is given the least certain open question.
+    """
+    engine = AssignmentEngine(confidence_threshold=0.99)
+    settled, uncertain = engine.add_question(1, 201), engine.add_question(2, 202)
+    engine.record_answer(settled, 10, True)
+    engine.record_answer(settled, 11, True)
+    engine.record_answer(uncertain, 12, True)
+    engine.record_answer(uncertain, 13, False)
+
+    assert engine.next_question(14) == uncertain
+    assert engine.next_question(14) == settled
+    assert engine.next_question(14) is None
+    assert engine.next_question(15, token_id=1) == settled
+    assert engine.latest_question_id == 202
+    # A verdict made final by the consensus job stops routing here too
+    engine.close_question(uncertain)
+    assert engine.next_question(16) == settled
+    print("✅ Next Question Is The Least Certain One")
+
+def test_stops_at_confidence_threshold():
+    """
+    Test that a question resolves once confident and stops being assigned.
+    """
+    engine = AssignmentEngine(confidence_threshold=0.95, max_answers=9)
+    for user_id in range(1, 6):
+        engine.add_user(user_id, accuracy_rate=90.0, total_verifications=20)
+    question_id = engine.add_question(token_id=3, question_id=301)
+
+    status = engine.record_answer(question_id, 1, True)
+    assert not status["resolved"] and status["verdict"] is True
+    status = engine.record_answer(question_id, 2, True)
+    assert status["resolved"] and status["confidence"] >= 0.95
+    assert engine.pick_verifiers(question_id, count=3) == []
+    assert engine.next_question(3) is None
+
+    # Agreeing verifiers gain reliability, the late dissenter's vote is ignored
+    before = engine.reliability(1)
+    assert engine.record_answer(question_id, 3, False)["answers"] == 2
+    assert engine.reliability(1) == before > 0.8
+    print("✅ Assignment Stops At Confidence Threshold")
+
+def test_fewer_answers_than_fixed_quorum():
+    """
+    Test that simulated verification reaches correct verdicts with fewer
+    answers than asking every verifier.
+    """
+    rng = random.Random(4)
+    accuracies = {user_id: rng.choice([0.6, 0.75, 0.9, 0.95]) for user_id in range(50)}
+    engine = AssignmentEngine(confidence_threshold=0.97, max_answers=9)
+    for user_id, accuracy in accuracies.items():
+        engine.add_user(user_id, accuracy_rate=accuracy * 100, total_verifications=30)
+
+    truth = {}
+    for question_id in range(1, 201):
+        engine.add_question(token_id=1, question_id=question_id)
+        truth[question_id] = rng.random() < 0.5
+        while not engine.is_resolved(question_id):
+            (user_id,) = engine.pick_verifiers(question_id)
+            answer = truth[question_id] if rng.random() < accuracies[user_id] else not truth[question_id]
+            engine.record_answer(question_id, user_id, answer)
+
+    statuses = [engine.question_status(question_id) for question_id in truth]
+    answers = sum(status["answers"] for status in statuses)
+    correct = sum(status["verdict"] == truth[status["question_id"]] for status in statuses)
+    assert answers < 200 * 9 / 2, answers
+    assert correct >= 190, correct
+    print(f"✅ {correct}/200 Correct Verdicts With {answers / 200:.1f} Answers Per Question")
+
+if __name__ == "__main__":
+    test_routing_to_reliable_verifiers()
+    test_next_question_prefers_uncertain()
+    test_stops_at_confidence_threshold()
+    test_fewer_answers_than_fixed_quorum()
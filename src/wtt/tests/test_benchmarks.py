@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import asyncio
+import urllib.error
+import urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.benchmarks.fakes import FakeChatModelServer, FakeTavilyServer, UpstreamProfile
+from wtt.benchmarks.runner import compare_to_baseline, format_report, percentile, run_scenario, summarize
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+def test_fake_upstreams():
+    """
+    Test the fake Tavily and chat-model servers.
+    """
+    with FakeTavilyServer(UpstreamProfile(latency_ms=1, jitter_ms=0)) as tavily:
+        result = post_json(tavily.search_url, {"query": "WLD token", "max_results": 3, "include_raw_content": True})
+        assert len(result["results"]) == 3
+        assert "raw_content" in result["results"][0]
+        assert tavily.request_count == 1
+        print("✅ Fake Tavily Server Working")
+
+    with FakeChatModelServer(UpstreamProfile(latency_ms=1, jitter_ms=0)) as chat:
+        result = post_json(f"{chat.api_base}/chat/completions",
+                           {"model": "gpt-4o", "messages": [{"role": "user", "content": "questions"}]})
+        assert result["choices"][0]["message"]["content"].startswith("1. ")
+        print("✅ Fake Chat Model Server Working")
+
+    with FakeTavilyServer(UpstreamProfile(latency_ms=0, jitter_ms=0, failure_rate=1.0)) as failing:
+        try:
+            post_json(failing.search_url, {"query": "WLD"})
+            assert False, "Failure injection should return HTTP 500"
+        except urllib.error.HTTPError as e:
+            assert e.code == 500
+        print("✅ Failure Injection Working")
+
+def test_benchmark_statistics():
+    """
+    Test percentile reporting and baseline regression detection.
+    """
+    latencies = [i / 1000 for i in range(1, 101)]
+    assert percentile(latencies, 50) == 0.05
+    assert percentile(latencies, 99) == 0.099
+    summary = summarize(latencies, errors=2, elapsed=2.0)
+    assert summary["rps"] == 50.0 and summary["p95_ms"] == 95.0
+    print("✅ Percentiles Computed")
+
+    baseline = {"verify": {"p95_ms": 50.0, "p99_ms": 90.0, "rps": 100.0}}
+    assert compare_to_baseline({"verify": {"p95_ms": 55.0, "p99_ms": 95.0, "rps": 95.0}}, baseline) == []
+    regressions = compare_to_baseline({"verify": {"p95_ms": 80.0, "p99_ms": 95.0, "rps": 60.0}}, baseline)
+    assert len(regressions) == 2
+    print("✅ Baseline Regressions Flagged")
+
+def test_scenario_errors_by_status():
+    """
+    Test that every non-2xx status counts as an error and workers spread over clients.
+    """
+    replies = iter([200, 201, 404, 429, 429, 500, None, 200])
+    used = set()
+
+    async def scenario(client, data):
+        used.add(client)
+        await asyncio.sleep(0)
+        status = next(replies)
+        if status is None:
+            raise ConnectionError("dropped")
+        return status
+
+    summary = asyncio.run(run_scenario(["a", "b", "c"], scenario, {}, concurrency=3, requests=8))
+    assert summary["requests"] == 8 and summary["errors"] == 5
+    assert summary["statuses"] == {"200": 2, "201": 1, "404": 1, "429": 2, "500": 1, "error": 1}
+    assert used == {"a", "b", "c"}
+    assert "429:2" in format_report({"answer": summary})
+    print("✅ Non-2xx Statuses Counted As Errors")
+
+if __name__ == "__main__":
+    test_fake_upstreams()
+    test_benchmark_statistics()
+    test_scenario_errors_by_status()
@@ -0,0 +1,213 @@
+import os
+import sys
+import asyncio
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.benchmarks.consensus import run_consensus_benchmark, simulate_answers
+from wtt.verification.consensus import score_answers, write_consensus
+
+def test_reliable_users_outweigh_majority():
+    """
+    Test that consistent verifiers outweigh a majority of unreliable ones.
+    """
+    question_ids, user_ids, answers = [], [], []
+    truth = [q % 2 == 0 for q in range(40)]
+    for question in range(40):
+        # Users 1-2 are always right, users 3-5 always answer "no"
+        for user in (1, 2):
+            question_ids.append(question); user_ids.append(user); answers.append(truth[question])
+        for user in (3, 4, 5):
+            question_ids.append(question); user_ids.append(user); answers.append(False)
+
+    result = score_answers(np.array(question_ids), np.array(user_ids), np.array(answers))
+    assert result.verdicts.tolist() == truth
+    accuracy = dict(zip(result.user_ids.tolist(), result.accuracy.tolist()))
+    assert accuracy[1] > 0.95 and accuracy[3] < 0.6
+    print("✅ Reliable Verifiers Outweigh The Majority")
+
+def test_history_is_a_reliability_prior():
+    """
+    Test that graded history breaks a tie between two verifiers.
+    """
+    question_ids, user_ids, answers = np.array([1, 1]), np.array([7, 8]), np.array([True, False])
+    assert score_answers(question_ids, user_ids, answers).confidence[0] < 0.51
+    trusted = score_answers(question_ids, user_ids, answers, history={7: (19.0, 20), 8: (6.0, 20)})
+    assert trusted.verdicts[0] and trusted.confidence[0] > 0.7
+    # The prior is capped, so a long history counts as history_weight answers
+    capped = score_answers(question_ids, user_ids, answers, history={7: (1900.0, 2000), 8: (600.0, 2000)})
+    assert abs(capped.p_yes[0] - trusted.p_yes[0]) < 1e-6
+    print("✅ Graded History Used As Reliability Prior")
+
+def test_beats_majority_vote():
+    """
+    Test verdict accuracy and speed on a simulated answer set.
+    """
+    report = run_consensus_benchmark(n_answers=200000, n_users=2000)
+    assert report["accuracy"] > report["majority_accuracy"]
+    assert report["seconds"] < 5.0, report
+    print(f"✅ {int(report['answers'])} Answers Scored In {report['seconds']:.2f}s "
+          f"({report['accuracy']:.1%} vs {report['majority_accuracy']:.1%} Majority)")
+
+class RecordingSession:
+    """AsyncSession stand-in recording executed statements and parameters."""
+    def __init__(self):
+        self.calls = []
+        self.committed = False
+
+    async def execute(self, statement, params=None):
+        self.calls.append((statement, params))
+
+    async def commit(self):
+        self.committed = True
+
+def test_bulk_write():
+    """
+    Test that verdicts and user accuracy are written in batched statements.
+    """
+    question_ids, user_ids, answers, _ = simulate_answers(6000, n_users=300)
+    result = score_answers(question_ids, user_ids, answers)
+    tokens = {question_id: 1 for question_id in question_ids.tolist()}
+
+    session = RecordingSession()
+    finalized = asyncio.run(write_consensus(session, result, tokens, final_confidence=0.9, min_answers=3))
+    assert session.committed and 0 < finalized <= len(result.question_ids)
+    # One executemany per table: the whole batch fits in WRITE_BATCH rows
+    assert len(session.calls) == 2
+    verdict_rows, user_rows = session.calls[0][1], session.calls[1][1]
+    assert len(verdict_rows) == len(result.question_ids) and len(user_rows) == len(result.user_ids)
+    assert sum(row["final"] for row in verdict_rows) == finalized
+    assert sum(row["b_scored"] for row in user_rows) == len(answers)
+    graded = sum(row["b_graded"] for row in user_rows)
+    assert graded == int(result.answers[[row["final"] for row in verdict_rows]].sum())
+    assert all(0.0 <= row["b_agreed"] <= row["b_graded"] and 0.0 <= row["b_scored_agreed"] <= row["b_scored"]
+               for row in user_rows)
+    print(f"✅ {len(verdict_rows)} Verdicts And {len(user_rows)} Users Written In 2 Statements")
+
+def test_accuracy_keeps_graded_history():
+    """
+    Test on a local Postgres (PLAN_CHECK_DATABASE_URL) that accuracy earned on
+    finalized questions survives later runs; the rows are rolled back.
+    """
+    url = os.getenv("PLAN_CHECK_DATABASE_URL")
+    if not url:
+        print("ℹ️ PLAN_CHECK_DATABASE_URL not set; skipping consensus history check")
+        return
+
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from wtt.database.migrations import upgrade
+    from wtt.models.user import User
+    from wtt.verification.consensus import run_consensus
+
+    def answers_sql(question_id, answers):
+        return ("INSERT INTO verification_answers (question_id, token_id, user_id, answer) VALUES " +
+                ", ".join(f"({question_id}, 990001, {user}, {answer})" for user, answer in answers))
+
+    async def scenario():
+        engine = create_async_engine(url)
+        try:
+            await upgrade(engine)
+            async with engine.connect() as conn:
+                transaction = await conn.begin()
+                try:
+                    await conn.execute(text(
+                        "INSERT INTO tokens (id, address, symbol, name, decimals, is_native, humans) "
+                        "VALUES (990001, '0xconsensus', 'CNS', 'Consensus Token', 18, false, 0)"))
+                    await conn.execute(User.__table__.insert(), [
+                        {"id": user, "username": f"consensus_{user}", "email": f"c{user}@example.com",
+                         "hashed_password": "x"} for user in range(990001, 990005)])
+                    # Three users agree on question 1; user 990001 is right
+                    await conn.execute(text(answers_sql(990101, [
+                        (990001, "true"), (990002, "true"), (990003, "true")])))
+                    db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+                    first = await run_consensus(db, final_confidence=0.6, min_answers=3)
+                    # User 990001 is then outvoted on a still-open question
+                    await conn.execute(text(answers_sql(990102, [
+                        (990001, "false"), (990002, "true"), (990003, "true"), (990004, "true")])))
+                    second = await run_consensus(db, final_confidence=0.99, min_answers=5)
+                    row = (await conn.execute(text(
+                        "SELECT accuracy_rate, graded_answers, agreed_answers FROM users WHERE id = 990001"))).one()
+                    await db.close()
+                    return first, second, row
+                finally:
+                    await transaction.rollback()
+        finally:
+            await engine.dispose()
+
+    first, second, row = asyncio.run(scenario())
+    # Other active answers in the database are scored alongside
+    assert first["final"] >= 1 and second["questions"] >= 1, (first, second)
+    assert row.graded_answers == 1 and row.agreed_answers > 0.6
+    # Blended with the open answer instead of overwritten by it
+    assert 30.0 < row.accuracy_rate < 100.0 * row.agreed_answers, row
+    print(f"✅ Graded History Kept ({row.accuracy_rate:.1f}% Accuracy After An Open Miss)")
+
+def test_leaderboard_follows_consensus():
+    """
+    Test on a local Postgres (PLAN_CHECK_DATABASE_URL) that a consensus run
+    credits score and rewards for graded answers, reordering the leaderboard;
+    the rows are rolled back.
+    """
+    url = os.getenv("PLAN_CHECK_DATABASE_URL")
+    if not url:
+        print("ℹ️ PLAN_CHECK_DATABASE_URL not set; skipping leaderboard check")
+        return
+
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from wtt.database.migrations import upgrade
+    from wtt.database.queries import leaderboard_query
+    from wtt.models.user import User
+    from wtt.verification.consensus import run_consensus
+
+    names = {f"leader_{user}" for user in range(990011, 990015)}
+
+    async def ranking(conn):
+        rows = (await conn.execute(leaderboard_query(1000000))).all()
+        return [row for row in rows if row.username in names]
+
+    async def scenario():
+        engine = create_async_engine(url)
+        try:
+            await upgrade(engine)
+            async with engine.connect() as conn:
+                transaction = await conn.begin()
+                try:
+                    await conn.execute(text(
+                        "INSERT INTO tokens (id, address, symbol, name, decimals, is_native, humans) "
+                        "VALUES (990011, '0xleaderboard', 'LDR', 'Leaderboard Token', 18, false, 0)"))
+                    # User 990011 starts ahead of 990012
+                    await conn.execute(User.__table__.insert(), [
+                        {"id": user, "username": f"leader_{user}", "email": f"l{user}@example.com",
+                         "hashed_password": "x", "verification_score": 0.5 if user == 990011 else 0.0,
+                         "total_rewards": 0.0} for user in range(990011, 990015)])
+                    # ...then is outvoted on a question that becomes final
+                    await conn.execute(text(
+                        "INSERT INTO verification_answers (question_id, token_id, user_id, answer) VALUES "
+                        "(990111, 990011, 990011, false), (990111, 990011, 990012, true), "
+                        "(990111, 990011, 990013, true), (990111, 990011, 990014, true)"))
+                    before = await ranking(conn)
+                    db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+                    await run_consensus(db, final_confidence=0.6, min_answers=3)
+                    await db.close()
+                    return before, await ranking(conn)
+                finally:
+                    await transaction.rollback()
+        finally:
+            await engine.dispose()
+
+    before, after = asyncio.run(scenario())
+    assert before[0].username == "leader_990011", before
+    assert after[0].username != "leader_990011" and after[-1].username == "leader_990011", after
+    winner = next(row for row in after if row.username == "leader_990012")
+    assert winner.verification_score > 0.5 and winner.total_rewards > 5.0, winner
+    print(f"✅ Leaderboard Reordered By Consensus (Top Score {after[0].verification_score:.2f})")
+
+if __name__ == "__main__":
+    test_reliable_users_outweigh_majority()
+    test_history_is_a_reliability_prior()
+    test_beats_majority_vote()
+    test_bulk_write()
+    test_accuracy_keeps_graded_history()
+    test_leaderboard_follows_consensus()
@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.agents.formatting import ResearchFormatter, render_text
+from wtt.agents.tokenizer import count_tokens, truncate_to_budget
+from wtt.upstream.payloads import fake_search_payload
+
+def test_tokenizer():
+    """
+    Test token estimates and budget truncation.
+    """
+    assert count_tokens("") == 0
+    assert count_tokens("WLD is live.") == 4
+    assert count_tokens("decentralization") == 4, "Long words count as several pieces"
+    text, used = truncate_to_budget("one two six four five", 3)
+    assert text == "one two six…" and used == 3
+    assert truncate_to_budget("tiny", 10) == ("tiny", 1)
+    print("✅ Tokenizer Budgeting Working")
+
+def test_structured_sections():
+    """
+    Test structured sections, the lazy text view and the generator API.
+    """
+    search = fake_search_payload("WLD cryptocurrency", max_results=5, content_chars=400)
+    formatter = ResearchFormatter(max_details=3, token_budget=10000, max_sources=10)
+
+    names = [name for name, _ in formatter.iter_sections(search)]
+    assert names == ["answer", "details", "sources"]
+
+    research = formatter.format(search)
+    sections = research.to_dict()
+    assert sections["answer"] == search["answer"]
+    assert len(sections["details"]) == 3 and len(sections["sources"]) == 5
+    assert research._text is None, "Text view is rendered lazily"
+    text = research.text
+    assert "Limiting to first 3 results" not in text and "#" not in text
+    assert "Additional Details:" in text and text.count("\n- ") == 5
+    assert "".join(research.iter_text()) == text == render_text(sections)
+    print("✅ Structured Sections And Lazy Text")
+
+def test_token_budget():
+    """
+    Test that the token budget bounds the output and the formatting cost.
+    """
+    small = fake_search_payload("WLD", max_results=5, content_chars=2000)
+    sections = ResearchFormatter(max_details=3, token_budget=200).format(small).to_dict()
+    used = count_tokens(sections["answer"]) + sum(count_tokens(d["snippet"]) for d in sections["details"])
+    assert used <= 200 + len(sections["details"]) + 1
+    print("✅ Output Within Token Budget")
+
+    large = fake_search_payload("WLD", max_results=500, content_chars=2000)
+    formatter = ResearchFormatter(max_details=3, token_budget=400, max_sources=10)
+    timings = []
+    for payload in (small, large):
+        start = time.perf_counter()
+        for _ in range(20):
+            formatter.format(payload).text
+        timings.append(time.perf_counter() - start)
+    assert timings[1] < timings[0] * 5, "Formatting cost should not grow with the number of sources"
+    print("✅ Formatting Cost Flat In Source Count")
+
+def test_source_pages_feed_details():
+    """
+    Test that fetched page text is used for details, each page within an
+    equal share of the budget.
+    """
+    results = [
+        {"url": "https://a.example/", "content": "Short excerpt A.", "raw_content": "Page A says " * 500},
+        {"url": "https://b.example/", "content": "Short excerpt B."},
+        {"url": "https://c.example/", "content": "Short excerpt C.", "raw_content": "Page C says " * 500},
+    ]
+    details = ResearchFormatter(max_details=3, token_budget=300).format(
+        {"answer": "", "results": results}).to_dict()["details"]
+    assert details[0]["snippet"].startswith("Page A says") and details[1]["snippet"] == "Short excerpt B."
+    assert details[2]["snippet"].startswith("Page C says")
+    assert count_tokens(details[0]["snippet"]) <= 100 + 1, "A page gets its share, not the whole budget"
+    assert count_tokens(details[2]["snippet"]) > 100, "Shares grow with what earlier details left over"
+    print("✅ Source Pages Feed Detail Snippets")
+
+if __name__ == "__main__":
+    test_tokenizer()
+    test_structured_sections()
+    test_token_budget()
+    test_source_pages_feed_details()
@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import subprocess
+import statistics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.upstream.payloads import UpstreamProfile
+from wtt.cache.shared import SQLiteCache
+from wtt.upstream.local import LocalChatModel, LocalSearchClient, local_mode
+from wtt.upstream.ratelimit import SharedBucketStore, UpstreamRateLimiter
+
+class LocalMode:
+    """Enable WTT_MODE=local (plus extra settings) for the duration of a block."""
+    def __init__(self, **settings):
+        self.settings = {"WTT_MODE": "local", **settings}
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.settings.items():
+            self.saved[name] = os.environ.get(name)
+            os.environ[name] = value
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+class FakeToken:
+    id = 1
+    name = "Worldcoin"
+    symbol = "WLD"
+
+def test_latency_distributions():
+    """
+    Test that configured latency distributions keep their mean and tail.
+    """
+    normal = UpstreamProfile(100, 20, seed=1)
+    lognormal = UpstreamProfile(100, 80, seed=1, distribution="lognormal")
+    fixed = UpstreamProfile(100, 80, distribution="fixed")
+    normal_delays = [normal.next_delay() for _ in range(5000)]
+    lognormal_delays = [lognormal.next_delay() for _ in range(5000)]
+    assert abs(statistics.mean(normal_delays) - 0.1) < 0.005
+    assert abs(statistics.mean(lognormal_delays) - 0.1) < 0.01
+    assert max(lognormal_delays) > 2 * max(normal_delays), "Lognormal latency has a long tail"
+    assert fixed.next_delay() == 0.1
+
+    with LocalMode(LOCAL_LLM_LATENCY_MS="5", LOCAL_LLM_LATENCY_DISTRIBUTION="lognormal", LOCAL_LLM_SEED="3"):
+        profile = LocalChatModel().profile
+    assert (profile.latency_ms, profile.distribution) == (5.0, "lognormal")
+    print("✅ Latency Distributions Configurable")
+
+def test_agents_use_local_stand_ins():
+    """
+    Test the search and question agents run on in-process fakes without API keys.
+    """
+    from wtt.agents.question_agent import QuestionGenerationAgent
+    from wtt.agents.search_agent import SearchExtractionAgent
+
+    with tempfile.TemporaryDirectory() as directory, LocalMode(
+            LOCAL_SEARCH_LATENCY_MS="20", LOCAL_PAGES_LATENCY_MS="1", LOCAL_LLM_LATENCY_MS="1",
+            LOCAL_SEARCH_CONTENT_CHARS="1500", LOCAL_LLM_QUESTIONS="3"):
+        assert local_mode()
+        store = SharedBucketStore(os.path.join(directory, "buckets.sqlite3"))
+        search_agent = SearchExtractionAgent(
+            rate_limiter=UpstreamRateLimiter("tavily", None, requests_per_minute=600, store=store),
+            cache=SQLiteCache(os.path.join(directory, "c.sqlite3")))
+        assert isinstance(search_agent.client, LocalSearchClient)
+
+        async def research():
+            try:
+                return await search_agent.process_token_data("WLD")
+            finally:
+                await search_agent.source_fetcher.close()
+
+        start = time.perf_counter()
+        information = asyncio.run(research())
+        elapsed = time.perf_counter() - start
+        assert search_agent.client.request_count == len(SearchExtractionAgent.SEARCH_ASPECTS)
+        assert information["details"] and information["sources"][0].startswith("http://sources.wtt.local/")
+        assert "page content" in information["details"][0]["snippet"], "Details use the fetched source pages"
+        assert elapsed < 1.0, f"Local research took {elapsed:.2f}s"
+        print(f"✅ Local Search Research In {elapsed:.2f}s")
+
+        question_agent = QuestionGenerationAgent(
+            rate_limiter=UpstreamRateLimiter("openai", None, requests_per_minute=600, store=store))
+        assert isinstance(question_agent.llm, LocalChatModel)
+        questions = question_agent.generate_verification_questions(FakeToken(), information)
+        assert len(questions) == 3 and all(q["token_id"] == 1 for q in questions)
+        print("✅ Local LLM Question Generation Working")
+
+def test_injected_failures():
+    """
+    Test that the failure rate of a stand-in surfaces as upstream errors.
+    """
+    client = LocalSearchClient(UpstreamProfile(0, 0, failure_rate=1.0), content_chars=100)
+    try:
+        asyncio.run(client.search("WLD"))
+        assert False, "Expected an injected failure"
+    except Exception as e:
+        assert "injected" in str(e)
+    print("✅ Injected Failures Raised")
+
+def test_local_database_profile():
+    """
+    Test that local mode never points at the default remote database.
+    """
+    source = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = {**os.environ, "WTT_MODE": "local", "LOCAL_DATABASE_URL": "postgresql://u:p@127.0.0.1:5433/soak"}
+    output = subprocess.run(
+        [sys.executable, "-c", "from wtt.database.config import DATABASE_URL; print(DATABASE_URL)"],
+        cwd=source, env=env, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    assert output == "postgresql+asyncpg://u:p@127.0.0.1:5433/soak"
+    print("✅ Local Database Profile Selected")
+
+def test_stand_ins_imported_only_in_local_mode():
+    """
+    Test that outside local mode the agents leave the stand-ins unimported,
+    and that the stand-ins never pull in the benchmark suite.
+    """
+    source = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    script = ("import sys, wtt.agents.search_agent, wtt.agents.question_agent, wtt.cache.sources, {extra}; "
+              "print(sorted(m for m in ('wtt.upstream.local', 'wtt.benchmarks', 'http.server') if m in sys.modules))")
+    env = {key: value for key, value in os.environ.items() if key != "WTT_MODE"}
+    default = subprocess.run([sys.executable, "-c", script.format(extra="wtt.database.config")],
+                             cwd=source, env=env, capture_output=True, text=True, check=True).stdout.strip()
+    local = subprocess.run([sys.executable, "-c", script.format(extra="wtt.upstream.local")],
+                           cwd=source, env=env, capture_output=True, text=True, check=True).stdout.strip()
+    assert default == "[]", default
+    assert local == "['wtt.upstream.local']", local
+    print("✅ Stand-Ins Imported Only In Local Mode")
+
+if __name__ == "__main__":
+    test_latency_distributions()
+    test_agents_use_local_stand_ins()
+    test_injected_failures()
+    test_local_database_profile()
+    test_stand_ins_imported_only_in_local_mode()
@@ -0,0 +1,210 @@
+import io
+import os
+import sys
+import json
+import asyncio
+import logging
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.api.middleware import RequestIdMiddleware
+from wtt.monitoring import logs
+from wtt.monitoring.logs import DebugSampler, parse_levels, request_id_var
+
+class ConfiguredLogging:
+    """Run configure_logging into a buffer, restoring global logging state afterwards."""
+    def __init__(self, **settings):
+        self.settings = settings
+        self.stream = io.StringIO()
+
+    def __enter__(self):
+        self.saved_env = {name: os.environ.get(name) for name in self.settings}
+        os.environ.update(self.settings)
+        # Importing the API elsewhere in the run may already have configured logging
+        self.was_configured = logs._listener is not None
+        logs.shutdown_logging()
+        root = logging.getLogger()
+        self.saved = (root.level, root.handlers[:])
+        logs.configure_logging(stream=self.stream)
+        return self
+
+    def __exit__(self, *exc):
+        logs.shutdown_logging()
+        level, handlers = self.saved
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.handlers[:] = handlers
+        for name, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if self.was_configured:
+            logs.configure_logging()
+
+    def records(self):
+        logs.shutdown_logging()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+def test_json_records_carry_request_id():
+    """
+    Test JSON records with request ids across tasks and threads, extras and exceptions.
+    """
+    logger = logging.getLogger("wtt.tests.logging")
+
+    async def handle(index):
+        token = request_id_var.set(f"req-{index}")
+        try:
+            await asyncio.sleep(0)
+            logger.info("Handled token %s", index, extra={"token_id": index})
+            await asyncio.to_thread(logger.warning, "Worker thread for %s", index)
+        finally:
+            request_id_var.reset(token)
+
+    async def serve():
+        await asyncio.gather(*(handle(index) for index in range(3)))
+
+    with ConfiguredLogging(LOG_LEVEL="INFO") as configured:
+        assert logs.configure_logging() is logs.configure_logging(), "Configured once per process"
+        asyncio.run(serve())
+        try:
+            raise ValueError("bad answer")
+        except ValueError:
+            logger.exception("Answer rejected")
+        records = configured.records()
+
+    handled = [record for record in records if record["message"].startswith("Handled")]
+    assert sorted(record["request_id"] for record in handled) == ["req-0", "req-1", "req-2"]
+    assert all(record["token_id"] == int(record["request_id"][-1]) for record in handled)
+    threaded = [record for record in records if record["message"].startswith("Worker thread")]
+    assert all(record["message"].endswith(record["request_id"][-1]) for record in threaded)
+    failure = next(record for record in records if record["message"] == "Answer rejected")
+    assert "request_id" not in failure and "ValueError: bad answer" in failure["exception"]
+    assert failure["level"] == "ERROR" and failure["logger"] == "wtt.tests.logging"
+    print("✅ JSON Records Correlated By Request Id")
+
+def test_caller_info_left_to_the_formatter():
+    """
+    Test that configuring logging leaves process-wide settings alone and that
+    the source location is written only when LOG_CALLER_INFO is set.
+    """
+    settings = (logging._srcfile, logging.logThreads, logging.logProcesses, logging.logMultiprocessing)
+    logger = logging.getLogger("wtt.tests.caller")
+    with ConfiguredLogging(LOG_LEVEL="INFO", LOG_CALLER_INFO="false") as configured:
+        assert (logging._srcfile, logging.logThreads, logging.logProcesses,
+                logging.logMultiprocessing) == settings
+        logger.info("without source")
+        plain = configured.records()
+    with ConfiguredLogging(LOG_LEVEL="INFO", LOG_CALLER_INFO="true") as configured:
+        logger.info("with source")
+        located = configured.records()
+    assert "source" not in next(record for record in plain if record["message"] == "without source")
+    source = next(record for record in located if record["message"] == "with source")["source"]
+    assert source.startswith("test_logging:")
+    print("✅ Caller Info Chosen By The Formatter")
+
+def test_queued_record_is_a_copy():
+    """
+    Test that queueing a record leaves the caller's record untouched.
+    """
+    import queue
+
+    handler = logs.ContextQueueHandler(queue.SimpleQueue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("wtt.test", logging.ERROR, __file__, 1, "value %s", ("x",), sys.exc_info())
+    prepared = handler.prepare(record)
+    assert prepared is not record
+    assert prepared.msg == "value x" and prepared.args is None and prepared.exc_info is None
+    assert "ValueError: boom" in prepared.exc_text
+    assert record.msg == "value %s" and record.args == ("x",) and record.exc_info[0] is ValueError
+    print("✅ Queued Records Are Copies")
+
+def test_per_module_levels():
+    """
+    Test LOG_LEVELS parsing and per-logger levels.
+    """
+    assert parse_levels("wtt.agents=debug, sqlalchemy.engine=INFO,") == {
+        "wtt.agents": logging.DEBUG, "sqlalchemy.engine": logging.INFO,
+    }
+    try:
+        parse_levels("wtt=LOUD")
+        assert False, "Expected an unknown level error"
+    except ValueError:
+        pass
+
+    with ConfiguredLogging(LOG_LEVEL="WARNING", LOG_LEVELS="wtt.tests.verbose=DEBUG") as configured:
+        logging.getLogger("wtt.tests.quiet").info("dropped")
+        logging.getLogger("wtt.tests.verbose").debug("kept")
+        messages = [record["message"] for record in configured.records()]
+    logging.getLogger("wtt.tests.verbose").setLevel(logging.NOTSET)
+    assert messages == ["kept"]
+    print("✅ Per-Module Levels Applied")
+
+def test_debug_sampling():
+    """
+    Test that debug sampling keeps whole requests and never drops other levels.
+    """
+    def record(level):
+        return logging.LogRecord("wtt.tests", level, __file__, 1, "message", None, None)
+
+    assert not DebugSampler(0.0).filter(record(logging.DEBUG))
+    assert DebugSampler(0.0).filter(record(logging.INFO))
+    assert DebugSampler(1.0).filter(record(logging.DEBUG))
+
+    sampler = DebugSampler(0.25)
+    kept_requests = 0
+    for index in range(2000):
+        token = request_id_var.set(f"request-{index}")
+        decisions = {sampler.filter(record(logging.DEBUG)) for _ in range(3)}
+        request_id_var.reset(token)
+        assert len(decisions) == 1, "All debug records of a request share one decision"
+        kept_requests += decisions.pop()
+    assert 400 < kept_requests < 600, kept_requests
+    unbound = sum(sampler.filter(record(logging.DEBUG)) for _ in range(2000))
+    assert 400 < unbound < 600, unbound
+    print("✅ Debug Records Sampled Per Request")
+
+def test_request_id_middleware():
+    """
+    Test that request ids are accepted, generated and echoed on responses.
+    """
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(request_id_var.get())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def call(headers):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await RequestIdMiddleware(app)({"type": "http", "headers": headers}, None, send)
+        return dict(sent[0]["headers"])[b"x-request-id"].decode()
+
+    assert asyncio.run(call([(b"x-request-id", b"client-id.42")])) == "client-id.42"
+    generated = asyncio.run(call([(b"x-request-id", b"bad id\n")]))
+    assert generated != "bad id\n" and len(generated) == 32
+    assert seen == ["client-id.42", generated]
+    assert request_id_var.get() is None, "The id does not leak past the request"
+    print("✅ Request Id Middleware Working")
+
+def test_engine_does_not_echo():
+    """
+    Test that SQL statements are left to the logging pipeline.
+    """
+    from wtt.database.config import engine
+    assert not engine.echo
+    print("✅ Engine Echo Disabled")
+
+if __name__ == "__main__":
+    test_json_records_carry_request_id()
+    test_caller_info_left_to_the_formatter()
+    test_queued_record_is_a_copy()
+    test_per_module_levels()
+    test_debug_sampling()
+    test_request_id_middleware()
+    test_engine_does_not_echo()
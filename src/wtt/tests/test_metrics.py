@@ -0,0 +1,51 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.monitoring.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+def test_metrics_registry():
+    """
+    Test metric primitives and the Prometheus text rendering.
+    """
+    registry = MetricsRegistry()
+    calls = Counter("test_calls_total", "Test calls.", ["service", "outcome"], registry=registry)
+    latency = Histogram("test_latency_seconds", "Test latency.", ["stage"], registry=registry,
+                        buckets=(0.1, 1.0))
+    pool = Gauge("test_pool", "Test pool.", ["state"], registry=registry)
+
+    calls.labels("tavily", "success").inc()
+    calls.labels("tavily", "success").inc(2)
+    calls.labels("tavily", "error").inc()
+    assert calls.get("tavily", "success") == 3
+    print("✅ Counter Increments")
+
+    latency.labels("search").observe(0.05)
+    latency.labels("search").observe(0.5)
+    latency.labels("search").observe(5)
+    with latency.time("format"):
+        pass
+    print("✅ Histogram Observations Recorded")
+
+    pool.labels("checked_out").set_function(lambda: 4)
+
+    output = registry.render()
+    assert 'test_calls_total{service="tavily",outcome="success"} 3' in output
+    assert 'test_latency_seconds_bucket{stage="search",le="0.1"} 1' in output
+    assert 'test_latency_seconds_bucket{stage="search",le="1"} 2' in output
+    assert 'test_latency_seconds_bucket{stage="search",le="+Inf"} 3' in output
+    assert 'test_latency_seconds_count{stage="search"} 3' in output
+    assert 'test_latency_seconds_count{stage="format"} 1' in output
+    assert 'test_pool{state="checked_out"} 4' in output
+    print("✅ Prometheus Rendering Working")
+
+    try:
+        calls.labels("tavily")
+        assert False, "Wrong label count should be rejected"
+    except ValueError:
+        print("✅ Label Validation Working")
+
+    print("🎉 Metrics Test Completed Successfully!")
+
+if __name__ == "__main__":
+    test_metrics_registry()
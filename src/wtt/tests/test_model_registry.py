@@ -0,0 +1,90 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import select
+from sqlalchemy.orm import configure_mappers, selectinload
+
+from wtt.database.config import Base, load_models
+from wtt.models.job_run import JobRun
+from wtt.models.question_verdict import QuestionVerdict
+from wtt.models.token import Token
+from wtt.models.token_counter_shard import TokenCounterShard
+from wtt.models.token_extracted_data import TokenExtractedData
+from wtt.models.user import User
+from wtt.models.verification_answer import VerificationAnswer
+from wtt.models.verification_question import VerificationQuestion
+
+def test_single_registry():
+    """
+    Test that every model shares one declarative base and metadata.
+    """
+    metadata = load_models()
+    assert metadata is Base.metadata
+    models = (Token, User, TokenExtractedData, TokenCounterShard, VerificationAnswer, QuestionVerdict,
+              VerificationQuestion, JobRun)
+    assert all(model.metadata is metadata for model in models)
+    assert {model.__tablename__ for model in models} == set(metadata.tables)
+    print(f"✅ {len(models)} Models Share One Registry")
+
+def test_cross_model_relationships():
+    """
+    Test that relationships between model modules configure and eager-load.
+    """
+    configure_mappers()
+    assert Token.extracted_data.property.mapper.class_ is TokenExtractedData
+    assert TokenExtractedData.token.property.mapper.class_ is Token
+    statement = select(TokenExtractedData).options(selectinload(TokenExtractedData.token))
+    assert "token_extracted_data" in str(statement)
+    print("✅ Cross-Model Relationships Configured")
+
+def test_engine_lifecycle_on_local_database():
+    """
+    Test pool warm-up and async create/drop in a scratch database next to the
+    local Postgres (PLAN_CHECK_DATABASE_URL).
+    """
+    url = os.getenv("PLAN_CHECK_DATABASE_URL")
+    if not url:
+        print("ℹ️ PLAN_CHECK_DATABASE_URL not set; skipping engine lifecycle check")
+        return
+
+    from sqlalchemy import inspect, text
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from wtt.database.config import dispose_engine, drop_db, warm_up_pool
+    from wtt.database.migrations import upgrade
+
+    scratch = "wtt_registry_test"
+
+    async def table_names(engine):
+        async with engine.connect() as conn:
+            return set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+
+    async def scenario():
+        admin = create_async_engine(url, isolation_level="AUTOCOMMIT")
+        async with admin.connect() as conn:
+            await conn.execute(text(f"DROP DATABASE IF EXISTS {scratch}"))
+            await conn.execute(text(f"CREATE DATABASE {scratch}"))
+        engine = create_async_engine(make_url(url).set(database=scratch), pool_size=4)
+        try:
+            assert await warm_up_pool(3, bind=engine) == 3
+            assert engine.pool.checkedin() == 3, "Warm connections stay in the pool"
+
+            await upgrade(engine)
+            assert set(Base.metadata.tables) < await table_names(engine)
+            await drop_db(bind=engine)
+            assert await table_names(engine) == set()
+        finally:
+            await dispose_engine(engine)
+            async with admin.connect() as conn:
+                await conn.execute(text(f"DROP DATABASE IF EXISTS {scratch}"))
+            await admin.dispose()
+
+    asyncio.run(scenario())
+    print("✅ Pool Warm-Up And Async Create/Drop Working")
+
+if __name__ == "__main__":
+    test_single_registry()
+    test_cross_model_relationships()
+    test_engine_lifecycle_on_local_database()
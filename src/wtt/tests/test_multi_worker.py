@@ -0,0 +1,356 @@
+import os
+import sys
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.api.middleware import AdmissionControlMiddleware
+from wtt.background.scheduler import BackgroundScheduler
+from wtt.cache.shared import SQLiteCache
+from wtt.monitoring.metrics import Counter, Gauge, Histogram, MetricsRegistry
+from wtt.monitoring.multiprocess import MultiprocessMetrics
+from wtt.upstream.ratelimit import SharedBucketStore
+
+class FakeLockServer:
+    """Stands in for Postgres: at most one holder of the advisory lock."""
+    def __init__(self):
+        self.holder = None
+
+class FakeLock:
+    def __init__(self, server, name):
+        self.server = server
+        self.name = name
+
+    async def try_acquire(self):
+        if self.server.holder in (None, self.name):
+            self.server.holder = self.name
+            return True
+        return False
+
+    async def is_held(self):
+        return self.server.holder == self.name
+
+    async def release(self):
+        if self.server.holder == self.name:
+            self.server.holder = None
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeSession:
+    def __init__(self, log):
+        self.log = log
+        self.pending = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pending.clear()
+
+    async def commit(self):
+        self.log.recorded.update(self.pending)
+        self.pending.clear()
+
+class MemoryRunLog:
+    """Stands in for the job_runs table, sharing the scheduler clock."""
+    def __init__(self, clock):
+        self.clock = clock
+        self.recorded = {}
+
+    def session(self):
+        return FakeSession(self)
+
+    async def elapsed(self):
+        return {name: self.clock() - at for name, at in self.recorded.items()}
+
+    async def record(self, session, name):
+        session.pending[name] = self.clock()
+
+def test_leader_election():
+    """
+    Test that background jobs run in exactly one worker and fail over.
+    """
+    async def scenario():
+        server, clock, runs = FakeLockServer(), FakeClock(), []
+        log = MemoryRunLog(clock)
+        workers = []
+        for name in ("worker-a", "worker-b", "worker-c"):
+            scheduler = BackgroundScheduler(FakeLock(server, name), log, clock=clock)
+
+            async def job(session, name=name):
+                runs.append(name)
+
+            scheduler.add_job("research_refresh", 60, job)
+            workers.append(scheduler)
+
+        for scheduler in workers:
+            await scheduler.run_pending()
+        assert runs == ["worker-a"], "Only the leader should run jobs"
+        print("✅ Jobs Run Once Across Workers")
+
+        for scheduler in workers:
+            await scheduler.run_pending()
+        assert runs == ["worker-a"], "Jobs should wait for their interval"
+        clock.now += 61
+        for scheduler in workers:
+            await scheduler.run_pending()
+        assert runs == ["worker-a", "worker-a"]
+        print("✅ Jobs Respect Their Interval")
+
+        await workers[0].stop()
+        for scheduler in workers[1:]:
+            await scheduler.run_pending()
+        assert len(runs) == 2, "A new leader waits for the interval of the last recorded run"
+        clock.now += 61
+        for scheduler in workers[1:]:
+            await scheduler.run_pending()
+        assert runs[-1] == "worker-b" and len(runs) == 3
+        print("✅ Leadership Fails Over")
+
+    asyncio.run(scenario())
+
+def test_job_runs_survive_restarts():
+    """
+    Test that a restarted scheduler keeps the recorded schedule, and that a
+    failed run is not recorded.
+    """
+    async def scenario():
+        server, clock, runs = FakeLockServer(), FakeClock(), []
+        log = MemoryRunLog(clock)
+
+        async def reward_distribution(session):
+            runs.append("reward_distribution")
+
+        async def failing(session):
+            raise RuntimeError("upstream down")
+
+        def deploy():
+            scheduler = BackgroundScheduler(FakeLock(server, f"worker-{clock.now}"), log, clock=clock)
+            scheduler.add_job("reward_distribution", 86400, reward_distribution)
+            scheduler.add_job("research_refresh", 3600, failing)
+            return scheduler
+
+        first = deploy()
+        await first.run_pending()
+        await first.stop()
+        clock.now += 600
+        second = deploy()
+        ran = await second.run_pending()
+        assert runs == ["reward_distribution"], "The daily job does not run again on a restart"
+        assert ran == ["research_refresh"] and "research_refresh" not in log.recorded
+        await second.stop()
+        clock.now += 86400 - 600
+        third = deploy()
+        await third.run_pending()
+        assert runs == ["reward_distribution"] * 2
+        print("✅ Job Schedules Survive Restarts")
+
+    asyncio.run(scenario())
+
+class RefreshSession:
+    """Tracks whether a transaction is open, as an AsyncSession would."""
+    def __init__(self, rows):
+        self.rows = rows
+        self.in_transaction = False
+        self.committed = []
+        self.pending = []
+
+    async def execute(self, query):
+        self.in_transaction = True
+        rows = self.rows
+
+        class Result:
+            def all(self):
+                return rows
+        return Result()
+
+    def add(self, row):
+        self.in_transaction = True
+        self.pending.append(row)
+
+    async def commit(self):
+        self.committed.extend(self.pending)
+        self.pending.clear()
+        self.in_transaction = False
+
+def test_research_refresh_commits_per_token():
+    """
+    Test that no transaction is held open during the upstream research calls
+    and that each token's results are committed on their own.
+    """
+    from wtt.background.jobs import refresh_stale_research
+
+    session = RefreshSession([(1, "Alpha"), (2, "Beta"), (3, "Gamma")])
+
+    class SearchAgent:
+        async def process_token_data(self, token_name, priority=None):
+            assert not session.in_transaction, "No transaction is open during upstream calls"
+            if token_name == "Beta":
+                raise RuntimeError("upstream down")
+            return {"token": token_name}
+
+    async def scenario(directory):
+        cache = SQLiteCache(os.path.join(directory, "cache.sqlite3"))
+        refreshed = await refresh_stale_research(session, search_agent=SearchAgent(), cache=cache)
+        assert refreshed == 2
+        assert [row.token_name for row in session.committed] == ["Alpha", "Gamma"]
+        assert not session.pending
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(scenario(directory))
+    print("✅ Research Refresh Commits Per Token")
+
+def test_job_run_log_on_local_database():
+    """
+    Test recording job runs in job_runs on a local Postgres
+    (PLAN_CHECK_DATABASE_URL); the rows are rolled back.
+    """
+    url = os.getenv("PLAN_CHECK_DATABASE_URL")
+    if not url:
+        print("ℹ️ PLAN_CHECK_DATABASE_URL not set; skipping job run log check")
+        return
+
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from wtt.background.runs import JobRunLog
+    from wtt.database.migrations import upgrade
+
+    async def scenario():
+        engine = create_async_engine(url)
+        try:
+            await upgrade(engine)
+            async with engine.connect() as conn:
+                transaction = await conn.begin()
+                try:
+                    await conn.execute(text(
+                        "INSERT INTO job_runs (name, last_run_at) VALUES ('test_job', now() - interval '90 seconds') "
+                        "ON CONFLICT (name) DO UPDATE SET last_run_at = excluded.last_run_at"))
+                    log = JobRunLog(lambda: AsyncSession(bind=conn, join_transaction_mode="create_savepoint"))
+                    before = (await log.elapsed())["test_job"]
+                    async with log.session() as session:
+                        await log.record(session, "test_job")
+                        await log.record(session, "other_test_job")
+                        await session.commit()
+                    return before, await log.elapsed()
+                finally:
+                    await transaction.rollback()
+        finally:
+            await engine.dispose()
+
+    before, after = asyncio.run(scenario())
+    assert 89.0 < before < 91.0, before
+    assert after["test_job"] < 1.0 and after["other_test_job"] < 1.0, after
+    print("✅ Job Runs Recorded In Postgres")
+
+def test_shared_cache():
+    """
+    Test that two cache instances (as in two workers) see each other's entries.
+    """
+    async def scenario():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite3")
+            worker_a, worker_b = SQLiteCache(path), SQLiteCache(path)
+
+            await worker_a.set("research:btc", b'{"ok": true}', ttl=60)
+            assert await worker_b.get("research:btc") == b'{"ok": true}'
+            print("✅ Cache Shared Across Workers")
+
+            await worker_a.set("research:eth", b"{}", ttl=-1)
+            assert await worker_b.lookup("research", "research:eth") is None
+            await worker_b.delete("research:btc")
+            assert await worker_a.get("research:btc") is None
+            print("✅ Expiry And Deletion Working")
+
+            # Without CACHE_DB a cache starts empty instead of reading another process's file
+            saved = os.environ.pop("CACHE_DB", None)
+            try:
+                private_a, private_b = SQLiteCache(), SQLiteCache()
+            finally:
+                if saved is not None:
+                    os.environ["CACHE_DB"] = saved
+            assert private_a.path != private_b.path and os.path.dirname(private_a.path) != tempfile.gettempdir()
+            await private_a.set("research:btc", b"{}", ttl=60)
+            assert await private_b.get("research:btc") is None
+            print("✅ Default Cache Private To Its Instance")
+
+    asyncio.run(scenario())
+
+def worker_registry(requests, pool_size):
+    """One worker's metrics, as registered by the app."""
+    registry = MetricsRegistry()
+    Counter("wtt_requests", "Requests.", ["route"], registry=registry).labels("/tokens").inc(requests)
+    Histogram("wtt_latency_seconds", "Latency.", registry=registry, buckets=(0.1, 1.0)).observe(0.05 * requests)
+    Gauge("wtt_pool", "Pool size.", registry=registry).set(pool_size)
+    return registry
+
+def test_metrics_across_workers():
+    """
+    Test that a scrape of one worker covers every worker's series.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        # A pid no live process has: the worker exited after publishing
+        exited = MultiprocessMetrics(directory, worker_registry(5, 7), pid=2 ** 22 + 1)
+        exited.write()
+        other = MultiprocessMetrics(directory, worker_registry(3, 4), pid=os.getppid())
+        other.write()
+        scraped = MultiprocessMetrics(directory, worker_registry(2, 1)).render().splitlines()
+
+    assert 'wtt_requests_total{route="/tokens"} 10' in scraped, "Counters summed, exited workers included"
+    assert "wtt_latency_seconds_count 3" in scraped and 'wtt_latency_seconds_bucket{le="0.1"} 1' in scraped
+    assert f'wtt_pool{{worker="{os.getpid()}"}} 1' in scraped
+    assert f'wtt_pool{{worker="{os.getppid()}"}} 4' in scraped
+    assert not any(line.startswith("wtt_pool") and line.endswith(" 7") for line in scraped), \
+        "Gauges of exited workers are dropped"
+    assert sum(line.startswith("# TYPE wtt_pool") for line in scraped) == 1
+    print("✅ Metrics Merged Across Workers")
+
+def test_admission_across_workers():
+    """
+    Test that workers sharing the bucket file give a client one budget.
+    """
+    async def ok_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def call(app):
+        statuses = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        scope = {"type": "http", "method": "GET", "path": "/leaderboard", "query_string": b"",
+                 "headers": [], "client": ("10.2.0.1", 1)}
+        await app(scope, None, send)
+        return statuses[0]
+
+    async def scenario():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "buckets.sqlite3")
+            workers = [AdmissionControlMiddleware(ok_app, rate_per_second=0.01, burst=3, store=SharedBucketStore(path))
+                       for _ in range(2)]
+            statuses = [await call(workers[i % 2]) for i in range(4)]
+            assert statuses == [200, 200, 200, 429], statuses
+            print("✅ Client Budget Shared Across Workers")
+
+            store = SharedBucketStore(path)
+            store.refund("admission:ip:10.2.0.1", 3, 0.01, 2)
+            assert round(store.peek("admission:ip:10.2.0.1", 3, 0.01)) == 2
+            assert store.prune("admission:", 0) == 1 and store.prune("admission:", 0) == 0
+            print("✅ Shared Buckets Refunded And Pruned")
+
+    asyncio.run(scenario())
+
+if __name__ == "__main__":
+    test_leader_election()
+    test_job_runs_survive_restarts()
+    test_research_refresh_commits_per_token()
+    test_job_run_log_on_local_database()
+    test_shared_cache()
+    test_metrics_across_workers()
+    test_admission_across_workers()
@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.monitoring.profiler import ProfileStore, SamplingProfiler
+
+def busy_work(duration: float):
+    """Spin for the given duration so the sampler has something to see."""
+    end = time.perf_counter() + duration
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+def test_profiler():
+    """
+    Test sampling a thread and storing the profile in both output formats.
+    """
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy_work(0.1)
+    profile = profiler.stop(metadata={"name": "GET /test"})
+
+    assert profile.sample_count > 0, "No samples collected"
+    assert "busy_work" in profile.to_collapsed(), "Profiled function missing from stacks"
+    print(f"✅ Collected {profile.sample_count} Samples")
+
+    speedscope = profile.to_speedscope()
+    assert speedscope["profiles"][0]["type"] == "sampled"
+    assert len(speedscope["profiles"][0]["samples"]) == len(speedscope["profiles"][0]["weights"])
+    print("✅ Speedscope Export Working")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ProfileStore(directory=directory, max_profiles=2)
+        ids = [store.save(profile, f"2024010{i}T000000-test") for i in range(3)]
+
+        listed = [entry["id"] for entry in store.list()]
+        assert listed == [ids[2], ids[1]], "Store should keep only the most recent profiles"
+        print("✅ Profile Store Pruning Working")
+
+        with open(store.path_for(ids[2], "speedscope")) as f:
+            assert json.load(f)["name"] == "GET /test"
+        assert store.path_for(ids[2], "collapsed") is not None
+        assert store.path_for("../etc/passwd") is None
+        print("✅ Profile Retrieval Working")
+
+    print("🎉 Profiler Test Completed Successfully!")
+
+if __name__ == "__main__":
+    test_profiler()
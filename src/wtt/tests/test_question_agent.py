@@ -4,15 +4,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from wtt.agents.question_agent import QuestionGenerationAgent
 from wtt.models.token import Token
-from wtt.database.config import db_session
+from wtt.database.config import SessionLocal
+import asyncio
+from sqlalchemy import delete
 
-def test_question_agent():
-    """
-    Test the Question Generation Agent's core functionalities.
-    """
-    try:
-        # Create a test token
-        session = db_session()
+async def create_test_token():
+    """Create and return the test token"""
+    async with SessionLocal() as session:
         test_token = Token(
             address='0x1234567890123456789012345678901234567890',
             symbol='TEST',
@@ -21,7 +19,22 @@ def test_question_agent():
             is_native=False
         )
         session.add(test_token)
-        session.commit()
+        await session.commit()
+        return test_token
+
+async def cleanup_test_data():
+    """Clean up test data"""
+    async with SessionLocal() as session:
+        await session.execute(delete(Token).where(Token.symbol == 'TEST'))
+        await session.commit()
+
+def test_question_agent():
+    """
+    Test the Question Generation Agent's core functionalities.
+    """
+    try:
+        # Create a test token
+        test_token = asyncio.run(create_test_token())
 
         # Initialize Question Agent
         question_agent = QuestionGenerationAgent()
@@ -63,9 +76,7 @@ def test_question_agent():
         raise
     finally:
         # Clean up test data
-        session.query(Token).filter_by(symbol='TEST').delete()
-        session.commit()
-        session.close()
+        asyncio.run(cleanup_test_data())
 
 if __name__ == "__main__":
     test_question_agent()
\ No newline at end of file
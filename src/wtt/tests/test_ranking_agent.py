@@ -1,79 +1,96 @@
 import os
 import sys
+import asyncio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
 from wtt.agents.ranking_agent import UserRankingAgent
 from wtt.models.user import User
-from wtt.database.config import db_session
 
 def test_ranking_agent():
     """
-    Test the User Ranking and Reward Agent's core functionalities.
+    Test the User Ranking and Reward Agent's core functionalities on the
+    configured database (PLAN_CHECK_DATABASE_URL when set).
     """
-    try:
-        # Create test users
-        session = db_session()
-        test_users = [
-            User(
-                username=f'test_user_{i}',
-                email=f'test{i}@example.com',
-                hashed_password='hashed_password_placeholder'
-            ) for i in range(3)
-        ]
-
-        for user in test_users:
-            session.add(user)
-        session.commit()
-
-        # Initialize Ranking Agent
-        ranking_agent = UserRankingAgent()
-        print("✅ Ranking Agent Initialized")
-
-        # Test user answer processing
-        for i, user in enumerate(test_users):
-            # Simulate different answer scenarios
-            is_correct = i % 2 == 0  # Alternate correct/incorrect answers
-            user_metrics = ranking_agent.process_user_answer(
-                user_id=user.id,
-                question_id=i,
-                answer=is_correct,
-                expected_answer=is_correct
-            )
-            print(f"✅ User {user.username} Metrics Updated")
-
-            # Validate metrics
-            assert 'verification_score' in user_metrics, "Verification score missing"
-            assert 'total_verifications' in user_metrics, "Total verifications missing"
-            assert 'accuracy_rate' in user_metrics, "Accuracy rate missing"
-            assert 'total_rewards' in user_metrics, "Total rewards missing"
-
-        # Test leaderboard retrieval
-        leaderboard = ranking_agent.get_leaderboard(limit=2)
-        print("✅ Leaderboard Retrieved")
-        assert len(leaderboard) > 0, "Leaderboard is empty"
-
-        for user in leaderboard:
-            print(f"Leaderboard User: {user['username']} - Score: {user['verification_score']}")
-
-        # Test reward distribution (mock)
-        ranking_agent.distribute_rewards()
-        print("✅ Rewards Distribution Attempted")
-
-        # Test user notification
-        for user in test_users:
-            ranking_agent.notify_user(user.id, "Test notification message")
-        print("✅ User Notifications Sent")
+    from wtt.database.config import engine as configured_engine
 
-        print("🎉 Ranking Agent Test Completed Successfully!")
+    url = os.getenv("PLAN_CHECK_DATABASE_URL")
+    engine = create_async_engine(url) if url else configured_engine
+    users = User.__table__
+
+    async def scenario():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            try:
+                # Create test users
+                result = await session.execute(
+                    insert(users).returning(users.c.id),
+                    [{"username": f"test_user_{i}", "email": f"test{i}@example.com",
+                      "hashed_password": "hashed_password_placeholder", "verification_score": 0.0,
+                      "total_verifications": 0, "accuracy_rate": 0.0, "total_rewards": 0.0}
+                     for i in range(3)],
+                )
+                user_ids = [row.id for row in result]
+
+                # Initialize Ranking Agent
+                ranking_agent = UserRankingAgent()
+                print("✅ Ranking Agent Initialized")
+
+                # Test user answer processing
+                for i, user_id in enumerate(user_ids):
+                    # Simulate different answer scenarios
+                    is_correct = i % 2 == 0  # Alternate correct/incorrect answers
+                    user_metrics = await ranking_agent.process_user_answer(
+                        session, user_id, question_id=i, answer=True, expected_answer=is_correct)
+                    print(f"✅ User {user_id} Metrics Updated")
+
+                    # Validate metrics
+                    assert user_metrics["total_verifications"] == 1
+                    assert user_metrics["verification_score"] == (1.0 if is_correct else -0.5)
+                    assert user_metrics["total_rewards"] == (10.0 if is_correct else 0.0)
+
+                # Without an expected answer only the verification is counted
+                counted = await ranking_agent.process_user_answer(session, user_ids[0], 9, True)
+                assert counted["total_verifications"] == 2 and counted["verification_score"] == 1.0
 
+                try:
+                    await ranking_agent.process_user_answer(session, -1, 0, True)
+                    assert False, "Expected an unknown user error"
+                except ValueError:
+                    print("✅ Unknown User Rejected")
+
+                # Test leaderboard retrieval
+                await session.flush()
+                leaderboard = await ranking_agent.get_leaderboard(session, limit=2)
+                print("✅ Leaderboard Retrieved")
+                assert len(leaderboard) > 0, "Leaderboard is empty"
+
+                for user in leaderboard:
+                    print(f"Leaderboard User: {user['username']} - Score: {user['verification_score']}")
+
+                # Test reward distribution (mock)
+                await ranking_agent.distribute_rewards(session)
+                print("✅ Rewards Distribution Attempted")
+
+                # Test user notification
+                for user_id in user_ids:
+                    ranking_agent.notify_user(user_id, "Test notification message")
+                print("✅ User Notifications Sent")
+            finally:
+                # Clean up test data
+                await session.rollback()
+                await session.execute(delete(users).where(users.c.username.like("test_user_%")))
+                await session.commit()
+        if url:
+            await engine.dispose()
+
+    try:
+        asyncio.run(scenario())
+        print("🎉 Ranking Agent Test Completed Successfully!")
     except Exception as e:
         print(f"❌ Ranking Agent Test Failed: {e}")
         raise
-    finally:
-        # Clean up test data
-        session.query(User).filter(User.username.like('test_user_%')).delete()
-        session.commit()
-        session.close()
 
 if __name__ == "__main__":
-    test_ranking_agent()
\ No newline at end of file
+    test_ranking_agent()
@@ -0,0 +1,120 @@
+import os
+import sys
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.upstream.guard import UpstreamUnavailableError
+from wtt.upstream.ratelimit import (
+    BACKGROUND,
+    INTERACTIVE,
+    SharedBucketStore,
+    TokenBucket,
+    UpstreamRateLimiter,
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket():
+    """
+    Test refill and wait-time arithmetic of the in-process bucket.
+    """
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=2, refill_rate=1, clock=clock)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 1.0, "Empty bucket should report the refill wait"
+    clock.now += 1
+    assert bucket.try_acquire() == 0.0
+    print("✅ Token Bucket Refill Working")
+
+def test_shared_bucket_store():
+    """
+    Test that two store instances (as in two workers) share one budget.
+    """
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "buckets.sqlite3")
+        worker_a = SharedBucketStore(path, clock=clock)
+        worker_b = SharedBucketStore(path, clock=clock)
+
+        assert worker_a.take("tavily:key", capacity=2, refill_rate=1) == 0.0
+        assert worker_b.take("tavily:key", capacity=2, refill_rate=1) == 0.0
+        assert worker_a.take("tavily:key", capacity=2, refill_rate=1) > 0.0
+        assert worker_b.peek("tavily:key", capacity=2, refill_rate=1) == 0.0
+        print("✅ Budget Shared Across Workers")
+
+        clock.now += 0.5
+        assert worker_b.peek("tavily:key", capacity=2, refill_rate=1) == 0.5
+        print("✅ Remaining Budget Reported")
+
+def test_priorities():
+    """
+    Test that background calls keep a reserve for interactive calls.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        store = SharedBucketStore(os.path.join(directory, "buckets.sqlite3"))
+        limiter = UpstreamRateLimiter("test", "secret-key", requests_per_minute=0.6, burst=5,
+                                      background_reserve=0.4, max_wait=0.05, store=store)
+        assert "secret-key" not in limiter.key
+
+        async def scenario():
+            for _ in range(3):
+                await limiter.acquire(BACKGROUND)
+            try:
+                await limiter.acquire(BACKGROUND)
+                assert False, "Background call should not dip into the reserve"
+            except UpstreamUnavailableError:
+                print("✅ Background Calls Stop At The Reserve")
+            await limiter.acquire(INTERACTIVE)
+            await limiter.acquire(INTERACTIVE)
+            print("✅ Interactive Calls Use The Reserve")
+            try:
+                await limiter.acquire(INTERACTIVE)
+                assert False, "Exhausted budget should fail fast"
+            except UpstreamUnavailableError as e:
+                assert e.retry_after > 0
+                print("✅ Exhausted Budget Fails Fast")
+
+        asyncio.run(scenario())
+
+def test_default_store_is_private():
+    """
+    Test that without RATE_LIMIT_DB each store keeps its own budget instead of
+    a fixed file shared with unrelated processes, and that the server hands
+    its workers one file of their own.
+    """
+    from wtt.api.server import prepare_workers
+
+    saved = {name: os.environ.pop(name, None) for name in ("RATE_LIMIT_DB", "CACHE_DB", "WTT_WORKERS", "METRICS_MULTIPROC_DIR")}
+    try:
+        first, second = SharedBucketStore(), SharedBucketStore()
+        assert first.path != second.path
+        assert os.path.dirname(first.path) != tempfile.gettempdir()
+        assert first.take("k", capacity=1, refill_rate=0) == 0.0
+        assert second.take("k", capacity=1, refill_rate=0) == 0.0, "Budgets are not shared"
+
+        prepare_workers(2, 8765)
+        shared = os.environ["RATE_LIMIT_DB"]
+        assert os.path.dirname(os.environ["CACHE_DB"]) == os.path.dirname(shared)
+        assert SharedBucketStore().path == shared and os.path.dirname(shared) != tempfile.gettempdir()
+        prepare_workers(2, 8765)
+        assert os.environ["RATE_LIMIT_DB"] == shared, "A configured file is kept"
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    print("✅ Bucket Stores Private Unless Shared By The Server")
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_shared_bucket_store()
+    test_priorities()
+    test_default_store_is_private()
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.agents.research_merge import MinHashSketch, deduplicate, normalize_url, rank_results
+from wtt.agents.search_agent import SearchExtractionAgent
+from wtt.cache.shared import SQLiteCache
+from wtt.upstream.payloads import fake_search_payload
+from wtt.upstream.guard import CircuitBreaker, UpstreamGuard
+from wtt.upstream.ratelimit import SharedBucketStore, UpstreamRateLimiter
+
+def isolated_agent(directory, guard=None):
+    """Search agent whose quota and cache live in ``directory``, so every run starts clean."""
+    limiter = UpstreamRateLimiter("tavily", "test-key", requests_per_minute=6000,
+                                  store=SharedBucketStore(os.path.join(directory, "buckets.sqlite3")))
+    return SearchExtractionAgent(tavily_api_key="test-key", rate_limiter=limiter,
+                                 cache=SQLiteCache(os.path.join(directory, "cache.sqlite3")), guard=guard)
+
+ARTICLE = ("The WLD token contract was deployed on World Chain and audited by two firms. "
+           "Liquidity is concentrated in a few pools and the holder count keeps growing every week.")
+
+def test_url_normalization():
+    """
+    Test that URL variants of the same page collapse to one key.
+    """
+    assert normalize_url("http://www.Example.com/token/?utm_source=x#top") == "https://example.com/token"
+    assert normalize_url("https://example.com/token?b=2&a=1") == normalize_url("https://example.com/token/?a=1&b=2")
+    assert normalize_url("https://example.com/token?id=1") != normalize_url("https://example.com/token?id=2")
+    print("✅ URL Normalization Working")
+
+def test_deduplication():
+    """
+    Test URL and near-duplicate content deduplication.
+    """
+    near_copy = ARTICLE.replace("every week", "every single week")
+    assert MinHashSketch(ARTICLE).similarity(MinHashSketch(near_copy)) > 0.6
+    assert MinHashSketch(ARTICLE).similarity(MinHashSketch("Completely unrelated text about weather.")) == 0.0
+
+    results = [
+        {"url": "https://a.com/wld", "content": ARTICLE, "score": 0.9},
+        {"url": "https://www.a.com/wld/", "content": ARTICLE, "score": 0.5},
+        {"url": "https://b.com/copy", "content": ARTICLE, "score": 0.7},
+        {"url": "https://c.com/audit", "content": "Independent security audit report of the WLD contract.", "score": 0.6},
+    ]
+    unique = deduplicate(results, threshold=0.8)
+    assert [r["url"] for r in unique] == ["https://a.com/wld", "https://c.com/audit"]
+    print("✅ Duplicate Sources Removed")
+
+def test_ranking():
+    """
+    Test that results mentioning the token and their aspect rank first.
+    """
+    results = rank_results([
+        {"url": "https://x.com", "content": "Generic market news.", "score": 0.6, "aspect": "audit"},
+        {"url": "https://y.com", "content": "WLD security audit found no vulnerability.", "score": 0.5, "aspect": "audit"},
+    ], "WLD", {"audit": ["audit", "security", "vulnerability"]})
+    assert results[0]["url"] == "https://y.com" and results[0]["relevance"] > results[1]["relevance"]
+    print("✅ Relevance Ranking Working")
+
+class SlowFakeClient:
+    """Tavily stand-in answering each search after a fixed delay."""
+    def __init__(self, delay):
+        self.delay = delay
+        self.queries = []
+
+    def search(self, query, max_results=5, **kwargs):
+        self.queries.append(query)
+        time.sleep(self.delay)
+        return fake_search_payload(query, max_results)
+
+def test_parallel_queries():
+    """
+    Test that all aspect queries run concurrently and merge into one result.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        # Private guard: the shared one may have been opened or narrowed by other calls
+        agent = isolated_agent(directory, guard=UpstreamGuard("test-parallel"))
+        agent.client = SlowFakeClient(delay=0.2)
+        agent.raw_content_sources = 0
+
+        start = time.perf_counter()
+        information = asyncio.run(agent.process_token_data("WLD"))
+        elapsed = time.perf_counter() - start
+
+    assert len(agent.client.queries) == len(SearchExtractionAgent.SEARCH_ASPECTS)
+    assert elapsed < 0.2 * len(agent.client.queries) * 0.75, f"Queries ran sequentially ({elapsed:.2f}s)"
+    assert information["sources"] and information["details"]
+    print(f"✅ {len(agent.client.queries)} Queries In {elapsed:.2f}s")
+
+class FailingFakeClient:
+    """Search client stand-in failing the queries that contain a marker."""
+    def __init__(self, failing):
+        self.failing = failing
+
+    def search(self, query, max_results=5, **kwargs):
+        if any(marker in query for marker in self.failing):
+            raise ConnectionError("search upstream error")
+        return fake_search_payload(query, max_results)
+
+def test_search_errors_propagate():
+    """
+    Test that failed searches and research are errors, not empty results or
+    error strings that would be cached as research.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        agent = isolated_agent(directory)
+        # Private guard: failures here must not open the shared breaker
+        agent.guard = UpstreamGuard("test-search", breaker=CircuitBreaker("test-search", failure_threshold=100))
+        queries = agent.generate_search_queries("WLD")
+
+        agent.client = FailingFakeClient(["scam"])
+        partial = asyncio.run(agent.multi_extract(queries))
+        assert set(partial) == set(queries) - {"scam"}
+
+        # Every failure below counts towards this breaker; the last one opens it
+        agent.guard = UpstreamGuard("test-search", breaker=CircuitBreaker("test-search", failure_threshold=2 * len(queries) + 1))
+        agent.client = FailingFakeClient([""])
+        try:
+            asyncio.run(agent.web_extract(queries["overview"]))
+            assert False, "Expected the search error"
+        except ConnectionError:
+            pass
+        try:
+            asyncio.run(agent.multi_extract(queries))
+            assert False, "Expected the search error when every query fails"
+        except ConnectionError:
+            pass
+        try:
+            asyncio.run(agent.process_token_data("WLD"))
+            assert False, "Failed research is an error, not an error string"
+        except ConnectionError:
+            pass
+        assert agent.guard.breaker.state == CircuitBreaker.OPEN, "The guard recorded every failure"
+    print("✅ Search Errors Propagate Instead Of Empty Research")
+
+if __name__ == "__main__":
+    test_url_normalization()
+    test_deduplication()
+    test_ranking()
+    test_parallel_queries()
+    test_search_errors_propagate()
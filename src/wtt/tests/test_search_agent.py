@@ -5,11 +5,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from wtt.agents.search_agent import SearchExtractionAgent
 from wtt.models.token import Token
-from wtt.database.config import db_session
+from wtt.database.config import SessionLocal
+from sqlalchemy import delete
 
-def setup_test_data():
+async def setup_test_data():
     """Create test token and return session and token"""
-    session = db_session()
+    session = SessionLocal()
     token = Token(
         address='0x1234567890123456789012345678901234567890',
         symbol='TEST',
@@ -18,14 +19,14 @@ def setup_test_data():
         is_native=False
     )
     session.add(token)
-    session.commit()
+    await session.commit()
     return session, token
 
-def cleanup_test_data(session):
+async def cleanup_test_data(session):
     """Clean up test data"""
-    session.query(Token).filter_by(symbol='TEST').delete()
-    session.commit()
-    session.close()
+    await session.execute(delete(Token).where(Token.symbol == 'TEST'))
+    await session.commit()
+    await session.close()
 
 async def test_search_agent():
     """
@@ -33,7 +34,7 @@ async def test_search_agent():
     """
     try:
         # Set up test data
-        session, test_token = setup_test_data()
+        session, test_token = await setup_test_data()
         print("✅ Test Data Setup Complete")
 
         # Initialize Search Agent
@@ -70,7 +71,7 @@ async def test_search_agent():
         raise
     finally:
         # Clean up test data
-        cleanup_test_data(session)
+        await cleanup_test_data(session)
 
 def main():
     """Run all search agent tests"""
@@ -0,0 +1,84 @@
+import os
+import sys
+import gzip
+import json
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.api.middleware import CompressionMiddleware
+from wtt.api.responses import dumps, splice_json
+from wtt.benchmarks.serialization import run_serialization_benchmark
+
+def test_splice_json():
+    """
+    Test that splicing cached bytes yields the same document as full encoding.
+    """
+    research = "Token overview\n\nSources:\n- https://example.com/é\n"
+    cached = dumps(research)
+    body = splice_json({"token_name": "WLD", "token_id": 3}, {"information": cached})
+    assert json.loads(body) == {"token_name": "WLD", "token_id": 3, "information": research}
+    assert json.loads(splice_json({}, {"information": cached})) == {"information": research}
+    assert splice_json({"a": 1}, {}) == b'{"a":1}'
+    print("✅ Pre-serialized Payloads Spliced")
+
+async def call(app, accept_encoding=None):
+    headers = [(b"accept-encoding", accept_encoding)] if accept_encoding else []
+    scope = {"type": "http", "method": "GET", "path": "/tokens/verify/1", "headers": headers}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return dict(messages[0]["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+def body_app(body):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+def test_compression():
+    """
+    Test gzip negotiation and the minimum size threshold.
+    """
+    async def scenario():
+        large = dumps({"information": "token research " * 200})
+        app = CompressionMiddleware(body_app(large), minimum_size=1024)
+        app._brotli = None
+
+        headers, body = await call(app, b"gzip, deflate")
+        assert headers[b"content-encoding"] == b"gzip"
+        assert int(headers[b"content-length"]) == len(body) < len(large)
+        assert gzip.decompress(body) == large
+        print("✅ Large Bodies Compressed")
+
+        headers, body = await call(app)
+        assert b"content-encoding" not in headers and body == large
+        headers, body = await call(app, b"gzip;q=0")
+        assert b"content-encoding" not in headers
+        small = CompressionMiddleware(body_app(b'{"status":"healthy"}'), minimum_size=1024)
+        headers, body = await call(small, b"gzip")
+        assert b"content-encoding" not in headers and body == b'{"status":"healthy"}'
+        print("✅ Small Or Unaccepted Bodies Untouched")
+
+    asyncio.run(scenario())
+
+def test_serialization_benchmark():
+    """
+    Test that the serialization benchmark covers every endpoint.
+    """
+    results = run_serialization_benchmark(iterations=10)
+    assert {"verify", "research", "leaderboard"} <= set(results)
+    assert all({"stdlib", "orjson", "precomputed"} <= set(timings) for timings in results.values())
+    print("✅ Serialization Benchmark Working")
+
+if __name__ == "__main__":
+    test_splice_json()
+    test_compression()
+    test_serialization_benchmark()
@@ -0,0 +1,149 @@
+import os
+import sys
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.benchmarks.fakes import FakeTavilyServer, UpstreamProfile
+from wtt.cache.shared import SQLiteCache
+from wtt.cache.sources import (DomainTTLPolicy, PinnedAddressBackend, SourceCache, SourceFetcher, html_to_text,
+                               is_public_address, pinned_transport)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_domain_policy():
+    """
+    Test per-domain TTLs with most specific suffix matching.
+    """
+    policy = DomainTTLPolicy(default_ttl=60, rules={"example.com": 600, "docs.example.com": 3600})
+    assert policy.ttl_for("https://docs.example.com/guide") == 3600
+    assert policy.ttl_for("https://www.example.com/") == 600
+    assert policy.ttl_for("https://other.org/") == 60
+    assert html_to_text("<p>WLD &amp; <b>audit</b></p><script>x()</script>") == "WLD & audit"
+    print("✅ Domain TTL Policy Working")
+
+def test_conditional_fetch():
+    """
+    Test local hits, 304 revalidation and content-addressed storage.
+    """
+    async def scenario(server, directory):
+        clock = FakeClock()
+        store = SourceCache(SQLiteCache(os.path.join(directory, "cache.sqlite3")))
+        # The fake server listens on loopback
+        fetcher = SourceFetcher(store, DomainTTLPolicy(default_ttl=60, rules={}), clock=clock, public_only=False)
+        url = f"{server.url}/pages/source0/42"
+        try:
+            first = await fetcher.fetch(url)
+            assert first and "source0" in first and "<p>" not in first
+            assert server.page_count == 1
+
+            assert await fetcher.fetch(url) == first
+            assert server.page_count == 1, "Fresh entries are served locally"
+            print("✅ Fresh Sources Served Locally")
+
+            clock.now += 61
+            assert await fetcher.fetch(url) == first
+            assert server.page_count == 2, "Stale entries are revalidated"
+            entry = await store.get_entry(url)
+            assert entry["etag"] and entry["fresh_until"] == clock.now + 60
+            print("✅ Stale Sources Revalidated With 304")
+
+            results = [{"url": url}, {"url": f"{server.url}/missing"}]
+            await fetcher.attach_raw_content(results)
+            assert results[0]["raw_content"] == first and "raw_content" not in results[1]
+            print("✅ Raw Content Attached To Results")
+        finally:
+            await fetcher.close()
+
+    with tempfile.TemporaryDirectory() as directory, FakeTavilyServer(UpstreamProfile(0, 0)) as server:
+        asyncio.run(scenario(server, directory))
+
+def test_private_targets_refused():
+    """
+    Test that hosts resolving to private, loopback or link-local addresses are
+    refused, also as redirect targets, and that bodies stop at max_bytes.
+    """
+    import httpx
+
+    assert is_public_address("93.184.216.34") and is_public_address("2606:4700::1")
+    assert not any(is_public_address(address) for address in (
+        "10.0.0.5", "127.0.0.1", "169.254.169.254", "::1", "::ffff:127.0.0.1", "fe80::1%eth0", "0.0.0.0"))
+
+    hosts = {"public.example": ["93.184.216.34"], "internal.example": ["10.0.0.5"],
+             "mixed.example": ["93.184.216.34", "127.0.0.1"]}
+    requested = []
+
+    async def resolver(host, port):
+        return hosts[host]
+
+    def handle(request):
+        requested.append(request.url.host + request.url.path)
+        if request.url.path == "/to-internal":
+            return httpx.Response(302, headers={"Location": "http://internal.example/secret"})
+        if request.url.path == "/hop":
+            return httpx.Response(301, headers={"Location": "/large"})
+        return httpx.Response(200, headers={"Content-Type": "text/plain"}, content=b"x" * 100000)
+
+    async def scenario(directory):
+        store = SourceCache(SQLiteCache(os.path.join(directory, "cache.sqlite3")))
+        fetcher = SourceFetcher(store, DomainTTLPolicy(default_ttl=60, rules={}), max_bytes=1000,
+                                public_only=True, transport=httpx.MockTransport(handle), resolver=resolver)
+        try:
+            refused = [await fetcher.fetch(url) for url in (
+                "http://internal.example/secret", "http://mixed.example/", "file:///etc/passwd",
+                "http://public.example/to-internal")]
+            capped = await fetcher.fetch("http://public.example/hop")
+        finally:
+            await fetcher.close()
+        return refused, capped
+
+    with tempfile.TemporaryDirectory() as directory:
+        refused, capped = asyncio.run(scenario(directory))
+    assert refused == [None] * 4
+    assert requested == ["public.example/to-internal", "public.example/hop", "public.example/large"], requested
+    assert capped == "x" * 1000
+    print("✅ Private Targets Refused And Bodies Capped")
+
+def test_connections_use_checked_address():
+    """
+    Test that connections go to the address pinned by the check, with the
+    original hostname kept in the request, and that unchecked hosts are never
+    resolved.
+    """
+    import httpx
+
+    async def resolver(host, port):
+        return ["93.184.216.34"]
+
+    async def scenario(server):
+        fetcher = SourceFetcher(public_only=True, resolver=resolver)
+        assert await fetcher.check_url("https://public.example/page") == "93.184.216.34"
+
+        port = int(server.url.rsplit(":", 1)[1])
+        backend = PinnedAddressBackend()
+        # The name does not resolve; only the pin can reach the fake server
+        backend.pin("source.example", port, "127.0.0.1")
+        async with httpx.AsyncClient(transport=pinned_transport(backend)) as client:
+            response = await client.get(f"http://source.example:{port}/pages/source0/1")
+            assert response.status_code == 200 and "source0" in response.text
+            assert response.request.headers["host"] == f"source.example:{port}"
+            try:
+                await client.get(f"http://unchecked.example:{port}/pages/source0/1")
+                raise AssertionError("Unchecked hosts must not connect")
+            except httpx.ConnectError:
+                pass
+
+    with FakeTavilyServer(UpstreamProfile(0, 0)) as server:
+        asyncio.run(scenario(server))
+    print("✅ Connections Use The Checked Address")
+
+if __name__ == "__main__":
+    test_domain_policy()
+    test_conditional_fetch()
+    test_private_targets_refused()
+    test_connections_use_checked_address()
@@ -0,0 +1,119 @@
+import os
+import sys
+import asyncio
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy.dialects import postgresql
+
+from wtt.database.queries import TOKEN_VERSION_FIELDS, token_detail_query, token_version, token_version_query
+
+def test_detail_is_one_statement():
+    """
+    Test that the token page is a single query with correlated LATERAL parts.
+    """
+    sql = str(token_detail_query(7).compile(dialect=postgresql.dialect()))
+    assert sql.count("LATERAL") == 4
+    assert sql.count("FROM tokens") == 1
+    assert "LEFT OUTER JOIN LATERAL" in sql, "Tokens without research still have a page"
+    print("✅ Token Page Is One Query")
+
+def test_version_query_skips_the_page():
+    """
+    Test that the version lookup reads neither the research body nor the
+    answer counts.
+    """
+    sql = str(token_version_query(7).compile(dialect=postgresql.dialect()))
+    assert "research_results" not in sql and "count(" not in sql
+    assert sql.count("FROM tokens") == 1
+    print("✅ Version Lookup Skips The Page Body")
+
+def test_version_tracks_page_changes():
+    """
+    Test that the page version changes with any versioned field.
+    """
+    row = {field: 0 for field in TOKEN_VERSION_FIELDS}
+    row.update(id=1, last_updated=datetime(2024, 1, 1), researched_at=None)
+    version = token_version(row)
+    assert token_version(dict(row)) == version
+    assert token_version({**row, "id": 2}) != version
+    for field in TOKEN_VERSION_FIELDS:
+        assert token_version({**row, field: 1}) != version, field
+    print("✅ Token Version Tracks Page Changes")
+
+def test_detail_on_local_database():
+    """
+    Test the token page against a local Postgres (PLAN_CHECK_DATABASE_URL);
+    the rows are rolled back.
+    """
+    url = os.getenv("PLAN_CHECK_DATABASE_URL")
+    if not url:
+        print("ℹ️ PLAN_CHECK_DATABASE_URL not set; skipping token page check")
+        return
+
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from wtt.database.migrations import upgrade
+    from wtt.database.queries import load_token_detail, load_token_version
+
+    statements = [
+        """INSERT INTO tokens (id, address, symbol, name, decimals, holder_count, is_native, humans)
+           VALUES (990001, '0xdetail', 'DTL', 'Detail Token', 18, NULL, false, 4)""",
+        """INSERT INTO tokens (id, address, symbol, name, decimals, is_native, humans)
+           VALUES (990002, '0xbare', 'BARE', 'Bare Token', 18, false, 0)""",
+        """INSERT INTO token_extracted_data (token_id, token_name, research_results, created_at) VALUES
+           (990001, 'Detail Token', '{"summary": "old"}', now() - interval '2 days'),
+           (990001, 'Detail Token', '{"summary": "new"}', now() - interval '1 hour')""",
+        """INSERT INTO token_counter_shards (token_id, counter, shard, delta) VALUES
+           (990001, 'humans', 0, 2), (990001, 'humans', 1, 1)""",
+        """INSERT INTO verification_answers (question_id, token_id, user_id, answer) VALUES
+           (990101, 990001, 1, true), (990101, 990001, 2, true), (990102, 990001, 1, false)""",
+        """INSERT INTO question_verdicts (question_id, token_id, verdict, confidence, answers, final) VALUES
+           (990101, 990001, true, 0.97, 2, true), (990102, 990001, false, 0.6, 1, false)""",
+    ]
+
+    async def scenario():
+        engine = create_async_engine(url)
+        try:
+            await upgrade(engine)
+            async with engine.connect() as conn:
+                transaction = await conn.begin()
+                try:
+                    for statement in statements:
+                        await conn.execute(text(statement))
+                    db = AsyncSession(bind=conn)
+                    detail = await load_token_detail(db, 990001)
+                    bare = await load_token_detail(db, 990002)
+                    missing = await load_token_detail(db, 990003)
+                    versions = [await load_token_version(db, token_id) for token_id in (990001, 990002, 990003)]
+                    await conn.execute(text(
+                        "INSERT INTO verification_answers (question_id, token_id, user_id, answer) "
+                        "VALUES (990102, 990001, 3, false)"))
+                    changed = await load_token_detail(db, 990001)
+                    versions.append(await load_token_version(db, 990001))
+                    await db.close()
+                    return detail, bare, missing, changed, versions
+                finally:
+                    await transaction.rollback()
+        finally:
+            await engine.dispose()
+
+    detail, bare, missing, changed, versions = asyncio.run(scenario())
+    assert missing is None
+    assert detail["token"]["name"] == "Detail Token"
+    assert detail["token"]["humans"] == 7, "Pending shard deltas are included"
+    assert isinstance(detail["token"]["humans"], int)
+    assert detail["token"]["holder_count"] is None
+    assert detail["research"]["results"] == {"summary": "new"}
+    assert detail["verification"] == {"answers": 3, "verifiers": 2, "questions": 2, "resolved": 1, "confirmed": 1}
+    assert bare["research"] is None and bare["verification"]["answers"] == 0
+    assert changed["version"] != detail["version"], "A new answer changes the page version"
+    assert versions == [detail["version"], bare["version"], None, changed["version"]], \
+        "The version lookup agrees with the page"
+    print("✅ Token Page Loaded In One Round Trip")
+
+if __name__ == "__main__":
+    test_detail_is_one_statement()
+    test_version_query_skips_the_page()
+    test_version_tracks_page_changes()
+    test_detail_on_local_database()
@@ -0,0 +1,42 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy.dialects import postgresql
+
+from wtt.database.queries import decode_cursor, encode_cursor, token_page_query
+
+def compile_sql(query):
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+def test_cursor_roundtrip():
+    """
+    Test that cursors encode the (holders, id) sort key and reject garbage.
+    """
+    assert decode_cursor(encode_cursor(1520, 42)) == (1520, 42)
+    assert decode_cursor(encode_cursor(None, 7)) == (0, 7)
+    try:
+        decode_cursor("not-a-cursor")
+        assert False, "Malformed cursor should be rejected"
+    except ValueError:
+        pass
+    print("✅ Cursor Roundtrip Working")
+
+def test_page_query():
+    """
+    Test that the listing selects lean columns and seeks by keyset.
+    """
+    first = compile_sql(token_page_query(20)).lower()
+    assert "website" not in first and "address" not in first, "Only listing columns are selected"
+    assert "offset" not in first and "limit 21" in first
+    assert "order by coalesce(tokens.holder_count, 0) desc, tokens.id desc" in first
+    print("✅ Lean First Page Query")
+
+    next_page = compile_sql(token_page_query(20, encode_cursor(300, 9), token_type="ERC-20", is_native=False)).lower()
+    assert "(coalesce(tokens.holder_count, 0), tokens.id) < (300, 9)" in next_page
+    assert "tokens.type = 'erc-20'" in next_page and "tokens.is_native is false" in next_page
+    print("✅ Keyset And Filters Applied")
+
+if __name__ == "__main__":
+    test_cursor_roundtrip()
+    test_page_query()
@@ -0,0 +1,129 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from wtt.upstream.guard import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    UpstreamGuard,
+    UpstreamUnavailableError,
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_circuit_breaker():
+    """
+    Test breaker transitions: closed -> open -> half-open -> closed/open.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=10, clock=clock)
+
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_after() == 10
+    print("✅ Breaker Opens After Consecutive Failures")
+
+    clock.now = 10
+    assert breaker.allow_request(), "First probe should be allowed when half-open"
+    assert not breaker.allow_request(), "Only one probe at a time"
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    print("✅ Failed Probe Re-opens Circuit")
+
+    clock.now = 20
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    print("✅ Successful Probe Closes Circuit")
+
+def test_adaptive_concurrency():
+    """
+    Test AIMD limit adjustments and fast failure when no slot frees up.
+    """
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4, min_limit=1, max_limit=8,
+                                             target_latency=1.0, max_wait=0.05)
+        await limiter.acquire()
+        await limiter.release(latency=0.1, success=True)
+        assert limiter._limit == 4.25
+        await limiter.acquire()
+        await limiter.release(latency=5.0, success=True)
+        assert limiter.limit == 2, "Slow call should shrink the limit multiplicatively"
+        print("✅ AIMD Limit Adjustments")
+
+        await limiter.acquire()
+        await limiter.acquire()
+        try:
+            await limiter.acquire()
+            assert False, "Third caller should fail fast"
+        except UpstreamUnavailableError:
+            print("✅ Fast Failure When Saturated")
+
+    asyncio.run(scenario())
+
+def test_upstream_guard():
+    """
+    Test that the guard opens the circuit and stops calling a failing upstream.
+    """
+    calls = {"count": 0}
+
+    def failing_search(**kwargs):
+        calls["count"] += 1
+        raise ConnectionError("upstream down")
+
+    async def scenario():
+        guard = UpstreamGuard(
+            "test",
+            breaker=CircuitBreaker("test", failure_threshold=2, recovery_timeout=60),
+            limiter=AdaptiveConcurrencyLimiter("test", max_wait=0.05),
+        )
+        for _ in range(2):
+            try:
+                await guard.call(failing_search, query="x")
+            except ConnectionError:
+                pass
+        try:
+            await guard.call(failing_search, query="x")
+            assert False, "Open circuit should reject the call"
+        except UpstreamUnavailableError as e:
+            assert e.retry_after > 0
+        assert calls["count"] == 2, "Upstream must not be called while the circuit is open"
+        assert guard.limiter.inflight == 0
+        print("✅ Guard Fails Fast While Open")
+
+    asyncio.run(scenario())
+
+def test_guard_across_event_loops():
+    """
+    Test that a guard keeps working when reused from another event loop (as
+    by separate ``asyncio.run`` calls), with callers contending for slots.
+    """
+    guard = UpstreamGuard("test-loops", breaker=CircuitBreaker("test-loops", failure_threshold=100),
+                          limiter=AdaptiveConcurrencyLimiter("test-loops", initial_limit=1, max_limit=1))
+
+    async def search():
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def contended():
+        return await asyncio.gather(*(guard.call(search) for _ in range(3)))
+
+    for _ in range(3):
+        assert asyncio.run(contended()) == ["ok"] * 3
+    assert guard.limiter.inflight == 0
+    print("✅ Guard Reused Across Event Loops")
+
+if __name__ == "__main__":
+    test_circuit_breaker()
+    test_adaptive_concurrency()
+    test_upstream_guard()
+    test_guard_across_event_loops()
@@ -0,0 +1,109 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy.dialects import postgresql
+
+from wtt.verification.assignment import AssignmentEngine
+from wtt.verification.questions import open_questions_query, tokens_without_questions_query
+
+class ScriptedQuestionAgent:
+    """Question agent stand-in returning a fixed completion per token."""
+    def __init__(self):
+        self.distributed = []
+
+    def generate_verification_questions(self, token, context, priority):
+        lines = ["Generated Questions:", f"1. Is {token.name} listed on World Chain?",
+                 f"2. Does {token.symbol} have a public audit?"]
+        return [{"token_id": token.id, "question_text": line, "type": "binary", "difficulty": "easy"}
+                for line in lines]
+
+    def distribute_questions(self, questions, engine=None, verifiers_per_question=1):
+        self.distributed.extend(questions)
+
+def test_question_queries():
+    """
+    Test that the open-question feed skips final verdicts and that generation
+    only picks researched tokens without questions.
+    """
+    feed = str(open_questions_query(0, 100).compile(dialect=postgresql.dialect()))
+    assert "NOT (EXISTS" in feed and "question_verdicts.final IS true" in feed
+    pending = str(tokens_without_questions_query(10).compile(dialect=postgresql.dialect()))
+    assert "JOIN LATERAL" in pending and "NOT (EXISTS" in pending
+    print("✅ Question Queries Built")
+
+def test_questions_on_local_database():
+    """
+    Test question generation, worker sync of questions and answers, and
+    answer state against a local Postgres (PLAN_CHECK_DATABASE_URL); the rows
+    are rolled back.
+    """
+    url = os.getenv("PLAN_CHECK_DATABASE_URL")
+    if not url:
+        print("ℹ️ PLAN_CHECK_DATABASE_URL not set; skipping verification question check")
+        return
+
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from wtt.database.migrations import upgrade
+    from wtt.verification.questions import generate_questions, question_state_query, sync_open_questions
+
+    async def scenario():
+        engine = create_async_engine(url)
+        try:
+            await upgrade(engine)
+            async with engine.connect() as conn:
+                transaction = await conn.begin()
+                try:
+                    await conn.execute(text(
+                        "INSERT INTO tokens (id, address, symbol, name, decimals, is_native, humans) "
+                        "VALUES (990001, '0xquestions', 'QST', 'Question Token', 18, false, 0)"))
+                    await conn.execute(text(
+                        "INSERT INTO token_extracted_data (token_id, token_name, research_results) "
+                        "VALUES (990001, 'Question Token', '{\"summary\": \"researched\"}')"))
+                    db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+                    agent = ScriptedQuestionAgent()
+                    # Only tokens ordered before ours may be picked up alongside
+                    stored = await generate_questions(db, agent, limit=1000)
+                    ours = [question for question in agent.distributed if question["token_id"] == 990001]
+                    again = await generate_questions(db, ScriptedQuestionAgent(), limit=1000)
+
+                    first, second = AssignmentEngine(), AssignmentEngine()
+                    synced = (await sync_open_questions(db, first), await sync_open_questions(db, second))
+                    # An answer taken by another worker reaches both engines, once
+                    await conn.execute(text(
+                        "INSERT INTO verification_answers (question_id, token_id, user_id, answer) "
+                        f"VALUES ({ours[1]['question_id']}, 990001, 990001, true)"))
+                    for _ in range(2):
+                        await sync_open_questions(db, first, limit=100000)
+                        await sync_open_questions(db, second, limit=100000)
+                    answered = [engine.question_status(ours[1]["question_id"])["answers"] for engine in (first, second)]
+                    question_id = ours[0]["question_id"]
+                    await conn.execute(text(
+                        "INSERT INTO question_verdicts (question_id, token_id, verdict, confidence, answers, final) "
+                        f"VALUES ({question_id}, 990001, true, 0.99, 3, true)"))
+                    state = (await db.execute(question_state_query(question_id))).one()
+                    open_state = (await db.execute(question_state_query(ours[1]["question_id"]))).one()
+                    await db.close()
+                    return stored, again, ours, first, second, synced, answered, state, open_state
+                finally:
+                    await transaction.rollback()
+        finally:
+            await engine.dispose()
+
+    stored, again, ours, first, second, synced, answered, state, open_state = asyncio.run(scenario())
+    assert stored >= 2 and again == 0, "Tokens with questions are not regenerated"
+    assert [question["question_text"] for question in ours] == [
+        "1. Is Question Token listed on World Chain?", "2. Does QST have a public audit?"]
+    question_ids = [question["question_id"] for question in ours]
+    assert question_ids[1] > question_ids[0]
+    assert synced[0] == synced[1] > 0, "Every worker registers the same questions"
+    assert all(first.has_question(qid) and second.has_question(qid) for qid in question_ids)
+    assert answered == [1, 1], "Stored answers are folded in by every worker, once"
+    assert state.final and state.token_id == 990001 and not open_state.final
+    print(f"✅ {stored} Questions Generated And Shared With Every Worker")
+
+if __name__ == "__main__":
+    test_question_queries()
+    test_questions_on_local_database()
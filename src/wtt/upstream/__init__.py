@@ -0,0 +1 @@
+"""WTT upstream service protection (circuit breaking, concurrency and rate limits) and local stand-ins."""
@@ -0,0 +1,281 @@
+import asyncio
+import inspect
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from ..monitoring.metrics import (
+    UPSTREAM_CIRCUIT_STATE,
+    UPSTREAM_CONCURRENCY_LIMIT,
+    UPSTREAM_INFLIGHT,
+    record_upstream_call,
+)
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Raised when a call is rejected without reaching the upstream service,
+    either because its circuit is open or no concurrency slot freed up in time.
+    """
+
+    def __init__(self, service: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{service} unavailable: {reason}")
+        self.service = service
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probes.
+
+    CLOSED: calls flow normally; ``failure_threshold`` consecutive failures open the circuit.
+    OPEN: calls are rejected until ``recovery_timeout`` seconds have passed.
+    HALF_OPEN: up to ``half_open_max_calls`` probe calls are let through; a
+    success closes the circuit, a failure re-opens it.
+    """
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, service: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self):
+        UPSTREAM_CIRCUIT_STATE.labels(self.service).set(self._STATE_VALUES[self._state])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            self._publish()
+
+    def retry_after(self) -> float:
+        """
+        :return: Seconds until the circuit allows a probe call again
+        """
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(self.recovery_timeout - (self._clock() - self._opened_at), 0.0)
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether a call may proceed, reserving a probe slot when half-open.
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def release_probe(self):
+        """
+        Give back a half-open probe slot reserved for a call that was never attempted.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self._publish()
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._publish()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit driven by observed upstream latency.
+
+    Every call completing successfully within ``target_latency`` grows the limit
+    by ``1 / limit`` (about +1 per window of calls); a failure or a slow call
+    multiplies it by ``decrease_factor``. Callers wait for a slot at most
+    ``max_wait`` seconds before failing fast, so a degraded upstream cannot tie
+    up every worker.
+    """
+
+    def __init__(self, service: str, initial_limit: float = 10, min_limit: float = 1, max_limit: float = 100,
+                 target_latency: float = 5.0, decrease_factor: float = 0.7, max_wait: float = 2.0):
+        self.service = service
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.max_wait = max_wait
+        self._limit = float(initial_limit)
+        self._inflight = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._condition_loop: Optional[asyncio.AbstractEventLoop] = None
+        UPSTREAM_CONCURRENCY_LIMIT.labels(service).set(self._limit)
+        UPSTREAM_INFLIGHT.labels(service).set_function(lambda: self._inflight)
+
+    @property
+    def limit(self) -> int:
+        return max(int(self._limit), int(self.min_limit))
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the limiter can be built outside a running event loop,
+        # and again for each loop using it: a condition is bound to one loop.
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._condition_loop is not loop:
+            self._condition = asyncio.Condition()
+            self._condition_loop = loop
+        return self._condition
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            try:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: self._inflight < self.limit),
+                    timeout=self.max_wait,
+                )
+            except asyncio.TimeoutError:
+                raise UpstreamUnavailableError(self.service, "concurrency limit reached", retry_after=self.max_wait)
+            self._inflight += 1
+
+    async def release(self, latency: float, success: bool):
+        """
+        Release a slot and adjust the limit from the call's outcome.
+
+        :param latency: Observed call latency in seconds
+        :param success: Whether the call succeeded
+        """
+        if success and latency <= self.target_latency:
+            self._limit = min(self._limit + 1.0 / self._limit, self.max_limit)
+        else:
+            self._limit = max(self._limit * self.decrease_factor, self.min_limit)
+        UPSTREAM_CONCURRENCY_LIMIT.labels(self.service).set(self._limit)
+
+        condition = self._get_condition()
+        async with condition:
+            self._inflight -= 1
+            condition.notify_all()
+
+
+class UpstreamGuard:
+    """
+    Shared protection around calls to one upstream service.
+
+    Combines a circuit breaker with an adaptive concurrency limit. Synchronous
+    client methods are run in a worker thread so that slow upstreams never
+    block the event loop.
+    """
+
+    def __init__(self, service: str, breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        self.service = service
+        self.breaker = breaker or CircuitBreaker(service)
+        self.limiter = limiter or AdaptiveConcurrencyLimiter(service)
+
+    async def call(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call the upstream through the breaker and concurrency limiter.
+
+        :param function: Sync or async callable performing the upstream request
+        :return: The callable's result
+        :raises UpstreamUnavailableError: If the call was rejected without being attempted
+        """
+        if not self.breaker.allow_request():
+            record_upstream_call(self.service, success=False, outcome="rejected")
+            raise UpstreamUnavailableError(self.service, "circuit open", retry_after=self.breaker.retry_after())
+
+        try:
+            await self.limiter.acquire()
+        except UpstreamUnavailableError:
+            self.breaker.release_probe()
+            record_upstream_call(self.service, success=False, outcome="rejected")
+            raise
+
+        start = time.perf_counter()
+        success = False
+        try:
+            if inspect.iscoroutinefunction(function):
+                result = await function(*args, **kwargs)
+            else:
+                result = await asyncio.to_thread(function, *args, **kwargs)
+            success = True
+            return result
+        finally:
+            latency = time.perf_counter() - start
+            if success:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            record_upstream_call(self.service, success=success)
+            await self.limiter.release(latency, success)
+
+
+_guards: Dict[str, UpstreamGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(service: str) -> UpstreamGuard:
+    """
+    Return the process-wide guard for an upstream service.
+
+    Thresholds are read from the environment, e.g. ``TAVILY_BREAKER_FAILURES``,
+    ``TAVILY_BREAKER_RECOVERY_SECONDS``, ``TAVILY_MAX_CONCURRENCY``,
+    ``TAVILY_TARGET_LATENCY_SECONDS`` and ``TAVILY_MAX_WAIT_SECONDS``.
+
+    :param service: Upstream service name
+    :return: Shared guard instance
+    """
+    guard = _guards.get(service)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(service)
+            if guard is None:
+                prefix = service.upper()
+                breaker = CircuitBreaker(
+                    service,
+                    failure_threshold=int(os.getenv(f"{prefix}_BREAKER_FAILURES", "5")),
+                    recovery_timeout=float(os.getenv(f"{prefix}_BREAKER_RECOVERY_SECONDS", "30")),
+                )
+                limiter = AdaptiveConcurrencyLimiter(
+                    service,
+                    initial_limit=float(os.getenv(f"{prefix}_INITIAL_CONCURRENCY", "10")),
+                    max_limit=float(os.getenv(f"{prefix}_MAX_CONCURRENCY", "50")),
+                    target_latency=float(os.getenv(f"{prefix}_TARGET_LATENCY_SECONDS", "5")),
+                    max_wait=float(os.getenv(f"{prefix}_MAX_WAIT_SECONDS", "2")),
+                )
+                guard = UpstreamGuard(service, breaker, limiter)
+                _guards[service] = guard
+    return guard
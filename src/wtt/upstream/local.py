@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from .mode import local_mode  # noqa: F401
+from .payloads import UpstreamProfile, fake_chat_completion, fake_page, fake_search_payload
+
+# Host of the source pages returned by the local search stand-in
+LOCAL_SOURCE_BASE = "http://sources.wtt.local"
+
+
+class LocalUpstreamError(Exception):
+    """Failure injected by a local stand-in."""
+
+
+class LocalSearchClient:
+    """
+    Deterministic in-process replacement for ``TavilyClient``.
+
+    Configured by ``LOCAL_SEARCH_LATENCY_MS`` (and the other
+    ``UpstreamProfile.from_env`` settings), ``LOCAL_SEARCH_CONTENT_CHARS``
+    and ``LOCAL_SEARCH_RESULTS``.
+    """
+
+    def __init__(self, profile: Optional[UpstreamProfile] = None, content_chars: Optional[int] = None,
+                 max_results: Optional[int] = None):
+        """
+        :param content_chars: Approximate size of each result's content
+        :param max_results: Cap on results per search, below the requested number
+        """
+        self.profile = profile or UpstreamProfile.from_env("LOCAL_SEARCH", latency_ms=300.0)
+        self.content_chars = content_chars if content_chars is not None else int(
+            os.getenv("LOCAL_SEARCH_CONTENT_CHARS", "800"))
+        self.max_results = max_results if max_results is not None else int(
+            os.getenv("LOCAL_SEARCH_RESULTS", "5"))
+        self.request_count = 0
+
+    async def search(self, query: str, max_results: int = 5, include_raw_content: bool = False,
+                     **kwargs) -> Dict[str, Any]:
+        self.request_count += 1
+        await asyncio.sleep(self.profile.next_delay())
+        if self.profile.should_fail():
+            raise LocalUpstreamError("injected search failure")
+        return fake_search_payload(query, min(max_results, self.max_results), self.content_chars,
+                                   include_raw_content=include_raw_content, source_base=LOCAL_SOURCE_BASE)
+
+
+class LocalChatModel:
+    """
+    Deterministic in-process replacement for the LangChain ``ChatOpenAI`` model.
+
+    Configured by ``LOCAL_LLM_LATENCY_MS`` (and the other
+    ``UpstreamProfile.from_env`` settings) and ``LOCAL_LLM_QUESTIONS``.
+    """
+
+    def __init__(self, profile: Optional[UpstreamProfile] = None, questions: Optional[int] = None,
+                 model_name: str = "gpt-4o"):
+        self.profile = profile or UpstreamProfile.from_env("LOCAL_LLM", latency_ms=800.0)
+        self.questions = questions if questions is not None else int(os.getenv("LOCAL_LLM_QUESTIONS", "4"))
+        self.model_name = model_name
+        self.request_count = 0
+
+    def predict(self, prompt: str) -> str:
+        self.request_count += 1
+        time.sleep(self.profile.next_delay())
+        if self.profile.should_fail():
+            raise LocalUpstreamError("injected LLM failure")
+        completion = fake_chat_completion(prompt, self.model_name, self.questions)
+        return completion["choices"][0]["message"]["content"]
+
+
+def local_page_transport(profile: Optional[UpstreamProfile] = None, content_chars: Optional[int] = None):
+    """
+    httpx transport serving the local search results' source pages in-process,
+    with ETags so revalidation behaves as against real sites.
+    """
+    import httpx
+
+    profile = profile or UpstreamProfile.from_env("LOCAL_PAGES", latency_ms=100.0)
+    content_chars = content_chars if content_chars is not None else int(
+        os.getenv("LOCAL_SEARCH_CONTENT_CHARS", "800"))
+
+    async def handle(request: "httpx.Request") -> "httpx.Response":
+        await asyncio.sleep(profile.next_delay())
+        if profile.should_fail():
+            return httpx.Response(500)
+        status, headers, body = fake_page(request.url.path, dict(request.headers), content_chars)
+        return httpx.Response(status, headers=headers, content=body)
+
+    return httpx.MockTransport(handle)
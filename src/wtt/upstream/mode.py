@@ -0,0 +1,9 @@
+import os
+
+
+def local_mode() -> bool:
+    """
+    Whether external services are replaced by in-process stand-ins
+    (``WTT_MODE=local``, see ``upstream.local``).
+    """
+    return os.getenv("WTT_MODE", "").strip().lower() == "local"
@@ -0,0 +1,154 @@
+"""
+Deterministic payloads and latency/failure profiles shared by the
+``WTT_MODE=local`` stand-ins and the benchmark fake servers.
+"""
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+
+class UpstreamProfile:
+    """
+    Latency and failure behaviour of a fake upstream service.
+    """
+
+    DISTRIBUTIONS = ("normal", "lognormal", "fixed")
+
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 10.0, failure_rate: float = 0.0,
+                 seed: Optional[int] = None, distribution: str = "normal"):
+        """
+        :param latency_ms: Mean response latency in milliseconds
+        :param jitter_ms: Standard deviation of the latency in milliseconds
+        :param failure_rate: Fraction of requests answered with HTTP 500
+        :param seed: Optional seed for reproducible runs
+        :param distribution: ``normal``, ``lognormal`` (long tail) or ``fixed``
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution!r}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.distribution = distribution
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str, latency_ms: float = 50.0) -> "UpstreamProfile":
+        """
+        Build a profile from ``<PREFIX>_LATENCY_MS``, ``<PREFIX>_JITTER_MS``,
+        ``<PREFIX>_FAILURE_RATE``, ``<PREFIX>_LATENCY_DISTRIBUTION`` and
+        ``<PREFIX>_SEED``.
+
+        :param latency_ms: Mean latency when not configured
+        """
+        latency = float(os.getenv(f"{prefix}_LATENCY_MS", str(latency_ms)))
+        seed = os.getenv(f"{prefix}_SEED")
+        return cls(
+            latency_ms=latency,
+            jitter_ms=float(os.getenv(f"{prefix}_JITTER_MS", str(latency / 5))),
+            failure_rate=float(os.getenv(f"{prefix}_FAILURE_RATE", "0")),
+            seed=int(seed) if seed else None,
+            distribution=os.getenv(f"{prefix}_LATENCY_DISTRIBUTION", "normal").lower(),
+        )
+
+    def next_delay(self) -> float:
+        if self.distribution == "fixed" or self.latency_ms <= 0:
+            return max(self.latency_ms, 0.0) / 1000.0
+        with self._lock:
+            if self.distribution == "lognormal":
+                # Parameters chosen so mean and standard deviation match latency_ms/jitter_ms
+                sigma2 = math.log(1.0 + (self.jitter_ms / self.latency_ms) ** 2)
+                delay = self._random.lognormvariate(math.log(self.latency_ms) - sigma2 / 2, math.sqrt(sigma2))
+            else:
+                delay = self._random.gauss(self.latency_ms, self.jitter_ms)
+        return max(delay, 0.0) / 1000.0
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+
+def fake_search_payload(query: str, max_results: int = 5, content_chars: int = 800,
+                        include_raw_content: bool = True, source_base: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build a deterministic Tavily-shaped search response for a query.
+
+    :param query: Search query
+    :param max_results: Number of results to return
+    :param content_chars: Approximate size of each result's content
+    :param include_raw_content: Whether to include a ``raw_content`` field
+    :param source_base: Base URL of the result pages (default: example.com hosts)
+    :return: Search response dictionary
+    """
+    words = (query.split() or ["token"]) + ["blockchain", "contract", "liquidity", "holders", "audit"]
+    results = []
+    for i in range(max_results):
+        sentence = " ".join(words[(i + j) % len(words)] for j in range(12)) + ". "
+        content = (sentence * (content_chars // len(sentence) + 1))[:content_chars]
+        result = {
+            "title": f"{query} result {i}",
+            "url": (f"{source_base}/pages/source{i}/{zlib.crc32(query.encode()) % 10000}" if source_base
+                    else f"https://source{i}.example.com/{zlib.crc32(query.encode()) % 10000}/{i}"),
+            "content": content,
+            "score": round(1.0 - i * 0.1, 2),
+        }
+        if include_raw_content:
+            result["raw_content"] = content * 4
+        results.append(result)
+    return {
+        "query": query,
+        "answer": f"{query} is a token described by {max_results} sources.",
+        "results": results,
+        "response_time": 0.0,
+    }
+
+
+def fake_chat_completion(prompt: str, model: str = "gpt-4o", questions: int = 4) -> Dict[str, Any]:
+    """
+    Build an OpenAI-shaped chat completion containing numbered yes/no questions.
+
+    :param prompt: Prompt text sent by the client
+    :param model: Model name echoed back
+    :param questions: Number of questions to generate
+    :return: Chat completion dictionary
+    """
+    content = "\n".join(f"{i + 1}. Is statement {i + 1} about this token verifiable?" for i in range(questions))
+    prompt_tokens = len(prompt.split())
+    completion_tokens = len(content.split())
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def fake_page(path: str, headers: Dict[str, str], content_chars: int = 800):
+    """
+    Serve a deterministic HTML source page under ``/pages/`` with an ETag,
+    answering a matching ``If-None-Match`` with 304.
+
+    :return: (status, response headers, body bytes)
+    """
+    if not path.startswith("/pages/"):
+        return 404, {}, b""
+    etag = f'"{zlib.crc32(path.encode())}"'
+    if headers.get("If-None-Match") == etag or headers.get("if-none-match") == etag:
+        return 304, {"ETag": etag}, b""
+    words = " ".join(path.strip("/").split("/"))
+    body = f"<html><body><p>{(words + ' page content. ') * (content_chars // 20)}</p></body></html>"
+    return 200, {"Content-Type": "text/html; charset=utf-8", "ETag": etag}, body.encode()
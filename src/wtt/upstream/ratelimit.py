@@ -0,0 +1,328 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from ..monitoring.metrics import UPSTREAM_BUDGET_REMAINING, UPSTREAM_THROTTLED
+from .guard import UpstreamUnavailableError
+
+# Call priorities: interactive requests may drain the bucket completely,
+# background work must leave a reserve for them.
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+
+def bucket_key(service: str, api_key: Optional[str]) -> str:
+    """
+    :return: Storage key for an upstream API key; the key itself is never stored
+    """
+    return f"{service}:{hashlib.sha256((api_key or '').encode()).hexdigest()[:16]}"
+
+
+def refill(tokens: float, updated: float, now: float, capacity: float, refill_rate: float) -> float:
+    """
+    :return: Bucket level after refilling from ``updated`` to ``now``
+    """
+    return min(capacity, tokens + max(now - updated, 0.0) * refill_rate)
+
+
+def take(tokens: float, refill_rate: float, cost: float, reserve: float) -> Tuple[float, float]:
+    """
+    Take ``cost`` tokens if at least ``reserve`` tokens remain afterwards.
+
+    :return: New bucket level, and 0.0 if the tokens were taken or else the
+        seconds to wait before enough tokens will be available
+    """
+    if tokens - cost >= reserve:
+        return tokens - cost, 0.0
+    if refill_rate <= 0:
+        return tokens, float("inf")
+    return tokens, (cost + reserve - tokens) / refill_rate
+
+
+class TokenBucket:
+    """
+    In-process token bucket.
+
+    The bucket holds at most ``capacity`` tokens and refills continuously at
+    ``refill_rate`` tokens per second.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = refill(self._tokens, self._updated, now, self.capacity, self.refill_rate)
+        self._updated = now
+
+    def try_acquire(self, cost: float = 1.0, reserve: float = 0.0) -> float:
+        """
+        Take ``cost`` tokens if at least ``reserve`` tokens remain afterwards.
+
+        :param cost: Tokens needed by the call
+        :param reserve: Tokens that must stay in the bucket after this call
+        :return: 0.0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        with self._lock:
+            self._refill()
+            self._tokens, wait = take(self._tokens, self.refill_rate, cost, reserve)
+            return wait
+
+    def refund(self, tokens: float):
+        """Give back tokens taken for a call that was not made."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens + tokens, self.capacity)
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class SharedBucketStore:
+    """
+    Token buckets persisted in a local SQLite file so that every worker process
+    on the machine draws from the same budget.
+
+    Each take runs in a ``BEGIN IMMEDIATE`` transaction, which serialises
+    concurrent workers on the file lock for a few microseconds.
+    """
+
+    def __init__(self, path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        """
+        :param path: SQLite file shared by the workers (default: ``RATE_LIMIT_DB``,
+            set by ``api.server`` for its workers, otherwise a file private to
+            this store, removed with it)
+        """
+        self._directory = None
+        if not (path or os.getenv("RATE_LIMIT_DB")):
+            self._directory = tempfile.TemporaryDirectory(prefix="wtt_ratelimit_")
+        self.path = path or os.getenv("RATE_LIMIT_DB") or os.path.join(self._directory.name, "buckets.sqlite3")
+        # Wall clock, since the state is shared between processes.
+        self._clock = clock
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, conn: sqlite3.Connection, key: str, capacity: float) -> Tuple[float, float]:
+        row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        now = self._clock()
+        return (row[0], row[1]) if row else (capacity, now)
+
+    def take(self, key: str, capacity: float, refill_rate: float, cost: float = 1.0,
+             reserve: float = 0.0) -> float:
+        """
+        Atomically take tokens from a shared bucket.
+
+        :return: 0.0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated = self._load(conn, key, capacity)
+            now = self._clock()
+            tokens = refill(tokens, updated, now, capacity, refill_rate)
+            tokens, wait = take(tokens, refill_rate, cost, reserve)
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def refund(self, key: str, capacity: float, refill_rate: float, tokens: float):
+        """
+        Give back tokens taken for a call that was not made.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            level, updated = self._load(conn, key, capacity)
+            now = self._clock()
+            level = min(refill(level, updated, now, capacity, refill_rate) + tokens, capacity)
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, level, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def prune(self, prefix: str, idle_seconds: float) -> int:
+        """
+        Forget buckets under ``prefix`` untouched for ``idle_seconds``; once
+        that is the time to refill, they are full, which is what a missing
+        bucket means anyway.
+
+        :return: Number of buckets removed
+        """
+        cursor = self._connect().execute(
+            "DELETE FROM buckets WHERE key >= ? AND key < ? AND updated < ?",
+            (prefix, prefix + "\uffff", self._clock() - idle_seconds),
+        )
+        return cursor.rowcount
+
+    def peek(self, key: str, capacity: float, refill_rate: float) -> float:
+        """
+        :return: Current bucket level without taking anything
+        """
+        tokens, updated = self._load(self._connect(), key, capacity)
+        return refill(tokens, updated, self._clock(), capacity, refill_rate)
+
+
+class UpstreamRateLimiter:
+    """
+    Schedules calls against one upstream API key so they stay under its quota.
+
+    Interactive calls may use the whole bucket. Background calls only proceed
+    while ``background_reserve`` of the capacity is left, and yield to any
+    interactive caller waiting in this process.
+    """
+
+    def __init__(self, service: str, api_key: Optional[str], requests_per_minute: float,
+                 burst: Optional[float] = None, background_reserve: float = 0.2,
+                 max_wait: float = 10.0, store: Optional[SharedBucketStore] = None):
+        """
+        :param service: Upstream service name
+        :param api_key: API key the quota applies to (only a hash is stored)
+        :param requests_per_minute: Sustained quota
+        :param burst: Bucket capacity; defaults to one minute of quota
+        :param background_reserve: Fraction of capacity kept for interactive calls
+        :param max_wait: Longest time a call waits for budget before failing fast
+        :param store: Shared bucket store
+        """
+        self.service = service
+        self.key = bucket_key(service, api_key)
+        self.refill_rate = requests_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else requests_per_minute)
+        self.background_reserve = background_reserve * self.capacity
+        self.max_wait = max_wait
+        self.store = store or SharedBucketStore()
+        self._interactive_waiting = 0
+        UPSTREAM_BUDGET_REMAINING.labels(service).set_function(self.remaining)
+
+    def remaining(self) -> float:
+        return self.store.peek(self.key, self.capacity, self.refill_rate)
+
+    def _reserve_for(self, priority: str) -> float:
+        return 0.0 if priority == INTERACTIVE else self.background_reserve
+
+    def _take(self, priority: str, cost: float) -> float:
+        if priority != INTERACTIVE and self._interactive_waiting:
+            # Let waiting interactive callers go first.
+            return 1.0 / self.refill_rate if self.refill_rate > 0 else self.max_wait
+        return self.store.take(self.key, self.capacity, self.refill_rate, cost, self._reserve_for(priority))
+
+    def _exhausted(self, wait: float) -> UpstreamUnavailableError:
+        return UpstreamUnavailableError(self.service, "rate limit budget exhausted", retry_after=wait)
+
+    async def acquire(self, priority: str = INTERACTIVE, cost: float = 1.0, max_wait: Optional[float] = None):
+        """
+        Wait until the call fits in the quota.
+
+        :param priority: ``INTERACTIVE`` or ``BACKGROUND``
+        :param cost: Quota units consumed by the call
+        :param max_wait: Override of the longest time to wait for budget
+        :raises UpstreamUnavailableError: If no budget frees up in time
+        """
+        deadline = time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+        throttled = False
+        while True:
+            # SQLite may briefly wait on the file lock; keep it off the event loop.
+            wait = await asyncio.to_thread(self._take, priority, cost)
+            if wait == 0.0:
+                return
+            if not throttled:
+                UPSTREAM_THROTTLED.labels(self.service, priority).inc()
+                throttled = True
+            if wait > deadline - time.monotonic():
+                raise self._exhausted(wait)
+            if priority == INTERACTIVE:
+                self._interactive_waiting += 1
+                try:
+                    await asyncio.sleep(wait)
+                finally:
+                    self._interactive_waiting -= 1
+            else:
+                await asyncio.sleep(wait)
+
+    def acquire_sync(self, priority: str = INTERACTIVE, cost: float = 1.0, max_wait: Optional[float] = None):
+        """
+        Blocking variant of ``acquire`` for synchronous agents.
+        """
+        deadline = time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+        throttled = False
+        while True:
+            wait = self._take(priority, cost)
+            if wait == 0.0:
+                return
+            if not throttled:
+                UPSTREAM_THROTTLED.labels(self.service, priority).inc()
+                throttled = True
+            if wait > deadline - time.monotonic():
+                raise self._exhausted(wait)
+            time.sleep(wait)
+
+
+_limiters: Dict[str, UpstreamRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(service: str, api_key: Optional[str]) -> UpstreamRateLimiter:
+    """
+    Return the process-wide rate limiter for an upstream API key; agents
+    accept their own limiter instead, e.g. one on a private store in tests.
+
+    Quotas are read from ``<SERVICE>_RATE_LIMIT_PER_MINUTE`` and
+    ``<SERVICE>_RATE_LIMIT_BURST`` (e.g. ``TAVILY_RATE_LIMIT_PER_MINUTE``).
+
+    :param service: Upstream service name
+    :param api_key: API key the quota applies to
+    :return: Shared rate limiter
+    """
+    cache_key = bucket_key(service, api_key)
+    limiter = _limiters.get(cache_key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(cache_key)
+            if limiter is None:
+                prefix = service.upper()
+                burst = os.getenv(f"{prefix}_RATE_LIMIT_BURST")
+                limiter = UpstreamRateLimiter(
+                    service,
+                    api_key,
+                    requests_per_minute=float(os.getenv(f"{prefix}_RATE_LIMIT_PER_MINUTE", "100")),
+                    burst=float(burst) if burst else None,
+                    max_wait=float(os.getenv(f"{prefix}_RATE_LIMIT_MAX_WAIT_SECONDS", "10")),
+                )
+                _limiters[cache_key] = limiter
+    return limiter
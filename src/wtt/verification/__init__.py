@@ -0,0 +1 @@
+"""WTT verification engines: question assignment and consensus."""
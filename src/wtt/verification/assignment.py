@@ -0,0 +1,314 @@
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+OPEN = 0
+RESOLVED = 1
+
+# Vote weights are log-odds of a user's reliability; capped so a single
+# near-perfect verifier cannot settle a question alone.
+MAX_WEIGHT = 3.0
+
+
+def _grow(array: np.ndarray, size: int, fill=0) -> np.ndarray:
+    if size <= len(array):
+        return array
+    grown = np.full(max(size, 2 * len(array), 16), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class AssignmentEngine:
+    """
+    Routes verification questions to verifiers and stops once a question's
+    verdict is confident enough.
+
+    Each user's reliability is a Beta(alpha, beta) estimate and each question
+    keeps the log-odds of a "yes" verdict, both in numpy arrays indexed by a
+    dense row number, so ranking candidates is a vectorized pass instead of a
+    loop over Python objects.
+
+    State is a per-worker routing cache: question ids are allocated by the
+    ``verification_questions`` table and final verdicts live in
+    ``question_verdicts``, which is what answers are checked against. Questions
+    and answers stored by other workers are folded in by
+    ``verification.questions.sync_open_questions``.
+    """
+
+    def __init__(self, confidence_threshold: Optional[float] = None, max_answers: Optional[int] = None,
+                 prior_strength: float = 20.0):
+        """
+        :param confidence_threshold: Verdict probability at which a question stops being assigned
+        :param max_answers: Answers after which a question is resolved regardless of confidence
+        :param prior_strength: Past verifications at most counted when seeding a user's reliability
+        """
+        self.confidence_threshold = confidence_threshold if confidence_threshold is not None else float(
+            os.getenv("ASSIGNMENT_CONFIDENCE", "0.95"))
+        self.max_answers = max_answers if max_answers is not None else int(
+            os.getenv("ASSIGNMENT_MAX_ANSWERS", "9"))
+        self.prior_strength = prior_strength
+        self._lock = threading.Lock()
+
+        self._user_rows: Dict[int, int] = {}
+        self._user_ids = np.zeros(0, dtype=np.int64)
+        self._alpha = np.zeros(0, dtype=np.float32)
+        self._beta = np.zeros(0, dtype=np.float32)
+        self._load = np.zeros(0, dtype=np.int32)
+
+        self._question_rows: Dict[int, int] = {}
+        self._question_ids = np.zeros(0, dtype=np.int64)
+        self._token_ids = np.zeros(0, dtype=np.int64)
+        self._log_odds = np.zeros(0, dtype=np.float64)
+        self._answers = np.zeros(0, dtype=np.int16)
+        self._state = np.zeros(0, dtype=np.int8)
+        # Sparse per-question bookkeeping: who was assigned, and who answered what
+        self._assigned: List[Set[int]] = []
+        self._votes: List[List[Tuple[int, bool]]] = []
+        self._latest_question_id = 0
+        self._latest_answer_id = 0
+
+    @property
+    def user_count(self) -> int:
+        return len(self._user_rows)
+
+    @property
+    def question_count(self) -> int:
+        return len(self._question_rows)
+
+    @property
+    def latest_question_id(self) -> int:
+        """Highest question ID registered, 0 when there is none."""
+        return self._latest_question_id
+
+    @property
+    def latest_answer_id(self) -> int:
+        """Highest stored answer ID folded in, 0 when there is none."""
+        return self._latest_answer_id
+
+    def _user_row(self, user_id: int) -> int:
+        row = self._user_rows.get(user_id)
+        if row is None:
+            row = self._add_user(user_id, None, 0)
+        return row
+
+    def _add_user(self, user_id: int, accuracy_rate: Optional[float], verifications: int) -> int:
+        row = len(self._user_rows)
+        self._user_ids = _grow(self._user_ids, row + 1)
+        self._alpha = _grow(self._alpha, row + 1)
+        self._beta = _grow(self._beta, row + 1)
+        self._load = _grow(self._load, row + 1)
+        self._user_rows[user_id] = row
+        self._user_ids[row] = user_id
+        self._seed(row, accuracy_rate, verifications)
+        return row
+
+    def _seed(self, row: int, accuracy_rate: Optional[float], verifications: int):
+        # Beta(2, 1): unknown users are assumed slightly better than chance
+        alpha, beta = 2.0, 1.0
+        if accuracy_rate is not None and verifications > 0:
+            accuracy = min(max(accuracy_rate / 100.0, 0.0), 1.0)
+            seen = min(verifications, self.prior_strength)
+            alpha += accuracy * seen
+            beta += (1.0 - accuracy) * seen
+        self._alpha[row] = alpha
+        self._beta[row] = beta
+
+    def add_user(self, user_id: int, accuracy_rate: Optional[float] = None, total_verifications: int = 0):
+        """
+        Register a verifier, seeding their reliability from past accuracy.
+
+        :param accuracy_rate: Accuracy in percent as stored on ``User``
+        :param total_verifications: Number of answers the accuracy is based on
+        """
+        with self._lock:
+            row = self._user_rows.get(user_id)
+            if row is None:
+                self._add_user(user_id, accuracy_rate, total_verifications)
+            else:
+                self._seed(row, accuracy_rate, total_verifications)
+
+    def add_question(self, token_id: int, question_id: int) -> int:
+        """
+        Start tracking a question stored in ``verification_questions``.
+
+        :return: The question's ID
+        """
+        with self._lock:
+            if question_id in self._question_rows:
+                return question_id
+            self._latest_question_id = max(self._latest_question_id, question_id)
+            row = len(self._question_rows)
+            size = row + 1
+            self._question_ids = _grow(self._question_ids, size)
+            self._token_ids = _grow(self._token_ids, size)
+            self._log_odds = _grow(self._log_odds, size)
+            self._answers = _grow(self._answers, size)
+            self._state = _grow(self._state, size)
+            self._question_rows[question_id] = row
+            self._question_ids[row] = question_id
+            self._token_ids[row] = token_id
+            self._assigned.append(set())
+            self._votes.append([])
+            return question_id
+
+    def has_user(self, user_id: int) -> bool:
+        return user_id in self._user_rows
+
+    def has_question(self, question_id: int) -> bool:
+        return question_id in self._question_rows
+
+    def is_resolved(self, question_id: int) -> bool:
+        row = self._question_rows.get(question_id)
+        return row is not None and self._state[row] == RESOLVED
+
+    def close_question(self, question_id: int):
+        """
+        Stop routing a question whose verdict became final elsewhere (e.g. in
+        the consensus job), releasing its pending assignments.
+        """
+        with self._lock:
+            row = self._question_rows.get(question_id)
+            if row is not None and self._state[row] == OPEN:
+                self._resolve(row)
+
+    def _weights(self, rows=slice(None)) -> np.ndarray:
+        count = self.user_count
+        alpha, beta = self._alpha[:count][rows], self._beta[:count][rows]
+        return np.clip(np.log(alpha / beta), 0.0, MAX_WEIGHT)
+
+    def reliability(self, user_id: int) -> float:
+        """Expected probability that the user answers correctly."""
+        row = self._user_rows.get(user_id)
+        if row is None:
+            return 2.0 / 3.0
+        return float(self._alpha[row] / (self._alpha[row] + self._beta[row]))
+
+    def pick_verifiers(self, question_id: int, count: int = 1,
+                       candidates: Optional[List[int]] = None) -> List[int]:
+        """
+        Assign a question to the users whose answer is expected to move its
+        verdict most: the most reliable, least loaded verifiers not already
+        assigned to it.
+
+        :param candidates: Restrict to these user IDs (e.g. users online now)
+        :return: The assigned user IDs, empty once the question is resolved
+        """
+        with self._lock:
+            row = self._question_rows[question_id]
+            if self._state[row] == RESOLVED or self.user_count == 0:
+                return []
+            if candidates is not None:
+                rows = np.fromiter((self._user_row(user_id) for user_id in candidates), dtype=np.int64)
+            else:
+                rows = np.arange(self.user_count)
+            if self._assigned[row]:
+                rows = rows[~np.isin(rows, np.fromiter(self._assigned[row], dtype=np.int64))]
+            if len(rows) == 0:
+                return []
+
+            usefulness = self._weights(rows) / (1.0 + self._load[rows])
+            # Ties (e.g. all-new users) go to the least loaded, then first registered
+            order = np.lexsort((rows, self._load[rows], -usefulness))[:count]
+            chosen = rows[order]
+            self._load[chosen] += 1
+            self._assigned[row].update(chosen.tolist())
+            return self._user_ids[chosen].tolist()
+
+    def next_question(self, user_id: int, token_id: Optional[int] = None) -> Optional[int]:
+        """
+        Pick the open question this user's answer would help most: the one
+        whose verdict is least certain, preferring questions with fewer answers.
+
+        :param token_id: Only consider questions about this token
+        :return: A question ID, or None when nothing is left for this user
+        """
+        with self._lock:
+            count = self.question_count
+            if count == 0:
+                return None
+            user_row = self._user_row(user_id)
+            eligible = self._state[:count] == OPEN
+            if token_id is not None:
+                eligible &= self._token_ids[:count] == token_id
+            for row in np.flatnonzero(eligible):
+                if user_row in self._assigned[row]:
+                    eligible[row] = False
+            if not eligible.any():
+                return None
+
+            uncertainty = -np.abs(self._log_odds[:count])
+            uncertainty[~eligible] = -np.inf
+            order = np.lexsort((self._answers[:count], -uncertainty))
+            row = int(order[0])
+            self._assigned[row].add(user_row)
+            self._load[user_row] += 1
+            return int(self._question_ids[row])
+
+    def confidence(self, question_id: int) -> float:
+        """Probability of the current verdict being right."""
+        log_odds = self._log_odds[self._question_rows[question_id]]
+        return 1.0 / (1.0 + math.exp(-abs(log_odds)))
+
+    def record_answer(self, question_id: int, user_id: int, answer: bool,
+                      answer_id: Optional[int] = None) -> Dict[str, object]:
+        """
+        Fold a user's answer into the question's verdict.
+
+        When the verdict crosses the confidence threshold (or the answer cap),
+        the question is resolved and every answerer's reliability is updated
+        against the verdict. A user's later answers to the same question are
+        ignored.
+
+        :param answer_id: ``verification_answers`` ID, when folding in stored answers
+        :return: The question's verdict, confidence, answer count and status
+        """
+        with self._lock:
+            if answer_id is not None:
+                self._latest_answer_id = max(self._latest_answer_id, answer_id)
+            row = self._question_rows[question_id]
+            user_row = self._user_row(user_id)
+            already_answered = any(voter == user_row for voter, _ in self._votes[row])
+            if self._state[row] == OPEN and not already_answered:
+                if user_row in self._assigned[row] and self._load[user_row] > 0:
+                    self._load[user_row] -= 1
+                self._assigned[row].add(user_row)
+                weight = float(self._weights(slice(user_row, user_row + 1))[0])
+                self._log_odds[row] += weight if answer else -weight
+                self._answers[row] += 1
+                self._votes[row].append((user_row, bool(answer)))
+
+                confidence = 1.0 / (1.0 + math.exp(-abs(self._log_odds[row])))
+                if confidence >= self.confidence_threshold or self._answers[row] >= self.max_answers:
+                    self._resolve(row)
+            return self._status(row)
+
+    def _resolve(self, row: int):
+        self._state[row] = RESOLVED
+        verdict = self._log_odds[row] >= 0
+        voters = np.fromiter((user_row for user_row, _ in self._votes[row]), dtype=np.int64)
+        agreed = np.fromiter((answer == verdict for _, answer in self._votes[row]), dtype=bool)
+        np.add.at(self._alpha, voters, agreed.astype(np.float32))
+        np.add.at(self._beta, voters, (~agreed).astype(np.float32))
+        # Users assigned but not answering no longer count towards their load
+        pending = self._assigned[row].difference(voters.tolist())
+        if pending:
+            pending_rows = np.fromiter(pending, dtype=np.int64)
+            self._load[pending_rows] = np.maximum(self._load[pending_rows] - 1, 0)
+
+    def _status(self, row: int) -> Dict[str, object]:
+        log_odds = float(self._log_odds[row])
+        return {
+            "question_id": int(self._question_ids[row]),
+            "token_id": int(self._token_ids[row]),
+            "verdict": bool(log_odds >= 0) if self._answers[row] else None,
+            "confidence": 1.0 / (1.0 + math.exp(-abs(log_odds))),
+            "answers": int(self._answers[row]),
+            "resolved": bool(self._state[row] == RESOLVED),
+        }
+
+    def question_status(self, question_id: int) -> Dict[str, object]:
+        with self._lock:
+            return self._status(self._question_rows[question_id])
@@ -0,0 +1,305 @@
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import BigInteger, any_, bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.question_verdict import QuestionVerdict
+from ..models.user import User
+from ..models.verification_answer import VerificationAnswer
+from ..monitoring.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+answers_table = VerificationAnswer.__table__
+verdicts_table = QuestionVerdict.__table__
+users_table = User.__table__
+
+# Rows per executemany batch when writing results back
+WRITE_BATCH = 5000
+
+# Rows fetched per partition when streaming answers in
+READ_BATCH = 10000
+
+# Score and reward per graded answer, by its agreement with the final verdict
+CORRECT_SCORE = 1.0
+WRONG_PENALTY = 0.5
+CORRECT_REWARD = 10.0
+
+
+class ConsensusResult:
+    """
+    Dawid–Skene estimates for one batch of answers.
+
+    Arrays are aligned with ``question_ids`` (``p_yes``, ``answers``),
+    ``user_ids`` (``sensitivity``, ``specificity``, ``accuracy``,
+    ``user_answers``) or the scored answers (``question_index``,
+    ``user_index``, ``agreement``).
+    """
+
+    def __init__(self, question_ids: np.ndarray, user_ids: np.ndarray, p_yes: np.ndarray,
+                 answers: np.ndarray, sensitivity: np.ndarray, specificity: np.ndarray,
+                 accuracy: np.ndarray, prior: float, iterations: int,
+                 question_index: np.ndarray, user_index: np.ndarray, agreement: np.ndarray):
+        self.question_ids = question_ids
+        self.user_ids = user_ids
+        self.p_yes = p_yes
+        self.answers = answers
+        self.sensitivity = sensitivity
+        self.specificity = specificity
+        self.accuracy = accuracy
+        self.prior = prior
+        self.iterations = iterations
+        self.question_index = question_index
+        self.user_index = user_index
+        self.agreement = agreement
+
+    @property
+    def user_answers(self) -> np.ndarray:
+        return np.bincount(self.user_index, minlength=len(self.user_ids))
+
+    @property
+    def verdicts(self) -> np.ndarray:
+        return self.p_yes >= 0.5
+
+    @property
+    def confidence(self) -> np.ndarray:
+        return np.maximum(self.p_yes, 1.0 - self.p_yes)
+
+
+def dawid_skene(question_index: np.ndarray, user_index: np.ndarray, answers: np.ndarray,
+                n_questions: int, n_users: int, max_iterations: int = 50,
+                tolerance: float = 1e-6, smoothing: float = 1.0,
+                prior_agreed: Optional[np.ndarray] = None, prior_graded: Optional[np.ndarray] = None):
+    """
+    Binary Dawid–Skene: jointly estimate each question's probability of a
+    "yes" verdict and each user's sensitivity/specificity by EM.
+
+    Every step is a ``bincount`` over the flat answer arrays, so a run costs a
+    few passes over the answers per iteration, with no per-answer Python code.
+
+    :param question_index: Dense question row of each answer
+    :param user_index: Dense user row of each answer
+    :param answers: Answer values (True for "yes")
+    :param smoothing: Beta pseudo-counts keeping rates away from 0 and 1
+    :param prior_agreed: Per-user agreement pseudo-counts from graded history
+    :param prior_graded: Per-user answer pseudo-counts from graded history;
+        split evenly between the "yes" and "no" rates
+    :return: (p_yes, sensitivity, specificity, prior, iterations)
+    """
+    yes = answers.astype(np.float64)
+    no = 1.0 - yes
+    counts = np.bincount(question_index, minlength=n_questions)
+    # Start from the smoothed majority vote
+    p_yes = (np.bincount(question_index, weights=yes, minlength=n_questions) + 0.5) / (counts + 1.0)
+    agreed = smoothing if prior_agreed is None else smoothing + prior_agreed / 2.0
+    graded = 2.0 * smoothing if prior_graded is None else 2.0 * smoothing + prior_graded / 2.0
+
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        # M-step: class prior and per-user confusion rates from current posteriors
+        prior = float(np.clip(p_yes.mean(), 0.01, 0.99))
+        p_answer = p_yes[question_index]
+        sensitivity = (np.bincount(user_index, weights=p_answer * yes, minlength=n_users) + agreed) / (
+            np.bincount(user_index, weights=p_answer, minlength=n_users) + graded)
+        specificity = (np.bincount(user_index, weights=(1.0 - p_answer) * no, minlength=n_users) + agreed) / (
+            np.bincount(user_index, weights=1.0 - p_answer, minlength=n_users) + graded)
+
+        # E-step: log-likelihood of each question being "yes" vs "no"
+        sens, spec = sensitivity[user_index], specificity[user_index]
+        log_yes = np.bincount(question_index, weights=yes * np.log(sens) + no * np.log1p(-sens),
+                              minlength=n_questions)
+        log_no = np.bincount(question_index, weights=no * np.log(spec) + yes * np.log1p(-spec),
+                             minlength=n_questions)
+        log_odds = np.clip(log_yes - log_no + np.log(prior / (1.0 - prior)), -50.0, 50.0)
+        updated = 1.0 / (1.0 + np.exp(-log_odds))
+
+        change = float(np.max(np.abs(updated - p_yes))) if n_questions else 0.0
+        p_yes = updated
+        if change < tolerance:
+            break
+
+    return p_yes, sensitivity, specificity, prior, iterations
+
+
+def score_answers(question_ids: np.ndarray, user_ids: np.ndarray, answers: np.ndarray,
+                  max_iterations: int = 50, tolerance: float = 1e-6,
+                  history: Optional[Dict[int, Tuple[float, int]]] = None,
+                  history_weight: int = 20) -> ConsensusResult:
+    """
+    Run consensus over raw answer columns (one element per answer).
+
+    :param history: ``(agreed_answers, graded_answers)`` of users with graded
+        answers, used as the prior on their reliability
+    :param history_weight: Graded answers the prior counts as at most, so a
+        long history cannot outweigh what a user does now
+    """
+    unique_questions, question_index = np.unique(question_ids, return_inverse=True)
+    unique_users, user_index = np.unique(user_ids, return_inverse=True)
+    answers = np.asarray(answers, dtype=bool)
+
+    prior_agreed = prior_graded = None
+    if history:
+        graded = np.array([history.get(user, (0.0, 0))[1] for user in unique_users.tolist()], dtype=np.float64)
+        agreed = np.array([history.get(user, (0.0, 0))[0] for user in unique_users.tolist()], dtype=np.float64)
+        scale = np.minimum(graded, history_weight) / np.maximum(graded, 1.0)
+        prior_agreed, prior_graded = agreed * scale, graded * scale
+
+    p_yes, sensitivity, specificity, prior, iterations = dawid_skene(
+        question_index, user_index, answers, len(unique_questions), len(unique_users),
+        max_iterations, tolerance, prior_agreed=prior_agreed, prior_graded=prior_graded)
+
+    # Expected share of each user's answers that agree with the verdicts
+    p_answer = p_yes[question_index]
+    agreement = np.where(answers, p_answer, 1.0 - p_answer)
+    per_user = np.bincount(user_index, minlength=len(unique_users))
+    accuracy = np.bincount(user_index, weights=agreement, minlength=len(unique_users)) / np.maximum(per_user, 1)
+
+    return ConsensusResult(unique_questions, unique_users, p_yes,
+                           np.bincount(question_index, minlength=len(unique_questions)),
+                           sensitivity, specificity, accuracy, prior, iterations,
+                           question_index, user_index, agreement)
+
+
+def active_answers_query():
+    """
+    Build the query for every answer to a question without a final verdict.
+    """
+    final = select(verdicts_table.c.question_id).where(verdicts_table.c.final.is_(True))
+    return (
+        select(answers_table.c.question_id, answers_table.c.token_id,
+               answers_table.c.user_id, answers_table.c.answer)
+        .where(answers_table.c.question_id.not_in(final))
+    )
+
+
+async def load_active_answers(db: AsyncSession):
+    """
+    Load every answer to a question without a final verdict, as column arrays.
+
+    Rows are streamed from a server-side cursor ``READ_BATCH`` at a time and
+    each partition goes straight into an array, so the full result never
+    exists as Python row objects.
+
+    :return: (question_ids, token_ids, user_ids, answers)
+    """
+    result = await db.stream(active_answers_query().execution_options(yield_per=READ_BATCH))
+    chunks = [np.array(partition, dtype=np.int64) async for partition in result.partitions(READ_BATCH)]
+    table = np.concatenate(chunks) if chunks else np.empty((0, 4), dtype=np.int64)
+    return table[:, 0], table[:, 1], table[:, 2], table[:, 3].astype(bool)
+
+
+async def write_consensus(db: AsyncSession, result: ConsensusResult, question_tokens: Dict[int, int],
+                          final_confidence: float, min_answers: int):
+    """
+    Upsert verdicts and write user accuracy back, in batched executemany
+    statements.
+
+    Answers on questions that become final are added to each user's graded
+    history and credited once, in the same statement, to
+    ``verification_score`` and ``total_rewards`` in proportion to their
+    agreement with the verdict; ``accuracy_rate`` is that history blended
+    with the answers still open, so what a user earned on closed questions
+    is kept.
+
+    :param question_tokens: Token ID of each scored question
+    :param final_confidence: Confidence at which a verdict becomes final
+    :param min_answers: Answers required before a verdict can become final
+    """
+    confidence = result.confidence
+    final = (confidence >= final_confidence) & (result.answers >= min_answers)
+    verdict_rows = [
+        {"question_id": question_id, "token_id": question_tokens[question_id], "verdict": verdict,
+         "confidence": conf, "answers": answers, "final": is_final}
+        for question_id, verdict, conf, answers, is_final in zip(
+            result.question_ids.tolist(), result.verdicts.tolist(), confidence.tolist(),
+            result.answers.tolist(), final.tolist())
+    ]
+    upsert = insert(verdicts_table)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[verdicts_table.c.question_id],
+        set_={**{name: upsert.excluded[name] for name in ("verdict", "confidence", "answers", "final")},
+              "updated_at": func.now()},
+    )
+    for start in range(0, len(verdict_rows), WRITE_BATCH):
+        await db.execute(upsert, verdict_rows[start:start + WRITE_BATCH])
+
+    # SET expressions read the row as it was before the update
+    graded, agreed = users_table.c.graded_answers, users_table.c.agreed_answers
+    graded_now, agreed_now = bindparam("b_graded"), bindparam("b_agreed")
+    accuracy_update = (
+        update(users_table)
+        .where(users_table.c.id == bindparam("b_user_id"))
+        .values(graded_answers=graded + graded_now,
+                agreed_answers=agreed + agreed_now,
+                verification_score=func.coalesce(users_table.c.verification_score, 0.0)
+                + CORRECT_SCORE * agreed_now - WRONG_PENALTY * (graded_now - agreed_now),
+                total_rewards=func.coalesce(users_table.c.total_rewards, 0.0) + CORRECT_REWARD * agreed_now,
+                accuracy_rate=100.0 * (agreed + bindparam("b_scored_agreed"))
+                / (graded + bindparam("b_scored")))
+    )
+    closed = final[result.question_index]
+    n_users = len(result.user_ids)
+    user_rows = [
+        {"b_user_id": user_id, "b_graded": graded_now, "b_agreed": agreed_now,
+         "b_scored": scored, "b_scored_agreed": scored_agreed}
+        for user_id, graded_now, agreed_now, scored, scored_agreed in zip(
+            result.user_ids.tolist(),
+            np.bincount(result.user_index, weights=closed, minlength=n_users).astype(np.int64).tolist(),
+            np.bincount(result.user_index, weights=result.agreement * closed, minlength=n_users).tolist(),
+            result.user_answers.tolist(),
+            np.bincount(result.user_index, weights=result.agreement, minlength=n_users).tolist())
+    ]
+    for start in range(0, len(user_rows), WRITE_BATCH):
+        await db.execute(accuracy_update, user_rows[start:start + WRITE_BATCH])
+    await db.commit()
+    return int(final.sum())
+
+
+async def load_user_history(db: AsyncSession, user_ids: np.ndarray) -> Dict[int, Tuple[float, int]]:
+    """
+    :return: ``(agreed_answers, graded_answers)`` of each user with graded answers
+    """
+    rows = await db.execute(
+        select(users_table.c.id, users_table.c.agreed_answers, users_table.c.graded_answers)
+        .where(users_table.c.id == any_(bindparam("user_ids", user_ids.tolist(), type_=ARRAY(BigInteger))),
+               users_table.c.graded_answers > 0)
+    )
+    return {row.id: (row.agreed_answers, row.graded_answers) for row in rows}
+
+
+async def run_consensus(db: AsyncSession, final_confidence: Optional[float] = None,
+                        min_answers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Score all active questions and persist verdicts and user accuracy.
+
+    :param final_confidence: CONSENSUS_FINAL_CONFIDENCE by default
+    :param min_answers: CONSENSUS_MIN_ANSWERS by default
+    :return: Counts of answers, questions, users and newly final verdicts
+    """
+    final_confidence = final_confidence if final_confidence is not None else float(
+        os.getenv("CONSENSUS_FINAL_CONFIDENCE", "0.95"))
+    min_answers = min_answers if min_answers is not None else int(os.getenv("CONSENSUS_MIN_ANSWERS", "3"))
+
+    with stage_timer("consensus", "load_answers"):
+        question_ids, token_ids, user_ids, answers = await load_active_answers(db)
+    if len(answers) == 0:
+        return {"answers": 0, "questions": 0, "users": 0, "final": 0}
+
+    with stage_timer("consensus", "load_history"):
+        history = await load_user_history(db, np.unique(user_ids))
+    with stage_timer("consensus", "score"):
+        result = score_answers(question_ids, user_ids, answers, history=history,
+                               history_weight=int(os.getenv("CONSENSUS_HISTORY_WEIGHT", "20")))
+    question_tokens = dict(zip(question_ids.tolist(), token_ids.tolist()))
+
+    with stage_timer("consensus", "write_results"):
+        finalized = await write_consensus(db, result, question_tokens, final_confidence, min_answers)
+
+    logger.info("Consensus scored %d answers on %d questions in %d iterations; %d verdicts final",
+                len(answers), len(result.question_ids), result.iterations, finalized)
+    return {"answers": len(answers), "questions": len(result.question_ids),
+            "users": len(result.user_ids), "final": finalized}
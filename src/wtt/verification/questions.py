@@ -0,0 +1,175 @@
+"""
+Verification questions in the database: generation from stored research,
+the open-question feed of each worker's assignment engine, and the state
+checked before an answer is accepted.
+"""
+import asyncio
+import logging
+import os
+from typing import TYPE_CHECKING, List, Optional
+
+from sqlalchemy import exists, func, insert, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.question_verdict import QuestionVerdict
+from ..models.token import Token
+from ..models.token_extracted_data import TokenExtractedData
+from ..models.verification_answer import VerificationAnswer
+from ..models.verification_question import VerificationQuestion
+from ..upstream.guard import UpstreamUnavailableError
+from ..upstream.ratelimit import BACKGROUND
+
+if TYPE_CHECKING:
+    from ..agents.question_agent import QuestionGenerationAgent
+    from .assignment import AssignmentEngine
+
+logger = logging.getLogger(__name__)
+
+questions_table = VerificationQuestion.__table__
+verdicts_table = QuestionVerdict.__table__
+tokens_table = Token.__table__
+research_table = TokenExtractedData.__table__
+answers_table = VerificationAnswer.__table__
+
+# Ids at most this far below the newest one a worker knows are re-read on
+# every sync: concurrent inserts may commit out of id order (re-reading is
+# harmless, the engine ignores questions and answers it already has)
+SYNC_OVERLAP = 100
+
+
+def question_state_query(question_id: int):
+    """
+    Build the query for a question's token and whether its verdict is final.
+    """
+    return (
+        select(questions_table.c.token_id,
+               func.coalesce(verdicts_table.c.final, False).label("final"))
+        .select_from(questions_table)
+        .outerjoin(verdicts_table, verdicts_table.c.question_id == questions_table.c.id)
+        .where(questions_table.c.id == question_id)
+    )
+
+
+def open_questions_query(after_id: int, limit: int):
+    """
+    Build the query for questions without a final verdict, by id, after ``after_id``.
+    """
+    final = (
+        select(verdicts_table.c.question_id)
+        .where(verdicts_table.c.question_id == questions_table.c.id, verdicts_table.c.final.is_(True))
+    )
+    return (
+        select(questions_table.c.id, questions_table.c.token_id)
+        .where(questions_table.c.id > after_id, ~exists(final))
+        .order_by(questions_table.c.id)
+        .limit(limit)
+    )
+
+
+def open_answers_query(after_id: int, limit: int):
+    """
+    Build the query for answers to questions without a final verdict, by id, after ``after_id``.
+    """
+    final = (
+        select(verdicts_table.c.question_id)
+        .where(verdicts_table.c.question_id == answers_table.c.question_id, verdicts_table.c.final.is_(True))
+    )
+    return (
+        select(answers_table.c.id, answers_table.c.question_id, answers_table.c.user_id, answers_table.c.answer)
+        .where(answers_table.c.id > after_id, ~exists(final))
+        .order_by(answers_table.c.id)
+        .limit(limit)
+    )
+
+
+def tokens_without_questions_query(limit: int):
+    """
+    Build the query for researched tokens that have no questions yet, with
+    their latest research.
+    """
+    latest = (
+        select(research_table.c.research_results)
+        .where(research_table.c.token_id == tokens_table.c.id)
+        .order_by(research_table.c.created_at.desc())
+        .limit(1)
+        .lateral("latest_research")
+    )
+    has_questions = select(questions_table.c.id).where(questions_table.c.token_id == tokens_table.c.id)
+    return (
+        select(tokens_table.c.id, tokens_table.c.name, tokens_table.c.symbol, latest.c.research_results)
+        .join(latest, true())
+        .where(~exists(has_questions))
+        .order_by(tokens_table.c.id)
+        .limit(limit)
+    )
+
+
+async def store_questions(db: AsyncSession, token_id: int, texts: List[str]) -> List[int]:
+    """
+    Insert questions about a token; the caller commits.
+
+    :return: The database-allocated question ids, in order
+    """
+    if not texts:
+        return []
+    result = await db.execute(
+        insert(questions_table).returning(questions_table.c.id),
+        [{"token_id": token_id, "question_text": text} for text in texts],
+    )
+    return [row.id for row in result]
+
+
+async def sync_open_questions(db: AsyncSession, engine: "AssignmentEngine",
+                              limit: Optional[int] = None) -> int:
+    """
+    Register questions created since the engine's newest known one, and fold
+    in answers stored since then, so every worker routes the same questions
+    on the same evidence whichever worker took the answers.
+
+    :param limit: QUESTION_SYNC_BATCH by default, per table
+    :return: Number of questions newly registered
+    """
+    limit = limit if limit is not None else int(os.getenv("QUESTION_SYNC_BATCH", "1000"))
+    after_id = max(engine.latest_question_id - SYNC_OVERLAP, 0)
+    rows = (await db.execute(open_questions_query(after_id, limit))).all()
+    added = 0
+    for question_id, token_id in rows:
+        if not engine.has_question(question_id):
+            engine.add_question(token_id, question_id)
+            added += 1
+
+    after_id = max(engine.latest_answer_id - SYNC_OVERLAP, 0)
+    for answer_id, question_id, user_id, answer in (await db.execute(open_answers_query(after_id, limit))).all():
+        if engine.has_question(question_id):
+            engine.record_answer(question_id, user_id, answer, answer_id=answer_id)
+    return added
+
+
+async def generate_questions(db: AsyncSession, agent: "QuestionGenerationAgent", limit: int = 10) -> int:
+    """
+    Generate and store questions for researched tokens that have none, one
+    commit per token.
+
+    The LLM calls run at background priority in a worker thread.
+
+    :param limit: Maximum number of tokens handled per run
+    :return: Number of questions stored
+    """
+    stored = 0
+    for token in (await db.execute(tokens_without_questions_query(limit))).all():
+        try:
+            generated = await asyncio.to_thread(
+                agent.generate_verification_questions, token, token.research_results, BACKGROUND)
+        except UpstreamUnavailableError as e:
+            # Budget or breaker says stop: the next run picks up the rest
+            logger.info("Question generation paused after %s questions: %s", stored, e)
+            break
+        # Headers and blank lines of the completion are not questions
+        generated = [question for question in generated if question["question_text"].endswith("?")]
+        question_ids = await store_questions(db, token.id, [question["question_text"] for question in generated])
+        await db.commit()
+        for question, question_id in zip(generated, question_ids):
+            question["question_id"] = question_id
+        agent.distribute_questions(generated)
+        stored += len(question_ids)
+    return stored